@@ -1,45 +1,37 @@
 from flask import Flask, redirect, url_for
 from config import Config
-from models import close_db, init_db, get_db, User
-from flask_login import LoginManager, UserMixin
+from models import close_db, init_db, cargar_usuario
+from flask_login import LoginManager
 from utils.dates import fecha_amigable
+from utils.metricas import init_metricas
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Devuelve la conexión al pool al terminar cada contexto de la aplicación
+    # (se registra antes de init_db para que esa conexión también vuelva al pool)
+    app.teardown_appcontext(close_db)
+
+    # Tiempos de SQL, gráficos y plantillas por endpoint (/admin/metrics)
+    init_metricas(app)
+
     # Inicializa la base de datos
     with app.app_context():
         init_db()
 
-    # Cierra la conexión a la base de datos al terminar la aplicación
-    app.teardown_appcontext(close_db)
-
     # Configuración login
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
 
-    # Función de callback para cargar el usuario (se ejecuta automáticamente)
+    # Función de callback para cargar el usuario (se ejecuta automáticamente).
+    # Usa la caché de usuarios (USER_CACHE_TTL segundos) para no consultar
+    # users en cada request.
     @login_manager.user_loader
     def load_user(user_id):
-        db = get_db()
-        user_record = db.execute(
-            "SELECT * FROM users WHERE id = ? AND activo = 1",
-            (user_id,)
-        ).fetchone()
-
-        if user_record is None:
-            return None
-
-        return User(
-            user_record['id'],
-            user_record['username'],
-            user_record['role'],
-            user_record['dias_vacaciones'],
-            user_record['activo']
-        )
+        return cargar_usuario(user_id)
 
     # Importa y registra los Blueprints de rutas
     from routes.auth import auth_bp
@@ -49,6 +41,8 @@ def create_app():
     from routes.admin import admin_bp
     from routes.dashboards import dashboards_bp
     from routes.solicitudes import solicitudes_bp
+    from routes.calendario import calendario_bp
+    from routes.api import api_bp, PREFIJO as PREFIJO_API
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(vacaciones_bp, url_prefix='/vacaciones')
@@ -57,6 +51,8 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(dashboards_bp)
     app.register_blueprint(solicitudes_bp)
+    app.register_blueprint(calendario_bp, url_prefix='/calendario')
+    app.register_blueprint(api_bp, url_prefix=PREFIJO_API)
 
     app.jinja_env.filters['fecha'] = fecha_amigable
 
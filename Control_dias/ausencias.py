@@ -0,0 +1,95 @@
+"""
+Calendario de ausencias del equipo: quién está fuera (día completo o medio día)
+en cada día hábil de un rango.
+
+Una sola consulta trae las vacaciones y días administrativos aprobados que
+se cruzan con el rango (vía el R*Tree requests_intervalos). Cada solicitud se
+convierte en dos eventos sobre el índice de días hábiles (entra / sale), como
+en un arreglo de diferencias, y un barrido (sweep line) recorre los días una
+vez manteniendo quién está fuera. Los feriados vienen del calendario
+compartido (utils/calendar.py).
+"""
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime
+
+from utils.calendar import dias_habiles
+
+_SQL_AUSENCIAS = """
+    SELECT r.id, r.user_id, u.username, r.request_type, r.start_date, r.end_date,
+           r.days, r.half_day_part
+    FROM requests_intervalos i
+    JOIN requests r ON r.id = i.id
+    JOIN users u ON u.id = r.user_id
+    WHERE i.inicio <= CAST(julianday(:fin) AS INTEGER)
+      AND i.fin >= CAST(julianday(:inicio) AS INTEGER)
+      AND r.status = 'aprobada'
+      AND r.request_type IN ('vacaciones', 'administrativo')
+"""
+
+
+def _ordinal(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").toordinal()
+
+
+def calendario_equipo(db, inicio, fin):
+    """
+    Ausencias por día hábil entre inicio y fin (date o 'YYYY-MM-DD').
+    Retorna una lista, un elemento por día hábil:
+        {'fecha': date,
+         'ausentes': [{'user_id', 'username', 'tipo'}],          # día completo
+         'medio_dia': [{'user_id', 'username', 'jornada'}],      # AM / PM
+         'total': personas fuera (medio día cuenta 0.5)}
+    """
+    dias = dias_habiles(inicio, fin)
+    if not dias:
+        return []
+    ordinales = [d.toordinal() for d in dias]
+    n = len(dias)
+
+    # Eventos sobre el índice de días hábiles: quién entra / sale en cada posición
+    entradas = [[] for _ in range(n + 1)]
+    salidas = [[] for _ in range(n + 1)]
+
+    params = {'inicio': dias[0].isoformat(), 'fin': dias[-1].isoformat()}
+    for row in db.execute(_SQL_AUSENCIAS, params):
+        desde = bisect_left(ordinales, _ordinal(row['start_date']))
+        hasta = bisect_right(ordinales, _ordinal(row['end_date'] or row['start_date']))
+        if desde >= hasta:
+            continue  # cae entero en fin de semana / feriado o fuera del rango
+        medio = row['days'] == 0.5 and row['half_day_part']
+        clave = (row['user_id'], row['username'],
+                 'medio' if medio else 'completo',
+                 row['half_day_part'] if medio else row['request_type'])
+        entradas[desde].append(clave)
+        salidas[hasta].append(clave)
+
+    resultado = []
+    activos = Counter()
+    for i, dia in enumerate(dias):
+        for clave in salidas[i]:
+            activos[clave] -= 1
+            if not activos[clave]:
+                del activos[clave]
+        for clave in entradas[i]:
+            activos[clave] += 1
+
+        completos = {}
+        medios = {}
+        for user_id, username, clase, detalle in activos:
+            if clase == 'completo':
+                completos.setdefault(user_id, {'user_id': user_id, 'username': username, 'tipo': detalle})
+            else:
+                medios.setdefault(user_id, {'user_id': user_id, 'username': username, 'jornada': detalle})
+        # Quien está fuera el día completo no aparece además como medio día
+        for user_id in completos:
+            medios.pop(user_id, None)
+
+        orden = lambda p: (p['username'].lower(), p['user_id'])
+        resultado.append({
+            'fecha': dia,
+            'ausentes': sorted(completos.values(), key=orden),
+            'medio_dia': sorted(medios.values(), key=orden),
+            'total': len(completos) + 0.5 * len(medios),
+        })
+    return resultado
@@ -0,0 +1,263 @@
+"""
+Saldos de vacaciones, días administrativos y horas extras/compensadas.
+
+Todos los dashboards y formularios leen los saldos desde aquí para que las
+fórmulas sean las mismas en toda la aplicación. Los totales aprobados por
+usuario y año viven en user_year_balances (mantenida por triggers, ver
+schema.sql); reconciliar() la recalcula desde las tablas de origen.
+"""
+from contextlib import nullcontext
+from datetime import datetime
+
+# Días administrativos permitidos por año
+MAX_DIAS_ADMIN = 6.0
+
+# Lectura: una fila de user_year_balances por usuario (búsqueda por clave primaria)
+_SQL_SALDOS = """
+    SELECT u.id, u.username, u.dias_vacaciones,
+           COALESCE(b.vac_usadas, 0) AS vac_usadas,
+           COALESCE(b.admin_usados, 0) AS admin_usados,
+           COALESCE(b.horas_extras, 0) AS horas_extras,
+           COALESCE(b.horas_compensadas, 0) AS horas_compensadas
+    FROM users u
+    LEFT JOIN user_year_balances b ON b.user_id = u.id AND b.anio = :anio
+    {filtro_users}
+"""
+
+# Totales recalculados desde las tablas de origen, por (usuario, año)
+_SQL_TOTALES_ORIGEN = """
+    WITH movimientos AS (
+        SELECT user_id, anio,
+               CASE WHEN request_type = 'vacaciones' THEN COALESCE(days, 0) ELSE 0 END AS vac,
+               CASE WHEN request_type = 'administrativo' THEN COALESCE(days, 0) ELSE 0 END AS adm,
+               0 AS extras, 0 AS comp
+        FROM requests
+        WHERE status = 'aprobada'
+          AND request_type IN ('vacaciones', 'administrativo')
+        UNION ALL
+        SELECT CAST(empleado_id AS INTEGER), anio, 0, 0, cantidad_horas, 0
+        FROM horas_extras
+        WHERE estado = 'aprobado'
+        UNION ALL
+        SELECT CAST(empleado_id AS INTEGER), anio, 0, 0, 0, cantidad_horas
+        FROM horas_compensadas
+        WHERE estado = 'aprobado'
+    )
+    SELECT user_id, anio,
+           SUM(vac) AS vac_usadas,
+           SUM(adm) AS admin_usados,
+           SUM(extras) AS horas_extras,
+           SUM(comp) AS horas_compensadas
+    FROM movimientos
+    WHERE user_id IS NOT NULL AND anio IS NOT NULL
+    GROUP BY user_id, anio
+"""
+
+COLUMNAS_SALDO = ('vac_usadas', 'admin_usados', 'horas_extras', 'horas_compensadas')
+
+
+def _saldo(row):
+    vac_total = int(row['dias_vacaciones'] or 0)
+    vac_usadas = int(row['vac_usadas'] or 0)
+    admin_usados = float(row['admin_usados'] or 0)
+    horas_extras = float(row['horas_extras'] or 0)
+    horas_compensadas = float(row['horas_compensadas'] or 0)
+    return {
+        'user_id': row['id'],
+        'username': row['username'],
+        'vac_total': vac_total,
+        'vac_usadas': vac_usadas,
+        'vac_disponibles': max(0, vac_total - vac_usadas),
+        'admin_max': MAX_DIAS_ADMIN,
+        'admin_usados': admin_usados,
+        'admin_disponibles': max(0.0, MAX_DIAS_ADMIN - admin_usados),
+        'horas_extras': horas_extras,
+        'horas_compensadas': horas_compensadas,
+        'horas_disponibles': max(0.0, horas_extras - horas_compensadas),
+    }
+
+
+def saldos_usuarios(db, user_ids=None, anio=None):
+    """
+    Saldos del año `anio` (por defecto el actual) para varios usuarios en una
+    sola consulta. Con user_ids=None devuelve todos los usuarios.
+    Retorna {user_id: saldo}.
+    """
+    if anio is None:
+        anio = datetime.now().year
+    params = {'anio': anio}
+
+    if user_ids is None:
+        filtro_users = ''
+    else:
+        user_ids = [int(uid) for uid in user_ids]
+        if not user_ids:
+            return {}
+        marcas = ', '.join(f':u{i}' for i in range(len(user_ids)))
+        params.update({f'u{i}': uid for i, uid in enumerate(user_ids)})
+        filtro_users = f'WHERE u.id IN ({marcas})'
+
+    rows = db.execute(_SQL_SALDOS.format(filtro_users=filtro_users), params).fetchall()
+    return {row['id']: _saldo(row) for row in rows}
+
+
+def saldo_usuario(db, user_id, anio=None):
+    """Saldos de un usuario (una consulta). Retorna None si el usuario no existe."""
+    return saldos_usuarios(db, [user_id], anio).get(int(user_id))
+
+
+def pagina_saldos(db, anio=None, despues_de=0, limite=100):
+    """
+    Saldos de todos los usuarios del año `anio`, paginados por id (keyset):
+    los `limite` usuarios siguientes a `despues_de`. Retorna una lista de saldos.
+    """
+    if anio is None:
+        anio = datetime.now().year
+    rows = db.execute(
+        _SQL_SALDOS.format(filtro_users='WHERE u.id > :despues ORDER BY u.id LIMIT :limite'),
+        {'anio': anio, 'despues': despues_de, 'limite': limite}
+    ).fetchall()
+    return [_saldo(row) for row in rows]
+
+
+def iterar_saldos(db, anio=None):
+    """
+    Recorre los saldos fila a fila desde el cursor (para exportar sin cargar
+    todo en memoria). Con `anio`, todos los usuarios de ese año; sin `anio`,
+    cada (usuario, año) que tenga movimientos aprobados.
+    Genera pares (anio, saldo).
+    """
+    if anio is not None:
+        cursor = db.execute(
+            _SQL_SALDOS.format(filtro_users='') + " ORDER BY u.username COLLATE NOCASE, u.id",
+            {'anio': anio}
+        )
+        for row in cursor:
+            yield anio, _saldo(row)
+        return
+
+    cursor = db.execute("""
+        SELECT b.anio, u.id, u.username, u.dias_vacaciones,
+               b.vac_usadas, b.admin_usados, b.horas_extras, b.horas_compensadas
+        FROM user_year_balances b
+        JOIN users u ON u.id = b.user_id
+        ORDER BY b.anio, u.username COLLATE NOCASE, u.id
+    """)
+    for row in cursor:
+        yield row['anio'], _saldo(row)
+
+
+def reconciliar(db, aplicar=True, tolerancia=1e-6):
+    """
+    Compara user_year_balances con los totales recalculados desde requests,
+    horas_extras y horas_compensadas. Retorna la lista de diferencias
+    [{'user_id', 'anio', 'columna', 'tabla', 'origen'}]. Con aplicar=True
+    reconstruye la tabla en la misma transacción.
+    """
+    esperado = {
+        (row['user_id'], row['anio']): {col: float(row[col] or 0) for col in COLUMNAS_SALDO}
+        for row in db.execute(_SQL_TOTALES_ORIGEN)
+    }
+    actual = {
+        (row['user_id'], row['anio']): {col: float(row[col]) for col in COLUMNAS_SALDO}
+        for row in db.execute("SELECT * FROM user_year_balances")
+    }
+
+    ceros = dict.fromkeys(COLUMNAS_SALDO, 0.0)
+    diferencias = []
+    for clave in sorted(set(esperado) | set(actual), key=lambda k: (k[0] or 0, k[1] or 0)):
+        origen = esperado.get(clave, ceros)
+        tabla = actual.get(clave, ceros)
+        for col in COLUMNAS_SALDO:
+            if abs(origen[col] - tabla[col]) > tolerancia:
+                diferencias.append({
+                    'user_id': clave[0],
+                    'anio': clave[1],
+                    'columna': col,
+                    'tabla': tabla[col],
+                    'origen': origen[col],
+                })
+
+    if aplicar:
+        reconstruir(db)
+    return diferencias
+
+
+def reconstruir(db):
+    """
+    Rehace user_year_balances desde las tablas de origen (una transacción; si ya
+    hay una abierta, p. ej. en migrar(), se hace dentro de ella).
+    """
+    with nullcontext() if db.in_transaction else db:
+        db.execute("DELETE FROM user_year_balances")
+        db.execute(f"""
+            INSERT INTO user_year_balances (user_id, anio, {', '.join(COLUMNAS_SALDO)})
+            SELECT user_id, anio, {', '.join(COLUMNAS_SALDO)}
+            FROM ({_SQL_TOTALES_ORIGEN})
+        """)
+
+
+# Columnas por las que se puede ordenar el resumen de saldos -> expresión SQL
+ORDEN_SALDOS = {
+    'username': 'u.username COLLATE NOCASE',
+    'vac_total': 'u.dias_vacaciones',
+    'vac_usadas': 'vac_usadas',
+    'vac_disponibles': 'MAX(0, u.dias_vacaciones - vac_usadas)',
+    'admin_usados': 'admin_usados',
+    'admin_disponibles': f'MAX(0, {MAX_DIAS_ADMIN} - admin_usados)',
+    'horas_extras': 'horas_extras',
+    'horas_compensadas': 'horas_compensadas',
+    'horas_disponibles': 'MAX(0, horas_extras - horas_compensadas)',
+}
+
+
+def listar_saldos(db, anio=None, buscar=None, orden='username', descendente=False,
+                  pagina=1, por_pagina=50):
+    """
+    Resumen de saldos de todos los usuarios del año `anio`, filtrado por nombre
+    de usuario (`buscar`), ordenado y paginado en SQL. Una sola consulta: el
+    total de filas viene en la misma consulta con COUNT(*) OVER ().
+    Retorna (saldos, total).
+    """
+    if anio is None:
+        anio = datetime.now().year
+    expr_orden = ORDEN_SALDOS.get(orden, ORDEN_SALDOS['username'])
+    direccion = 'DESC' if descendente else 'ASC'
+    pagina = max(1, int(pagina))
+
+    rows = db.execute(f"""
+        SELECT u.id, u.username, u.dias_vacaciones,
+               COALESCE(b.vac_usadas, 0) AS vac_usadas,
+               COALESCE(b.admin_usados, 0) AS admin_usados,
+               COALESCE(b.horas_extras, 0) AS horas_extras,
+               COALESCE(b.horas_compensadas, 0) AS horas_compensadas,
+               COUNT(*) OVER () AS total
+        FROM users u
+        LEFT JOIN user_year_balances b ON b.user_id = u.id AND b.anio = :anio
+        WHERE :buscar IS NULL OR u.username LIKE :buscar ESCAPE '\\'
+        ORDER BY {expr_orden} {direccion}, u.id {direccion}
+        LIMIT :limite OFFSET :offset
+    """, {
+        'anio': anio,
+        'buscar': _patron_like(buscar),
+        'limite': por_pagina,
+        'offset': (pagina - 1) * por_pagina,
+    }).fetchall()
+
+    if not rows and pagina > 1:
+        # Página fuera de rango: igual informamos el total para la paginación
+        total = db.execute(
+            "SELECT COUNT(*) FROM users WHERE :buscar IS NULL OR username LIKE :buscar ESCAPE '\\'",
+            {'buscar': _patron_like(buscar)}
+        ).fetchone()[0]
+        return [], total
+
+    total = rows[0]['total'] if rows else 0
+    return [_saldo(row) for row in rows], total
+
+
+def _patron_like(buscar):
+    if not buscar:
+        return None
+    escapado = buscar.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escapado}%'
@@ -0,0 +1,108 @@
+"""
+Benchmark del calendario de ausencias del equipo (ausencias.calendario_equipo)
+y de la página /equipo/calendario completa (consulta + barrido + plantilla).
+
+Crea una base sintética con `--usuarios` empleados (por defecto 500) y unas
+`--solicitudes-por-usuario` vacaciones/días administrativos aprobados por
+usuario repartidos en tres años, y mide un trimestre.
+
+Uso (desde Control_dias, con config.py disponible):
+    python -m benchmarks.calendario_equipo [--usuarios 500] [--repeticiones 20]
+                                           [--db /tmp/bench_calendario.db] [--max-ms 1000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from ausencias import calendario_equipo
+from migraciones import migrar
+
+
+def crear_base(ruta, usuarios, por_usuario, semilla):
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    db = sqlite3.connect(ruta)
+    db.row_factory = sqlite3.Row
+    migrar(db)
+    rnd = random.Random(semilla)
+    with db:
+        db.executemany(
+            "INSERT INTO users (username, password_hash, role, dias_vacaciones) VALUES (?, 'x', 'empleado', 15)",
+            [(f"empleado{i:04d}",) for i in range(usuarios)]
+        )
+
+    def filas():
+        for user_id in range(1, usuarios + 1):
+            for _ in range(por_usuario):
+                inicio = date(2025, 1, 1) + timedelta(days=rnd.randint(0, 3 * 365))
+                if rnd.random() < 0.3:
+                    yield (user_id, 'administrativo', inicio.isoformat(), inicio.isoformat(),
+                           0.5, rnd.choice(('AM', 'PM')))
+                else:
+                    largo = rnd.randint(1, 10)
+                    yield (user_id, 'vacaciones', inicio.isoformat(),
+                           (inicio + timedelta(days=largo - 1)).isoformat(), float(largo), None)
+
+    with db:
+        db.executemany("""
+            INSERT INTO requests (user_id, request_type, status, start_date, end_date, days, half_day_part)
+            VALUES (?, ?, 'aprobada', ?, ?, ?, ?)
+        """, filas())
+    db.execute("ANALYZE")
+    return db
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=500)
+    parser.add_argument('--solicitudes-por-usuario', type=int, default=40)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--db', default='/tmp/bench_calendario.db')
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--max-ms', type=float, default=1000.0,
+                        help="umbral para la página completa (código de salida 1 si se supera)")
+    args = parser.parse_args()
+
+    db = crear_base(args.db, args.usuarios, args.solicitudes_por_usuario, args.semilla)
+    inicio, fin = date(2026, 4, 1), date(2026, 6, 30)
+
+    dias = calendario_equipo(db, inicio, fin)
+    personas = sum(len(d['ausentes']) + len(d['medio_dia']) for d in dias)
+    ms_calculo = medir(lambda: calendario_equipo(db, inicio, fin), args.repeticiones)
+    print(f"calendario_equipo: {ms_calculo:.1f} ms/trimestre "
+          f"({len(dias)} días hábiles, {personas} ausencias-día)")
+
+    # Página completa con la app, apuntando a la base sintética
+    from app import create_app
+    from models import create_user
+    app = create_app()
+    app.config['DATABASE'] = args.db
+    app.extensions.pop('db_pool', None)
+    cliente = app.test_client()
+    with app.app_context():
+        create_user('bench_admin', 'bench', role='administrador')
+    cliente.post('/auth/login', data={'username': 'bench_admin', 'password': 'bench'})
+    url = '/equipo/calendario?mes=2026-04&vista=trimestre'
+    assert cliente.get(url).status_code == 200
+    ms_pagina = medir(lambda: cliente.get(url).get_data(), args.repeticiones)
+    print(f"/equipo/calendario (trimestre): {ms_pagina:.1f} ms")
+
+    sys.exit(1 if ms_pagina > args.max_ms else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark de render de gráficos: matplotlib (_render_chart / PNG) vs SVG en Python puro.
+
+Uso (desde Control_dias):
+    python -m benchmarks.charts [--repeticiones 50]
+"""
+import argparse
+import time
+
+from charts import render_chart_png
+from charts_svg import render_chart_svg
+
+CASOS = [
+    ('vacaciones', (15, 5)),
+    ('administrativos', (6, 2.5)),
+    ('horas', (12, 4.5)),
+]
+
+
+def medir(render, kind, values, repeticiones):
+    render(kind, values)  # calentamiento (fuentes, cachés internas)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        data = render(kind, values)
+    ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    return ms, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'gráfico':<16}{'motor':<12}{'ms/render':>12}{'bytes':>10}")
+    for kind, values in CASOS:
+        for motor, render in (('matplotlib', render_chart_png), ('svg', render_chart_svg)):
+            ms, size = medir(render, kind, values, args.repeticiones)
+            print(f"{kind:<16}{motor:<12}{ms:>12.3f}{size:>10}")
+
+
+if __name__ == '__main__':
+    main()
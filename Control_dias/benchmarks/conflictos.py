@@ -0,0 +1,112 @@
+"""
+Benchmark de detección de cruces: R*Tree (conflictos.buscar_conflictos) vs la
+búsqueda anterior por user_id + start_date/end_date sobre requests.
+
+Crea una base SQLite sintética con el esquema de la app (por defecto 1.000.000
+de solicitudes repartidas en 1.000 usuarios, ~1.000 por usuario) y mide el
+tiempo promedio por consulta con rangos al azar.
+
+Uso (desde Control_dias):
+    python -m benchmarks.conflictos [--solicitudes 1000000] [--usuarios 1000]
+                                    [--consultas 2000] [--db /tmp/bench_conflictos.db]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from conflictos import buscar_conflictos
+from migraciones import migrar
+
+# Consulta anterior (vacaciones.buscar_conflicto_requests), sin LIMIT 1 para que
+# ambas devuelvan todos los cruces
+SQL_ANTERIOR = """
+    SELECT id, request_type, start_date, end_date, status, days, half_day_part
+    FROM requests
+    WHERE user_id = ?
+      AND status IN ('pendiente', 'aprobada')
+      AND start_date <= ?
+      AND end_date >= ?
+"""
+
+TIPOS = ('vacaciones', 'administrativo', 'horas_extras', 'horas_compensadas')
+ESTADOS = ('pendiente', 'aprobada', 'rechazada')
+
+
+def crear_base(ruta, solicitudes, usuarios, semilla):
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    db = sqlite3.connect(ruta)
+    db.row_factory = sqlite3.Row
+    migrar(db)
+
+    rnd = random.Random(semilla)
+    por_usuario = solicitudes // usuarios
+
+    def filas():
+        for user_id in range(1, usuarios + 1):
+            dia = date(2000, 1, 3) + timedelta(days=rnd.randint(0, 30))
+            for _ in range(por_usuario):
+                largo = rnd.randint(0, 9)
+                fin = dia + timedelta(days=largo)
+                yield (user_id, rnd.choice(TIPOS), rnd.choice(ESTADOS),
+                       dia.isoformat(), fin.isoformat(), float(largo + 1))
+                dia = fin + timedelta(days=rnd.randint(1, 12))
+
+    inicio = time.perf_counter()
+    with db:
+        db.executemany("""
+            INSERT INTO requests (user_id, request_type, status, start_date, end_date, days)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, filas())
+    print(f"base creada: {por_usuario * usuarios} solicitudes en {time.perf_counter() - inicio:.1f} s")
+    db.execute("ANALYZE")
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--solicitudes', type=int, default=1_000_000)
+    parser.add_argument('--usuarios', type=int, default=1_000)
+    parser.add_argument('--consultas', type=int, default=2_000)
+    parser.add_argument('--db', default='/tmp/bench_conflictos.db')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    db = crear_base(args.db, args.solicitudes, args.usuarios, args.semilla)
+
+    rnd = random.Random(args.semilla + 1)
+    consultas = []
+    for _ in range(args.consultas):
+        inicio = date(2000, 1, 1) + timedelta(days=rnd.randint(0, 365 * 25))
+        fin = inicio + timedelta(days=rnd.randint(0, 20))
+        consultas.append((rnd.randint(1, args.usuarios), inicio.isoformat(), fin.isoformat()))
+
+    # Ambas estrategias deben encontrar exactamente los mismos cruces
+    for user_id, inicio, fin in consultas[:200]:
+        nuevos = {r['id'] for r in buscar_conflictos(db, user_id, inicio, fin)}
+        anteriores = {r['id'] for r in db.execute(SQL_ANTERIOR, (user_id, fin, inicio))}
+        assert nuevos == anteriores, (user_id, inicio, fin)
+
+    resultados = {}
+    for nombre, consulta in (
+        ('anterior (B-tree user_id)', lambda u, i, f: db.execute(SQL_ANTERIOR, (u, f, i)).fetchall()),
+        ('R*Tree', lambda u, i, f: buscar_conflictos(db, u, i, f)),
+    ):
+        t0 = time.perf_counter()
+        encontrados = 0
+        for user_id, inicio, fin in consultas:
+            encontrados += len(consulta(user_id, inicio, fin))
+        us = (time.perf_counter() - t0) * 1e6 / len(consultas)
+        resultados[nombre] = us
+        print(f"{nombre:<28}{us:>10.1f} µs/consulta   ({encontrados} cruces)")
+
+    base = resultados['anterior (B-tree user_id)']
+    print(f"aceleración R*Tree: {base / resultados['R*Tree']:.1f}x")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Microbenchmark de los renderizadores PNG reutilizables (charts.py) vs la
+versión anterior con pyplot, que armaba y cerraba una figura por gráfico.
+
+Para cada gráfico mide el tiempo por render y la memoria asignada (pico de
+tracemalloc durante un render: figura, ejes, artistas, buffers de Agg vía
+numpy). Antes de medir comprueba que ambas versiones generan exactamente los
+mismos bytes PNG.
+
+Uso (desde Control_dias):
+    python -m benchmarks.figuras [--repeticiones 50]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from charts import render_chart_png
+
+CASOS = [
+    ('vacaciones', (15, 5)),
+    ('vacaciones', (0, 0)),  # mensaje de texto
+    ('administrativos', (6, 2.5)),
+    ('horas', (12, 4.5)),
+]
+
+
+# --- Versión anterior (pyplot, una figura nueva por render) -----------------
+
+def _png_anterior(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    png = buf.getvalue()
+    buf.close()
+    plt.close(fig)
+    return png
+
+
+def _mensaje_anterior(texto):
+    fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
+    ax.axis('off')
+    ax.text(0.5, 0.5, texto, horizontalalignment='center',
+            verticalalignment='center', fontsize=12, color='gray')
+    return fig
+
+
+def _torta_anterior(valores, etiquetas, colores, titulo):
+    fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
+    ax.pie(valores, labels=etiquetas, autopct='%1.1f%%', startangle=90,
+           colors=colores, explode=(0.05, 0), wedgeprops={'edgecolor': 'white'})
+    ax.set_title(titulo, fontsize=14)
+    ax.axis('equal')
+    return fig
+
+
+def _barras_anterior(aprobadas, compensadas):
+    restante = max(0.0, aprobadas - compensadas)
+    fig, ax = plt.subplots(figsize=(5, 4), dpi=100)
+    bars = ax.bar(['Aprobadas', 'Compensadas', 'Disponibles'], [aprobadas, compensadas, restante],
+                  color=['#0dcaf0', '#fd7e14', '#20c997'], edgecolor='black')
+    ax.set_ylabel("Horas")
+    ax.set_title("Horas Extras vs. Compensadas", fontsize=14)
+    for bar in bars:
+        height = bar.get_height()
+        ax.annotate(f'{height:.1f}', xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 5), textcoords="offset points", ha='center', fontsize=10)
+    return fig
+
+
+def render_anterior(kind, values):
+    a, b = (float(v) for v in values)
+    if kind == 'vacaciones':
+        if a <= 0 or b < 0 or b > a:
+            fig = _mensaje_anterior('No hay vacaciones\nasignadas')
+        elif a - b <= 0:
+            fig = _mensaje_anterior('Todas las vacaciones\nya están usadas')
+        else:
+            fig = _torta_anterior([b, a - b], ['Usadas', 'Disponibles'],
+                                  ["#0d6efd", "#198754"], "Vacaciones")
+    elif kind == 'administrativos':
+        fig = _torta_anterior([b, max(0.0, a - b)], ['Usados', 'Disponibles'],
+                              ["#ffc107", "#6c757d"], "Días Administrativos")
+    else:
+        fig = _barras_anterior(a, b)
+    return _png_anterior(fig)
+
+
+# -----------------------------------------------------------------------------
+
+def medir(render, kind, values, repeticiones):
+    render(kind, values)  # calentamiento (fuentes, renderizador del pool)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        render(kind, values)
+    ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+
+    tracemalloc.start()
+    picos = []
+    for _ in range(min(repeticiones, 10)):
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        render(kind, values)
+        picos.append(tracemalloc.get_traced_memory()[1] - antes)
+    tracemalloc.stop()
+    return ms, sum(picos) / len(picos) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    for kind, values in CASOS:
+        assert render_chart_png(kind, values) == render_anterior(kind, values), (kind, values)
+
+    print(f"{'gráfico':<26}{'versión':<14}{'ms/render':>11}{'KiB asignados':>15}")
+    for kind, values in CASOS:
+        nombre = f"{kind} {values}"
+        medidas = {}
+        for version, render in (('pyplot', render_anterior), ('reutilizado', render_chart_png)):
+            medidas[version] = medir(render, kind, values, args.repeticiones)
+            ms, kib = medidas[version]
+            print(f"{nombre:<26}{version:<14}{ms:>11.2f}{kib:>15.0f}")
+        (ms_a, kib_a), (ms_n, kib_n) = medidas['pyplot'], medidas['reutilizado']
+        print(f"{'':<26}{'mejora':<14}{ms_a / ms_n:>10.1f}x{kib_a / kib_n:>14.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""
+Benchmark de rutas: recorre las páginas principales con el cliente de pruebas
+de Flask sobre una base SQLite sintética grande y guarda p50/p95/p99, consultas
+SQL por request y memoria en un JSON para comparar entre commits.
+
+La base (por defecto 5.000 usuarios, 1.000.000 de solicitudes y 500.000 horas
+extras, repartidas en 2024-2026) se crea con el esquema de la app (migrar) y
+las tablas derivadas se llenan con los mismos triggers que en producción.
+Con --reusar se usa la base existente sin volver a crearla.
+
+Las rutas que escriben (aprobar/rechazar, enviar solicitudes) deshacen su
+cambio después de cada medición, fuera del tiempo medido, para que la base
+quede igual entre corridas.
+
+Uso (desde Control_dias, con config.py disponible):
+    python -m benchmarks.rutas [--usuarios 5000] [--solicitudes 1000000]
+                               [--horas-extras 500000] [--repeticiones 50]
+                               [--db /tmp/bench_rutas.db] [--reusar]
+                               [--salida bench_rutas.json] [--solo mi_dashboard,...]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from migraciones import migrar
+from utils.passwords import METODO_POR_DEFECTO
+
+CLAVE = 'bench'
+ANIOS = (2024, 2025, 2026)
+TIPOS = ('vacaciones', 'vacaciones', 'administrativo', 'horas_extras')
+ESTADOS = ('pendiente', 'aprobada', 'aprobada', 'rechazada')
+
+
+def crear_base(ruta, usuarios, solicitudes, horas_extras, semilla, metodo_hash):
+    for sufijo in ('', '-wal', '-shm'):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    db = sqlite3.connect(ruta)
+    db.row_factory = sqlite3.Row
+    migrar(db)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = OFF")
+    rnd = random.Random(semilla)
+    inicio = time.perf_counter()
+
+    # Un solo hash para todos: scrypt por usuario tomaría minutos
+    password_hash = generate_password_hash(CLAVE, metodo_hash)
+    with db:
+        db.execute("INSERT INTO users (username, password_hash, role, dias_vacaciones) "
+                   "VALUES ('bench_admin', ?, 'administrador', 15)", (password_hash,))
+        db.executemany(
+            "INSERT INTO users (username, password_hash, role, dias_vacaciones) VALUES (?, ?, 'empleado', ?)",
+            ((f"empleado{i:05d}", password_hash, rnd.choice((15, 20, 25))) for i in range(usuarios))
+        )
+
+    def filas_solicitudes():
+        por_usuario = solicitudes // usuarios
+        for user_id in range(2, usuarios + 2):
+            dia = date(ANIOS[0], 1, 2) + timedelta(days=rnd.randint(0, 10))
+            paso = max(1, (len(ANIOS) * 365) // max(1, por_usuario))
+            for _ in range(por_usuario):
+                tipo = rnd.choice(TIPOS)
+                if tipo == 'administrativo' and rnd.random() < 0.5:
+                    dias, fin, jornada = 0.5, dia, rnd.choice(('AM', 'PM'))
+                else:
+                    largo = rnd.randint(0, 4)
+                    dias, fin, jornada = float(largo + 1), dia + timedelta(days=largo), None
+                yield (user_id, tipo, rnd.choice(ESTADOS), dia.isoformat(), fin.isoformat(), dias, jornada)
+                dia = fin + timedelta(days=rnd.randint(1, paso))
+
+    with db:
+        db.executemany("""
+            INSERT INTO requests (user_id, request_type, status, start_date, end_date, days, half_day_part)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, filas_solicitudes())
+
+    def filas_horas():
+        for _ in range(horas_extras):
+            anio = rnd.choice(ANIOS)
+            fecha = date(anio, 1, 1) + timedelta(days=rnd.randint(0, 364))
+            yield (str(rnd.randint(2, usuarios + 1)), fecha.isoformat(), float(rnd.randint(1, 4)),
+                   'bench', rnd.choice(('pendiente', 'aprobado', 'aprobado')), anio)
+
+    with db:
+        db.executemany("""
+            INSERT INTO horas_extras (empleado_id, fecha, cantidad_horas, motivo, estado, anio)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, filas_horas())
+    db.execute("ANALYZE")
+    db.close()
+    print(f"base creada en {time.perf_counter() - inicio:.0f} s", file=sys.stderr)
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+class ContadorSQL:
+    """Cuenta las sentencias SQL ejecutadas por las conexiones del pool (set_trace_callback)."""
+
+    def __init__(self, pool):
+        self.total = 0
+        adquirir = pool.acquire
+
+        def acquire():
+            conn = adquirir()
+            conn.set_trace_callback(self._traza)
+            return conn
+
+        pool.acquire = acquire
+
+    def _traza(self, sql):
+        # Las sentencias de triggers llegan como comentarios '-- TRIGGER ...'
+        if not sql.startswith('--'):
+            self.total += 1
+
+
+def rutas(db, rnd):
+    """
+    (nombre, rol, preparar) por ruta. preparar() devuelve
+    (método, url, datos, deshacer_o_None).
+    """
+    max_id = db.execute("SELECT MAX(id) FROM requests").fetchone()[0]
+    pendientes = [r[0] for r in db.execute(
+        "SELECT id FROM requests WHERE status = 'pendiente' AND anio = ? LIMIT 5000", (ANIOS[-1],))]
+    empleados = [r[0] for r in db.execute("SELECT id FROM users WHERE role = 'empleado' LIMIT 5000")]
+
+    def borrar_nuevas():
+        # Solicitudes creadas durante la medición (triggers mantienen saldos e intervalos)
+        with db:
+            db.execute("DELETE FROM requests WHERE id > ?", (max_id,))
+
+    def dia_futuro():
+        # Días hábiles lejanos para que no choquen con solicitudes existentes
+        dia = date(2030, 1, 7) + timedelta(weeks=rnd.randint(0, 400))
+        return dia.isoformat()
+
+    def actualizar_estado():
+        solicitud_id = rnd.choice(pendientes)
+
+        def deshacer():
+            with db:
+                db.execute("UPDATE requests SET status = 'pendiente', reviewed_at = NULL, "
+                           "admin_comment = NULL WHERE id = ?", (solicitud_id,))
+        return ('post', '/admin/actualizar_estado',
+                {'solicitud_id': solicitud_id, 'nuevo_estado': 'rechazado', 'anio': ANIOS[-1]}, deshacer)
+
+    def solicitar_vacaciones():
+        dia = dia_futuro()
+        return ('post', '/vacaciones/solicitar',
+                {'fecha_inicio': dia, 'fecha_fin': dia, 'accion': 'enviar'}, borrar_nuevas)
+
+    def solicitar_administrativo():
+        dia = dia_futuro()
+        return ('post', '/dias_administrativos/solicitar',
+                {'fecha_inicio': dia, 'fecha_fin': dia, 'jornada': 'am', 'accion': 'enviar'}, borrar_nuevas)
+
+    return [
+        ('auth.login', None, lambda: ('post', '/auth/login',
+                                      {'username': 'bench_admin', 'password': CLAVE}, None)),
+        ('dashboards.mi_dashboard', 'empleado', lambda: ('get', '/mi_dashboard', None, None)),
+        ('dashboards.employee_dashboard', 'admin',
+         lambda: ('get', f'/dashboard/{rnd.choice(empleados)}', None, None)),
+        ('dashboards.dashboard', 'admin', lambda: ('get', f'/dashboard?anio={ANIOS[-1]}', None, None)),
+        ('admin.admin_panel', 'admin', lambda: ('get', f'/admin/panel?anio={ANIOS[-1]}', None, None)),
+        ('admin.actualizar_estado', 'admin', actualizar_estado),
+        ('solicitudes.mis_solicitudes', 'empleado',
+         lambda: ('get', f'/mis_solicitudes?anio={rnd.choice(ANIOS)}', None, None)),
+        ('vacaciones.solicitar_vacaciones (GET)', 'empleado', lambda: ('get', '/vacaciones/solicitar', None, None)),
+        ('vacaciones.solicitar_vacaciones (POST)', 'empleado', solicitar_vacaciones),
+        ('dias_administrativos.solicitar (GET)', 'empleado',
+         lambda: ('get', '/dias_administrativos/solicitar', None, None)),
+        ('dias_administrativos.solicitar (POST)', 'empleado', solicitar_administrativo),
+        ('horas_extras.reportar (GET)', 'empleado', lambda: ('get', '/horas_extras/reportar', None, None)),
+        ('horas_extras.solicitar_compensadas (GET)', 'empleado',
+         lambda: ('get', '/horas_extras/solicitar_compensadas', None, None)),
+    ]
+
+
+def medir_ruta(app, clientes, contador, rol, preparar, repeticiones, muestras_memoria):
+    def una_vez():
+        metodo, url, datos, deshacer = preparar()
+        cliente = clientes[rol] if rol else app.test_client()
+        consultas = contador.total
+        t0 = time.perf_counter()
+        respuesta = getattr(cliente, metodo)(url, data=datos)
+        respuesta.get_data()
+        ms = (time.perf_counter() - t0) * 1000
+        consultas = contador.total - consultas
+        if deshacer:
+            deshacer()
+        return ms, consultas, respuesta.status_code
+
+    una_vez()  # calentamiento (cachés, plantillas compiladas)
+    tiempos, consultas, estados = [], [], set()
+    for _ in range(repeticiones):
+        ms, n, status = una_vez()
+        tiempos.append(ms)
+        consultas.append(n)
+        estados.add(status)
+
+    # Memoria en una pasada aparte: tracemalloc distorsiona los tiempos
+    picos = []
+    tracemalloc.start()
+    for _ in range(muestras_memoria):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        una_vez()
+        picos.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    ordenados = sorted(tiempos)
+    return {
+        'n': len(tiempos),
+        'status': sorted(estados),
+        'p50_ms': round(percentil(ordenados, 50), 3),
+        'p95_ms': round(percentil(ordenados, 95), 3),
+        'p99_ms': round(percentil(ordenados, 99), 3),
+        'media_ms': round(statistics.fmean(tiempos), 3),
+        'consultas_sql': {'mediana': statistics.median(consultas), 'max': max(consultas)},
+        'pico_memoria_kib': round(max(picos) / 1024, 1) if picos else None,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=5_000)
+    parser.add_argument('--solicitudes', type=int, default=1_000_000)
+    parser.add_argument('--horas-extras', type=int, default=500_000)
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--muestras-memoria', type=int, default=5)
+    parser.add_argument('--db', default='/tmp/bench_rutas.db')
+    parser.add_argument('--reusar', action='store_true', help='usar la base existente en --db')
+    parser.add_argument('--salida', default='bench_rutas.json')
+    parser.add_argument('--solo', default=None, help='nombres de rutas separados por coma')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import get_pool
+    app = create_app()
+    metodo_hash = app.config.get('PASSWORD_HASH_METHOD', METODO_POR_DEFECTO)
+
+    if not (args.reusar and os.path.exists(args.db)):
+        crear_base(args.db, args.usuarios, args.solicitudes, args.horas_extras, args.semilla, metodo_hash)
+
+    # La app apunta a la base sintética, con las funcionalidades opcionales activas
+    app.config.update(DATABASE=args.db, FEATURE_HORAS_EXTRAS=True, FEATURE_COMPENSADAS=True)
+    app.extensions.pop('db_pool', None)
+    contador = ContadorSQL(get_pool(app))
+
+    db = sqlite3.connect(args.db)
+    db.execute("PRAGMA busy_timeout = 5000")
+    rnd = random.Random(args.semilla)
+    empleado = db.execute("SELECT username FROM users WHERE role = 'empleado' LIMIT 1 OFFSET ?",
+                          (rnd.randint(0, 99),)).fetchone()[0]
+    # Con saldo de sobra, para que el POST de vacaciones llegue a insertar la solicitud
+    with db:
+        db.execute("UPDATE users SET dias_vacaciones = 999 WHERE username = ?", (empleado,))
+
+    clientes = {}
+    for rol, usuario in (('admin', 'bench_admin'), ('empleado', empleado)):
+        cliente = app.test_client()
+        respuesta = cliente.post('/auth/login', data={'username': usuario, 'password': CLAVE})
+        assert respuesta.status_code == 302, (usuario, respuesta.status_code)
+        clientes[rol] = cliente
+
+    solo = set(args.solo.split(',')) if args.solo else None
+    resultados = {}
+    for nombre, rol, preparar in rutas(db, rnd):
+        if solo and not any(s in nombre for s in solo):
+            continue
+        resultados[nombre] = medir_ruta(app, clientes, contador, rol, preparar,
+                                        args.repeticiones, args.muestras_memoria)
+        r = resultados[nombre]
+        print(f"{nombre:<44}p50 {r['p50_ms']:>8.1f}  p95 {r['p95_ms']:>8.1f}  p99 {r['p99_ms']:>8.1f} ms"
+              f"  {r['consultas_sql']['mediana']:>4} SQL  status {r['status']}", file=sys.stderr)
+    db.close()
+
+    totales = sqlite3.connect(args.db)
+    conteos = {t: totales.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+               for t in ('users', 'requests', 'horas_extras')}
+    totales.close()
+
+    informe = {
+        'commit': _commit(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'entorno': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+        },
+        'parametros': dict(vars(args), filas=conteos),
+        'rss_max_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'rutas': resultados,
+    }
+    with open(args.salida, 'w', encoding='utf8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    print(f"resultados en {args.salida}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
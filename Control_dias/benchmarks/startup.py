@@ -0,0 +1,86 @@
+"""
+Benchmark de arranque: tiempo de create_app() en frío y memoria (RSS) del worker.
+
+Cada medición corre en un proceso nuevo para que los imports sean realmente en frío.
+Sirve también como control de regresiones: termina con código 1 si se supera
+algún umbral o si el arranque carga matplotlib/seaborn.
+
+Uso (desde Control_dias, con config.py disponible):
+    python -m benchmarks.startup [--repeticiones 5] [--max-ms 1500] [--max-rss-mb 120]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HIJO = r'''
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+create_app()
+ms = (time.perf_counter() - t0) * 1000
+
+rss_kb = 0
+try:
+    with open('/proc/self/status') as f:
+        for linea in f:
+            if linea.startswith('VmRSS:'):
+                rss_kb = int(linea.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+pesados = sorted(m for m in ('matplotlib', 'seaborn', 'numpy', 'pandas') if m in sys.modules)
+print(json.dumps({'ms': ms, 'rss_mb': rss_kb / 1024, 'pesados': pesados}))
+'''
+
+
+def medir_una_vez():
+    salida = subprocess.run(
+        [sys.executable, '-c', HIJO],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='falla si la mediana de create_app() supera este tiempo')
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help='falla si la mediana de RSS supera este valor')
+    args = parser.parse_args()
+
+    muestras = [medir_una_vez() for _ in range(args.repeticiones)]
+    tiempos = [m['ms'] for m in muestras]
+    rss = [m['rss_mb'] for m in muestras]
+    pesados = sorted({p for m in muestras for p in m['pesados']})
+
+    resultado = {
+        'repeticiones': args.repeticiones,
+        'create_app_ms': {
+            'mediana': statistics.median(tiempos),
+            'min': min(tiempos),
+            'max': max(tiempos),
+        },
+        'rss_mb': {'mediana': statistics.median(rss), 'max': max(rss)},
+        'modulos_pesados_cargados': pesados,
+    }
+    print(json.dumps(resultado, indent=2))
+
+    errores = []
+    if pesados:
+        errores.append(f"create_app() cargó {', '.join(pesados)}")
+    if args.max_ms is not None and resultado['create_app_ms']['mediana'] > args.max_ms:
+        errores.append(f"create_app() tardó más de {args.max_ms} ms")
+    if args.max_rss_mb is not None and resultado['rss_mb']['mediana'] > args.max_rss_mb:
+        errores.append(f"RSS sobre {args.max_rss_mb} MB")
+    for e in errores:
+        print(f"REGRESIÓN: {e}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,119 +1,222 @@
+"""
+Gráficos PNG con matplotlib (motor de respaldo, CHART_ENGINE = 'matplotlib').
+
+No se usa pyplot: cada tipo de gráfico tiene un renderizador con su Figure,
+FigureCanvasAgg, ejes, artistas y buffer armados una sola vez; en cada render
+solo se actualizan los ángulos de las porciones / altos de las barras y los
+textos. Los renderizadores libres se guardan en un pool por tipo (uno por
+thread que esté dibujando a la vez), porque una figura no se puede dibujar
+desde dos threads al mismo tiempo.
+"""
+import base64
+import io
+import math
+from queue import Empty, LifoQueue
+
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import seaborn as sns
-import io
-import base64
 
 sns.set_theme(style="whitegrid")
 
-def _render_chart(fig):
-    """Convierte una figura de matplotlib a base64 para mostrarla en HTML."""
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    plt.close(fig)
-    return image_base64
-
 
-def create_vacation_chart(total, used):
-    """
-    Crea un gráfico circular (pie) para Vacaciones.
-    Si total == 0 o los valores no son válidos, dibuja un texto indicativo.
-    """
+def _num(valor):
     # Intentamos convertir a float; si falla, lo consideramos 0
     try:
-        total = float(total)
+        return float(valor)
     except (TypeError, ValueError):
-        total = 0.0
+        return 0.0
 
-    try:
-        used = float(used)
-    except (TypeError, ValueError):
-        used = 0.0
 
-    # Si no hay vacaciones asignadas o used > total, mostramos texto
-    if total <= 0 or used < 0 or used > total:
-        fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
-        ax.axis('off')
-        ax.text(
-            0.5, 0.5,
-            'No hay vacaciones\nasignadas',
+class _Grafico:
+    """Figura + canvas Agg + buffer reutilizables; las subclases arman y actualizan los artistas."""
+
+    figsize = (4, 4)
+
+    def __init__(self):
+        self.fig = Figure(figsize=self.figsize, dpi=100)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.buf = io.BytesIO()
+
+    def png(self, *valores):
+        self.actualizar(*valores)
+        self.buf.seek(0)
+        self.buf.truncate()
+        self.fig.savefig(self.buf, format='png', bbox_inches='tight')
+        return self.buf.getvalue()
+
+
+class _Mensaje(_Grafico):
+    """Equivalente a ax.axis('off') + ax.text(...) centrado en gris."""
+
+    def __init__(self):
+        super().__init__()
+        self.ax.axis('off')
+        self.texto = self.ax.text(
+            0.5, 0.5, '',
             horizontalalignment='center',
             verticalalignment='center',
             fontsize=12,
             color='gray'
         )
-        return _render_chart(fig)
 
-    # Calculamos las restantes
-    restante = total - used
+    def actualizar(self, texto):
+        self.texto.set_text(texto)
+
+
+class _Torta(_Grafico):
+    """
+    Torta que empieza en 90°, con la primera porción separada un 5% y
+    porcentajes '%1.1f%%'. Se arma una vez con ax.pie y en cada render se
+    recalcula la geometría igual que Axes.pie / Axes.pie_label.
+    """
+
+    EXPLODE = (0.05, 0)
+
+    def __init__(self, etiquetas, colores, titulo):
+        super().__init__()
+        self.wedges, self.textos, self.porcentajes = self.ax.pie(
+            [1] * len(etiquetas),
+            labels=etiquetas,
+            autopct='%1.1f%%',
+            startangle=90,
+            colors=colores,
+            explode=self.EXPLODE,
+            wedgeprops={'edgecolor': 'white'}
+        )
+        self.ax.set_title(titulo, fontsize=14)
+        self.ax.axis('equal')
+
+    def actualizar(self, *valores):
+        valores = [max(0.0, v) for v in valores]
+        total = sum(valores)
+        theta1 = 90 / 360
+        for valor, wedge, texto, pct, expl in zip(
+                valores, self.wedges, self.textos, self.porcentajes, self.EXPLODE):
+            frac = valor / total if total > 0 else 0.0
+            theta2 = theta1 + frac
+            medio = math.pi * (theta1 + theta2)
+            cx, cy = expl * math.cos(medio), expl * math.sin(medio)
+            wedge.set_center((cx, cy))
+            wedge.set_theta1(360. * theta1)
+            wedge.set_theta2(360. * theta2)
+
+            xt, yt = cx + 1.1 * math.cos(medio), cy + 1.1 * math.sin(medio)
+            texto.set_position((xt, yt))
+            texto.set_horizontalalignment('left' if xt > 0 else 'right')
+            pct.set_position((cx + 0.6 * math.cos(medio), cy + 0.6 * math.sin(medio)))
+            pct.set_text('%1.1f%%' % (100. * frac))
+            theta1 = theta2
+        # axis('equal') ajusta los límites a los datos: recalcularlos con las porciones nuevas
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+
+class _Barras(_Grafico):
+    """Barras Aprobadas / Compensadas / Disponibles con el valor anotado sobre cada una."""
+
+    figsize = (5, 4)
+
+    def __init__(self):
+        super().__init__()
+        labels = ['Aprobadas', 'Compensadas', 'Disponibles']
+        colores = ['#0dcaf0', '#fd7e14', '#20c997']  # Bootstrap info, orange, green
+        self.barras = self.ax.bar(labels, [0.0] * len(labels), color=colores, edgecolor='black')
+        self.ax.set_ylabel("Horas")
+        self.ax.set_title("Horas Extras vs. Compensadas", fontsize=14)
+        self.anotaciones = [
+            self.ax.annotate('', xy=(bar.get_x() + bar.get_width() / 2, 0),
+                             xytext=(0, 5), textcoords="offset points",
+                             ha='center', fontsize=10)
+            for bar in self.barras
+        ]
+
+    def actualizar(self, aprobadas, compensadas):
+        restante = max(0.0, aprobadas - compensadas)
+        for bar, anotacion, valor in zip(self.barras, self.anotaciones,
+                                         (aprobadas, compensadas, restante)):
+            bar.set_height(valor)
+            anotacion.xy = (bar.get_x() + bar.get_width() / 2, valor)
+            anotacion.set_text(f'{valor:.1f}')
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+
+# Renderizadores libres por nombre; se crean a demanda y se devuelven al terminar
+_LIBRES = {}
+
+_FABRICAS = {
+    'mensaje': _Mensaje,
+    'vacaciones': lambda: _Torta(['Usadas', 'Disponibles'], ["#0d6efd", "#198754"], "Vacaciones"),
+    'administrativos': lambda: _Torta(['Usados', 'Disponibles'], ["#ffc107", "#6c757d"],
+                                      "Días Administrativos"),
+    'horas': _Barras,
+}
+
+
+def _png(nombre, *valores):
+    cola = _LIBRES.setdefault(nombre, LifoQueue())
+    try:
+        grafico = cola.get_nowait()
+    except Empty:
+        grafico = _FABRICAS[nombre]()
+    try:
+        return grafico.png(*valores)
+    finally:
+        cola.put(grafico)
+
+
+def _vacation_png(total, used):
+    """
+    Gráfico circular (pie) para Vacaciones.
+    Si total == 0 o los valores no son válidos, dibuja un texto indicativo.
+    """
+    total, used = _num(total), _num(used)
+
+    # Si no hay vacaciones asignadas o used > total, mostramos texto
+    if total <= 0 or used < 0 or used > total:
+        return _png('mensaje', 'No hay vacaciones\nasignadas')
+
     # Si restante es 0 (todas usadas), también mostramos texto
+    restante = total - used
     if restante <= 0:
-        fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
-        ax.axis('off')
-        ax.text(
-            0.5, 0.5,
-            'Todas las vacaciones\nya están usadas',
-            horizontalalignment='center',
-            verticalalignment='center',
-            fontsize=12,
-            color='gray'
-        )
-        return _render_chart(fig)
-    
-
-
-    # Caso normal: dibujo del pie
-    fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
-    ax.pie(
-        [used, restante],
-        labels=['Usadas', 'Disponibles'],
-        autopct='%1.1f%%',
-        startangle=90,
-        colors=["#0d6efd", "#198754"],  # Bootstrap colors
-        explode=(0.05, 0),
-        wedgeprops={'edgecolor': 'white'}
-    )
-    ax.set_title("Vacaciones", fontsize=14)
-    ax.axis('equal')
-    return _render_chart(fig)
+        return _png('mensaje', 'Todas las vacaciones\nya están usadas')
+
+    return _png('vacaciones', used, restante)
+
+
+def _admin_png(maximo, usados):
+    maximo, usados = _num(maximo), _num(usados)
+    return _png('administrativos', usados, max(0.0, maximo - usados))
+
+
+def _hours_png(aprobadas, compensadas):
+    return _png('horas', _num(aprobadas), _num(compensadas))
+
+
+def create_vacation_chart(total, used):
+    return base64.b64encode(_vacation_png(total, used)).decode('utf-8')
 
 
 def create_admin_chart(maximo, usados):
-    restante = max(0.0, maximo - usados)
-    fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
-    ax.pie(
-        [usados, restante],
-        labels=['Usados', 'Disponibles'],
-        autopct='%1.1f%%',
-        startangle=90,
-        colors=["#ffc107", "#6c757d"],  # Amarillo y gris
-        explode=(0.05, 0),
-        wedgeprops={'edgecolor': 'white'}
-    )
-    ax.set_title("Días Administrativos", fontsize=14)
-    ax.axis('equal')
-    return _render_chart(fig)
+    return base64.b64encode(_admin_png(maximo, usados)).decode('utf-8')
 
 
 def create_hours_chart(aprobadas, compensadas):
-    restante = max(0.0, aprobadas - compensadas)
-    labels = ['Aprobadas', 'Compensadas', 'Disponibles']
-    valores = [aprobadas, compensadas, restante]
-    colores = ['#0dcaf0', '#fd7e14', '#20c997']  # Bootstrap info, orange, green
-
-    fig, ax = plt.subplots(figsize=(5, 4), dpi=100)
-    bars = ax.bar(labels, valores, color=colores, edgecolor='black')
-    ax.set_ylabel("Horas")
-    ax.set_title("Horas Extras vs. Compensadas", fontsize=14)
-
-    for bar in bars:
-        height = bar.get_height()
-        ax.annotate(f'{height:.1f}', xy=(bar.get_x() + bar.get_width() / 2, height),
-                    xytext=(0, 5), textcoords="offset points",
-                    ha='center', fontsize=10)
-
-    return _render_chart(fig)
\ No newline at end of file
+    return base64.b64encode(_hours_png(aprobadas, compensadas)).decode('utf-8')
+
+
+# Tipo de gráfico (el mismo que usa utils.chart_cache para las claves) -> PNG
+_PNGS = {
+    'vacaciones': _vacation_png,
+    'administrativos': _admin_png,
+    'horas': _hours_png,
+}
+
+
+def render_chart_png(kind, values):
+    """Renderiza el gráfico `kind` con `values` y devuelve los bytes PNG."""
+    return _PNGS[kind](*values)
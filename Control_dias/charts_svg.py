@@ -0,0 +1,207 @@
+"""
+Renderizador SVG en Python puro para los gráficos de los dashboards.
+Dibuja los mismos tres gráficos que charts.py (dos tortas y un gráfico de
+barras) sin cargar matplotlib ni seaborn.
+"""
+import math
+from xml.sax.saxutils import escape
+
+FONT = "DejaVu Sans, Arial, Helvetica, sans-serif"
+GRIS_GRILLA = "#cccccc"  # seaborn whitegrid: grid y spines en '.8'
+GRIS_TEXTO = "#262626"   # seaborn: texto en '.15'
+
+
+def _num(value):
+    # Lo que no es un número finito (None, texto, inf, nan) se dibuja como 0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if math.isfinite(value) else 0.0
+
+
+def _svg(width, height, body):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="{FONT}">'
+        f'<rect width="{width}" height="{height}" fill="#ffffff"/>'
+        + ''.join(body) +
+        '</svg>'
+    ).encode('utf-8')
+
+
+def _text(x, y, texto, size=12, anchor='middle', color=GRIS_TEXTO, extra=''):
+    lineas = str(texto).split('\n')
+    if len(lineas) == 1:
+        return (f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" fill="{color}" '
+                f'text-anchor="{anchor}" dominant-baseline="central"{extra}>{escape(lineas[0])}</text>')
+    # Varias líneas centradas verticalmente en y
+    alto = size * 1.2
+    y0 = y - alto * (len(lineas) - 1) / 2
+    spans = ''.join(
+        f'<tspan x="{x:.1f}" y="{y0 + i * alto:.1f}">{escape(l)}</tspan>'
+        for i, l in enumerate(lineas)
+    )
+    return (f'<text font-size="{size}" fill="{color}" text-anchor="{anchor}" '
+            f'dominant-baseline="central"{extra}>{spans}</text>')
+
+
+def _mensaje(texto):
+    """Equivalente a ax.axis('off') + ax.text(...) centrado en gris."""
+    return _svg(400, 400, [_text(200, 200, texto, size=12, color='gray')])
+
+
+def _pie(valores, etiquetas, colores, titulo):
+    """
+    Torta como la de matplotlib: empieza en 90°, gira antihoraria, la primera
+    porción separada un 5% del radio, bordes blancos, etiquetas a 1.1 radios y
+    porcentajes ('%1.1f%%') a 0.6 radios.
+    """
+    cx, cy, r = 200.0, 215.0, 130.0
+    total = sum(valores)
+    body = [_text(cx, 28, titulo, size=14)]
+    explode = (0.05, 0)
+    theta = 90.0
+
+    for valor, etiqueta, color, sep in zip(valores, etiquetas, colores, explode):
+        frac = valor / total if total > 0 else 0.0
+        theta2 = theta + 360.0 * frac
+        medio = math.radians((theta + theta2) / 2)
+        ox = cx + sep * r * math.cos(medio)
+        oy = cy - sep * r * math.sin(medio)
+
+        if frac >= 1.0:
+            body.append(f'<circle cx="{ox:.2f}" cy="{oy:.2f}" r="{r:.2f}" fill="{color}" '
+                        f'stroke="#ffffff" stroke-width="1"/>')
+        elif frac > 0:
+            a1, a2 = math.radians(theta), math.radians(theta2)
+            x1, y1 = ox + r * math.cos(a1), oy - r * math.sin(a1)
+            x2, y2 = ox + r * math.cos(a2), oy - r * math.sin(a2)
+            grande = 1 if frac > 0.5 else 0
+            body.append(
+                f'<path d="M{ox:.2f},{oy:.2f} L{x1:.2f},{y1:.2f} '
+                f'A{r:.2f},{r:.2f} 0 {grande} 0 {x2:.2f},{y2:.2f} Z" '
+                f'fill="{color}" stroke="#ffffff" stroke-width="1"/>'
+            )
+
+        lx = ox + 1.1 * r * math.cos(medio)
+        ly = oy - 1.1 * r * math.sin(medio)
+        anchor = 'start' if math.cos(medio) > 0 else 'end'
+        if abs(math.cos(medio)) < 1e-9:
+            anchor = 'middle'
+        body.append(_text(lx, ly, etiqueta, size=11, anchor=anchor))
+
+        px = ox + 0.6 * r * math.cos(medio)
+        py = oy - 0.6 * r * math.sin(medio)
+        body.append(_text(px, py, '%1.1f%%' % (frac * 100), size=11))
+
+        theta = theta2
+
+    return _svg(400, 400, body)
+
+
+VALOR_MAXIMO_BARRAS = 1e12
+
+
+def _paso_ticks(vmax, n=5):
+    """Paso 'redondo' (1, 2, 2.5, 5 × 10^k) para unos n ticks entre 0 y vmax."""
+    if not math.isfinite(vmax) or vmax <= 0:
+        vmax = 1.0
+    crudo = vmax / n
+    magnitud = 10 ** math.floor(math.log10(crudo))
+    for m in (1, 2, 2.5, 5, 10):
+        if crudo <= m * magnitud:
+            return m * magnitud
+    return 10 * magnitud
+
+
+def _barras(valores, etiquetas, colores, titulo, ylabel):
+    width, height = 500, 400
+    left, right, top, bottom = 70.0, 480.0, 50.0, 350.0
+    alto_util = bottom - top
+
+    # Topado para que vmax * 1.1 y los ticks no se desborden con valores enormes
+    valores = [min(v, VALOR_MAXIMO_BARRAS) for v in valores]
+    vmax = max(valores) if valores and max(valores) > 0 else 1.0
+    paso = _paso_ticks(vmax * 1.1)
+    ymax = math.ceil(vmax * 1.1 / paso) * paso
+
+    def y_de(v):
+        return bottom - alto_util * (v / ymax)
+
+    body = [_text((left + right) / 2, 25, titulo, size=14)]
+
+    # Grilla horizontal y ticks del eje y
+    n_ticks = int(round(ymax / paso))
+    for i in range(n_ticks + 1):
+        v = i * paso
+        y = y_de(v)
+        body.append(f'<line x1="{left}" y1="{y:.2f}" x2="{right}" y2="{y:.2f}" '
+                    f'stroke="{GRIS_GRILLA}" stroke-width="0.8"/>')
+        body.append(_text(left - 8, y, '%g' % v, size=11, anchor='end'))
+
+    body.append(f'<rect x="{left}" y="{top}" width="{right - left}" height="{alto_util}" '
+                f'fill="none" stroke="{GRIS_GRILLA}" stroke-width="1"/>')
+    body.append(_text(22, (top + bottom) / 2, ylabel, size=12,
+                      extra=f' transform="rotate(-90 22 {(top + bottom) / 2:.1f})"'))
+
+    slot = (right - left) / len(valores)
+    ancho = slot * 0.8
+    for i, (v, etiqueta, color) in enumerate(zip(valores, etiquetas, colores)):
+        x = left + slot * i + (slot - ancho) / 2
+        y = y_de(v)
+        body.append(f'<rect x="{x:.2f}" y="{y:.2f}" width="{ancho:.2f}" height="{bottom - y:.2f}" '
+                    f'fill="{color}" stroke="#000000" stroke-width="1"/>')
+        centro = x + ancho / 2
+        body.append(_text(centro, y - 12, f'{v:.1f}', size=10))
+        body.append(_text(centro, bottom + 16, etiqueta, size=11))
+
+    return _svg(width, height, body)
+
+
+def vacation_chart_svg(total, used):
+    total = _num(total)
+    used = _num(used)
+
+    if total <= 0 or used < 0 or used > total:
+        return _mensaje('No hay vacaciones\nasignadas')
+
+    restante = total - used
+    if restante <= 0:
+        return _mensaje('Todas las vacaciones\nya están usadas')
+
+    return _pie([used, restante], ['Usadas', 'Disponibles'],
+                ["#0d6efd", "#198754"], "Vacaciones")
+
+
+def admin_chart_svg(maximo, usados):
+    maximo, usados = _num(maximo), _num(usados)
+    restante = max(0.0, maximo - usados)
+    return _pie([usados, restante], ['Usados', 'Disponibles'],
+                ["#ffc107", "#6c757d"], "Días Administrativos")
+
+
+def hours_chart_svg(aprobadas, compensadas):
+    aprobadas, compensadas = _num(aprobadas), _num(compensadas)
+    restante = max(0.0, aprobadas - compensadas)
+    return _barras([aprobadas, compensadas, restante],
+                   ['Aprobadas', 'Compensadas', 'Disponibles'],
+                   ['#0dcaf0', '#fd7e14', '#20c997'],
+                   "Horas Extras vs. Compensadas", "Horas")
+
+
+_SVGS = {
+    'vacaciones': vacation_chart_svg,
+    'administrativos': admin_chart_svg,
+    'horas': hours_chart_svg,
+}
+
+
+def render_chart_svg(kind, values):
+    """Renderiza el gráfico `kind` con `values` y devuelve los bytes SVG."""
+    return _SVGS[kind](*values)
+
+
+def placeholder_svg(texto='Gráfico no disponible\npor el momento'):
+    """Imagen de reemplazo cuando un gráfico no se pudo renderizar a tiempo."""
+    return _mensaje(texto)
@@ -0,0 +1,72 @@
+"""
+Detección de cruces de fechas entre solicitudes.
+
+Usa el índice R*Tree requests_intervalos (schema.sql), que contiene solo las
+solicitudes pendientes/aprobadas, así que la búsqueda no recorre el historial
+completo del usuario.
+"""
+from contextlib import nullcontext
+
+from utils.dates import fecha_amigable
+
+_SQL_CONFLICTOS = """
+    SELECT r.id, r.request_type, r.start_date, r.end_date, r.status, r.days, r.half_day_part
+    FROM requests_intervalos i
+    JOIN requests r ON r.id = i.id
+    WHERE i.user_min <= :user_id AND i.user_max >= :user_id
+      AND i.inicio <= CAST(julianday(:fin) AS INTEGER)
+      AND i.fin >= CAST(julianday(:inicio) AS INTEGER)
+      AND r.status IN ('pendiente', 'aprobada')
+      {filtro_medio_dia}
+    ORDER BY r.start_date, r.id
+"""
+
+
+def buscar_conflictos(db, user_id, start_date, end_date, half_day_part=None):
+    """
+    Todas las solicitudes pendientes/aprobadas del usuario que se cruzan con
+    [start_date, end_date] (fechas 'YYYY-MM-DD').
+
+    - Sin half_day_part (día completo o rango): choca con cualquier solicitud
+      que se cruce, incluidos los medios días.
+    - Con half_day_part ('AM' / 'PM'): solo choca con solicitudes de uno o más
+      días, o con medios días de la misma jornada.
+    """
+    params = {'user_id': user_id, 'inicio': start_date, 'fin': end_date}
+    filtro = ''
+    if half_day_part:
+        filtro = "AND (r.days >= 1 OR (r.days = 0.5 AND r.half_day_part = :half_day_part))"
+        params['half_day_part'] = half_day_part
+    return db.execute(_SQL_CONFLICTOS.format(filtro_medio_dia=filtro), params).fetchall()
+
+
+def describir_conflictos(conflictos):
+    """Texto para el usuario: '(tipo) estado (inicio a fin [AM/PM])', separados por ';'."""
+    partes = []
+    for c in conflictos:
+        extra = ""
+        if c['days'] == 0.5 and c['half_day_part']:
+            extra = f" ({c['half_day_part']})"
+        partes.append(
+            f"({c['request_type']}) {c['status']} "
+            f"({fecha_amigable(c['start_date'])} a {fecha_amigable(c['end_date'])}{extra})"
+        )
+    return "; ".join(partes)
+
+
+def reconstruir_intervalos(db):
+    """
+    Rehace requests_intervalos desde requests (una transacción; si ya hay una
+    abierta, p. ej. en migrar(), se hace dentro de ella).
+    """
+    with nullcontext() if db.in_transaction else db:
+        db.execute("DELETE FROM requests_intervalos")
+        db.execute("""
+            INSERT INTO requests_intervalos (id, user_min, user_max, inicio, fin)
+            SELECT id, user_id, user_id,
+                   CAST(julianday(start_date) AS INTEGER), CAST(julianday(end_date) AS INTEGER)
+            FROM requests
+            WHERE status IN ('pendiente', 'aprobada')
+              AND julianday(start_date) IS NOT NULL
+              AND julianday(end_date) IS NOT NULL
+        """)
@@ -0,0 +1,148 @@
+"""
+Importación masiva de horas extras desde CSV (planillas de remuneraciones).
+
+Columnas (con encabezado): username, fecha, horas, motivo, doble
+    fecha   'YYYY-MM-DD'
+    horas   número > 0 y hasta MAX_HORAS_FILA ya duplicado (acepta coma decimal)
+    doble   opcional: 1 / si / sí / x / true duplica las horas, como el
+            check "Duplicar horas" del formulario
+
+El archivo se lee fila a fila y se inserta por lotes de `tam_lote` filas
+válidas (executemany + commit por lote), así que un archivo de 100.000 filas
+no se carga completo en memoria. Los usuarios de cada lote se validan con una
+sola consulta. Las filas con error no se insertan y se informan una por una
+a `al_error(linea, username, mensaje)`.
+
+Si el archivo no se puede seguir leyendo a mitad de camino (codificación o
+CSV mal formado), los lotes anteriores ya quedaron guardados: se lanza
+ErrorImportacion con el resumen, que indica hasta qué línea se importó
+('hasta_linea') para volver a subir el resto.
+"""
+import csv
+import json
+import math
+from datetime import datetime
+
+COLUMNAS_OBLIGATORIAS = ('username', 'fecha', 'horas', 'motivo')
+VALORES_DOBLE = {'1', 'si', 'sí', 's', 'x', 'true', 'verdadero'}
+# Máximo por fila (una fecha): 24 horas, ya duplicadas si corresponde
+MAX_HORAS_FILA = 48
+
+_SQL_INSERT = """
+    INSERT INTO horas_extras (empleado_id, fecha, cantidad_horas, motivo, estado, anio)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+class ErrorImportacion(Exception):
+    """
+    El archivo no se puede importar (p. ej. faltan columnas). Si falla después
+    de guardar algún lote, `resumen` trae lo ya importado; si no, es None.
+    """
+
+    def __init__(self, mensaje, resumen=None):
+        super().__init__(mensaje)
+        self.resumen = resumen
+
+
+def _validar_fila(fila):
+    """Retorna (username, fecha, horas, motivo) normalizados o lanza ValueError con el motivo."""
+    username = (fila.get('username') or '').strip()
+    if not username:
+        raise ValueError("Falta el usuario.")
+    fecha = (fila.get('fecha') or '').strip()
+    try:
+        fecha = datetime.strptime(fecha, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError(f"Fecha inválida '{fecha}' (se espera YYYY-MM-DD).")
+    crudo = (fila.get('horas') or '').strip().replace(',', '.')
+    try:
+        horas = float(crudo)
+    except ValueError:
+        raise ValueError(f"Cantidad de horas inválida '{crudo}'.")
+    if not horas > 0:
+        raise ValueError("La cantidad de horas debe ser mayor que cero.")
+    motivo = (fila.get('motivo') or '').strip()
+    if not motivo:
+        raise ValueError("Falta el motivo.")
+    if (fila.get('doble') or '').strip().lower() in VALORES_DOBLE:
+        horas *= 2
+    if not math.isfinite(horas) or horas > MAX_HORAS_FILA:
+        raise ValueError(f"La cantidad de horas no puede superar {MAX_HORAS_FILA} por fila.")
+    return username, fecha, horas, motivo
+
+
+def _usuarios(db, usernames, conocidos):
+    """Completa `conocidos` (username -> (id, activo)) con los usernames que falten, en una consulta."""
+    faltan = [u for u in usernames if u not in conocidos]
+    if faltan:
+        for row in db.execute(
+            "SELECT id, username, activo FROM users WHERE username IN (SELECT value FROM json_each(?))",
+            (json.dumps(faltan),)
+        ):
+            conocidos[row['username']] = (row['id'], row['activo'])
+        for u in faltan:
+            conocidos.setdefault(u, None)
+
+
+def importar_horas_extras(db, archivo, estado='pendiente', tam_lote=1000, al_error=None):
+    """
+    Importa las filas de `archivo` (iterable de texto, p. ej. un archivo abierto
+    con newline='') en horas_extras con el `estado` indicado. Retorna
+    {'leidas', 'insertadas', 'con_error', 'hasta_linea'}; 'hasta_linea' es la
+    última línea del último lote guardado (0 si ninguno).
+    """
+    lector = csv.DictReader(archivo)
+    try:
+        columnas = {c.strip().lower() for c in (lector.fieldnames or [])}
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ErrorImportacion(str(e)) from e
+    faltan = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas]
+    if faltan:
+        raise ErrorImportacion(f"Faltan columnas en el encabezado: {', '.join(faltan)}.")
+    lector.fieldnames = [c.strip().lower() for c in lector.fieldnames]
+
+    resumen = {'leidas': 0, 'insertadas': 0, 'con_error': 0, 'hasta_linea': 0}
+    conocidos = {}
+
+    def error(linea, username, mensaje):
+        resumen['con_error'] += 1
+        if al_error is not None:
+            al_error(linea, username, mensaje)
+
+    def guardar(lote):
+        _usuarios(db, {fila[1] for fila in lote}, conocidos)
+        filas = []
+        for linea, username, fecha, horas, motivo in lote:
+            usuario = conocidos[username]
+            if usuario is None:
+                error(linea, username, "El usuario no existe.")
+            elif not usuario[1]:
+                error(linea, username, "El usuario está deshabilitado.")
+            else:
+                filas.append((usuario[0], fecha, horas, motivo, estado, int(fecha[:4])))
+        with db:
+            db.executemany(_SQL_INSERT, filas)
+        resumen['insertadas'] += len(filas)
+        resumen['hasta_linea'] = lote[-1][0]
+
+    lote = []
+    try:
+        for fila in lector:
+            resumen['leidas'] += 1
+            try:
+                username, fecha, horas, motivo = _validar_fila(fila)
+            except ValueError as e:
+                error(lector.line_num, (fila.get('username') or '').strip(), str(e))
+                continue
+            lote.append((lector.line_num, username, fecha, horas, motivo))
+            if len(lote) >= tam_lote:
+                guardar(lote)
+                lote = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # El lote en curso no se guarda; los anteriores ya están confirmados.
+        # lector.line_num no sirve acá: la decodificación va por bloques adelantada.
+        raise ErrorImportacion(str(e), resumen) from e
+    if lote:
+        guardar(lote)
+    return resumen
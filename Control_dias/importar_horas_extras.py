@@ -0,0 +1,54 @@
+"""
+Importa horas extras desde un CSV (ver importacion_horas.py para el formato).
+
+Uso:
+    python importar_horas_extras.py planilla.csv                 # quedan pendientes
+    python importar_horas_extras.py planilla.csv --aprobadas     # se importan aprobadas
+    python importar_horas_extras.py planilla.csv --errores errores.csv
+
+Las filas con error se escriben como CSV (linea, username, error) en el archivo
+indicado con --errores, o en la salida estándar.
+"""
+import argparse
+import csv
+import sys
+
+from app import create_app
+from models import get_db
+from importacion_horas import importar_horas_extras, ErrorImportacion
+
+parser = argparse.ArgumentParser(description="Importa horas extras desde un CSV.")
+parser.add_argument('archivo')
+parser.add_argument('--aprobadas', action='store_true', help="importar con estado 'aprobado'")
+parser.add_argument('--errores', help="archivo CSV para el detalle de filas con error")
+parser.add_argument('--lote', type=int, default=1000, help="filas por transacción")
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context(), open(args.archivo, encoding='utf-8-sig', newline='') as archivo:
+    salida_errores = open(args.errores, 'w', encoding='utf8', newline='') if args.errores else sys.stdout
+    escritor = csv.writer(salida_errores)
+    escritor.writerow(['linea', 'username', 'error'])
+    try:
+        resumen = importar_horas_extras(
+            get_db(), archivo,
+            estado='aprobado' if args.aprobadas else 'pendiente',
+            tam_lote=args.lote,
+            al_error=lambda linea, username, mensaje: escritor.writerow([linea, username, mensaje]),
+        )
+    except ErrorImportacion as e:
+        print(e, file=sys.stderr)
+        if e.resumen and e.resumen['insertadas']:
+            print(f"Ya se importaron {e.resumen['insertadas']} filas "
+                  f"(hasta la línea {e.resumen['hasta_linea']}).", file=sys.stderr)
+        sys.exit(2)
+    finally:
+        if args.errores:
+            salida_errores.close()
+
+    print(f"{resumen['leidas']} filas leídas, {resumen['insertadas']} insertadas, "
+          f"{resumen['con_error']} con error.", file=sys.stderr)
+
+    # Código de salida 1 si alguna fila no se pudo importar
+    sys.exit(1 if resumen['con_error'] else 0)
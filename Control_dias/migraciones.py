@@ -0,0 +1,250 @@
+"""
+Migraciones del esquema, numeradas y versionadas con PRAGMA user_version.
+
+Al iniciar, migrar() solo lee user_version: si la base ya está al día no
+escribe nada ni toma locks, así que reiniciar muchos workers a la vez no los
+serializa en DDL. Si faltan migraciones, las aplica todas en una sola
+transacción BEGIN IMMEDIATE (un solo lock de escritura) y vuelve a leer la
+versión dentro del lock, por si otro worker ya las aplicó.
+
+Para cambiar el esquema se agrega una migración al final de MIGRACIONES; no
+se modifican las ya publicadas. Todas toleran bases creadas antes de que
+existiera este registro (user_version = 0 con tablas ya creadas).
+"""
+import os
+import sqlite3
+
+RUTA_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+# Año de start_date guardado en requests.anio, para filtrar por año con índices en vez
+# de substr(start_date, 1, 4). Es una columna normal mantenida por triggers (no una
+# columna generada) porque SQLite no usa índices cubrientes sobre columnas generadas.
+# Se crea después de asegurar que exista la columna: las bases antiguas no la traen.
+DDL_ANIO_REQUESTS = """
+CREATE TRIGGER IF NOT EXISTS trg_requests_anio_insert
+AFTER INSERT ON requests
+BEGIN
+    UPDATE requests SET anio = CAST(substr(NEW.start_date, 1, 4) AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_requests_anio_update
+AFTER UPDATE OF start_date ON requests
+BEGIN
+    UPDATE requests SET anio = CAST(substr(NEW.start_date, 1, 4) AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+-- Saldos por usuario: SUM(days) se resuelve solo con el índice
+CREATE INDEX IF NOT EXISTS idx_requests_user_tipo_estado_anio
+    ON requests (user_id, request_type, status, anio, days);
+-- Panel admin: por tipo/estado/año ordenado por start_date
+CREATE INDEX IF NOT EXISTS idx_requests_tipo_estado_anio_fecha
+    ON requests (request_type, status, anio, start_date);
+-- Mis solicitudes: años del usuario y listado por año ordenado por start_date
+CREATE INDEX IF NOT EXISTS idx_requests_user_anio_fecha
+    ON requests (user_id, anio, start_date);
+-- Años disponibles en el panel admin
+CREATE INDEX IF NOT EXISTS idx_requests_anio
+    ON requests (anio);
+"""
+
+
+def _sentencias(sql):
+    """Separa un script SQL en sentencias (respeta los BEGIN ... END de los triggers)."""
+    actual = ''
+    for linea in sql.splitlines(keepends=True):
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            yield actual
+            actual = ''
+
+
+def _ejecutar_script(db, sql):
+    # executescript() hace COMMIT antes de empezar; aquí cada sentencia queda
+    # dentro de la transacción de migrar()
+    for sentencia in _sentencias(sql):
+        db.execute(sentencia)
+
+
+def _columnas(db, tabla):
+    return {row[1] for row in db.execute(f"PRAGMA table_info({tabla})")}
+
+
+def _agregar_columna(db, tabla, columna, definicion):
+    if columna not in _columnas(db, tabla):
+        db.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+
+def _esquema_base(db):
+    with open(RUTA_SCHEMA, encoding='utf8') as f:
+        _ejecutar_script(db, f.read())
+
+
+def _anio_requests(db):
+    _agregar_columna(db, 'requests', 'anio', 'INTEGER')
+    # Filas escritas antes de que existieran los triggers
+    db.execute("""
+        UPDATE requests SET anio = CAST(substr(start_date, 1, 4) AS INTEGER)
+        WHERE anio IS NULL AND start_date IS NOT NULL
+    """)
+    _ejecutar_script(db, DDL_ANIO_REQUESTS)
+
+
+def _reconstruir_derivadas(db):
+    # user_year_balances y requests_intervalos pueden ser nuevas en una base con
+    # datos: se llenan desde las tablas de origen
+    from balances import reconstruir
+    from conflictos import reconstruir_intervalos
+    reconstruir(db)
+    reconstruir_intervalos(db)
+
+
+# Versión de los feeds iCalendar (routes/calendario.py): una fila por usuario y
+# la fila user_id = 0 para el feed del equipo. Los triggers la suben cada vez
+# que cambia una solicitud de vacaciones/administrativo aprobada (o deja de
+# estarlo), así el ETag se resuelve con una búsqueda por clave primaria.
+DDL_VERSIONES_CALENDARIO = """
+CREATE TABLE IF NOT EXISTS versiones_calendario (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    modificado TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_calendario_insert
+AFTER INSERT ON requests
+WHEN NEW.status = 'aprobada' AND NEW.request_type IN ('vacaciones', 'administrativo')
+BEGIN
+    INSERT INTO versiones_calendario (user_id, version, modificado)
+    VALUES (NEW.user_id, 1, datetime('now')), (0, 1, datetime('now'))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, modificado = excluded.modificado;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_calendario_delete
+AFTER DELETE ON requests
+WHEN OLD.status = 'aprobada' AND OLD.request_type IN ('vacaciones', 'administrativo')
+BEGIN
+    INSERT INTO versiones_calendario (user_id, version, modificado)
+    VALUES (OLD.user_id, 1, datetime('now')), (0, 1, datetime('now'))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, modificado = excluded.modificado;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_calendario_update
+AFTER UPDATE OF user_id, request_type, status, start_date, end_date, days, half_day_part ON requests
+WHEN (OLD.status = 'aprobada' AND OLD.request_type IN ('vacaciones', 'administrativo'))
+  OR (NEW.status = 'aprobada' AND NEW.request_type IN ('vacaciones', 'administrativo'))
+BEGIN
+    INSERT INTO versiones_calendario (user_id, version, modificado)
+    VALUES (OLD.user_id, 1, datetime('now')), (NEW.user_id, 1, datetime('now')), (0, 1, datetime('now'))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, modificado = excluded.modificado;
+END;
+"""
+
+
+def _versiones_calendario(db):
+    _ejecutar_script(db, DDL_VERSIONES_CALENDARIO)
+    db.execute("""
+        INSERT OR IGNORE INTO versiones_calendario (user_id, version, modificado)
+        SELECT DISTINCT user_id, 1, datetime('now') FROM requests
+        UNION ALL
+        SELECT 0, 1, datetime('now')
+    """)
+
+
+# Versión de los datos de cada usuario (utils/versiones.py): sube con cualquier
+# escritura en sus requests, horas_extras, horas_compensadas o en su fila de
+# users. Los dashboards y mis_solicitudes la usan como ETag para responder 304.
+_BUMP_USUARIO = """
+    INSERT INTO versiones_usuario (user_id, version, modificado)
+    VALUES ({user_id}, 1, datetime('now'))
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, modificado = excluded.modificado;
+"""
+
+DDL_VERSIONES_USUARIO = """
+CREATE TABLE IF NOT EXISTS versiones_usuario (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    modificado TEXT NOT NULL
+) WITHOUT ROWID;
+""" + "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS trg_version_{nombre}
+AFTER {evento} ON {tabla}
+BEGIN{''.join(_BUMP_USUARIO.format(user_id=u) for u in usuarios)}END;
+"""
+    for nombre, evento, tabla, usuarios in (
+        ('requests_insert', 'INSERT', 'requests', ('NEW.user_id',)),
+        ('requests_update', 'UPDATE', 'requests', ('OLD.user_id', 'NEW.user_id')),
+        ('requests_delete', 'DELETE', 'requests', ('OLD.user_id',)),
+        ('extras_insert', 'INSERT', 'horas_extras', ('CAST(NEW.empleado_id AS INTEGER)',)),
+        ('extras_update', 'UPDATE', 'horas_extras',
+         ('CAST(OLD.empleado_id AS INTEGER)', 'CAST(NEW.empleado_id AS INTEGER)')),
+        ('extras_delete', 'DELETE', 'horas_extras', ('CAST(OLD.empleado_id AS INTEGER)',)),
+        ('compensadas_insert', 'INSERT', 'horas_compensadas', ('CAST(NEW.empleado_id AS INTEGER)',)),
+        ('compensadas_update', 'UPDATE', 'horas_compensadas',
+         ('CAST(OLD.empleado_id AS INTEGER)', 'CAST(NEW.empleado_id AS INTEGER)')),
+        ('compensadas_delete', 'DELETE', 'horas_compensadas', ('CAST(OLD.empleado_id AS INTEGER)',)),
+        ('users_update', 'UPDATE OF username, role, dias_vacaciones, activo', 'users', ('NEW.id',)),
+    )
+)
+
+
+def _versiones_usuario(db):
+    _ejecutar_script(db, DDL_VERSIONES_USUARIO)
+
+
+# API v1 (routes/api.py): listado de solicitudes sin filtro de año, paginado
+# por (start_date, id); el id va implícito en el índice como rowid
+DDL_INDICES_API = """
+CREATE INDEX IF NOT EXISTS idx_requests_user_fecha
+    ON requests (user_id, start_date);
+CREATE INDEX IF NOT EXISTS idx_requests_fecha
+    ON requests (start_date);
+"""
+
+
+# (versión, descripción, función que recibe la conexión)
+MIGRACIONES = [
+    (1, "Esquema base (schema.sql)", _esquema_base),
+    (2, "requests.anio con triggers e índices", _anio_requests),
+    (3, "users.activo",
+     lambda db: _agregar_columna(db, 'users', 'activo', 'INTEGER NOT NULL DEFAULT 1')),
+    (4, "requests.half_day_part",
+     lambda db: _agregar_columna(db, 'requests', 'half_day_part', 'TEXT')),
+    (5, "Reconstruir saldos e intervalos", _reconstruir_derivadas),
+    (6, "Versiones de los feeds iCalendar", _versiones_calendario),
+    (7, "Versiones de datos por usuario", _versiones_usuario),
+    (8, "Índices por fecha para la API", lambda db: _ejecutar_script(db, DDL_INDICES_API)),
+    (9, "users.secreto_feed",
+     lambda db: _agregar_columna(db, 'users', 'secreto_feed', 'TEXT')),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def version_esquema(db):
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(db):
+    """
+    Aplica las migraciones pendientes y retorna la lista de versiones aplicadas
+    (vacía si la base ya estaba al día).
+    """
+    if version_esquema(db) >= VERSION_ACTUAL:
+        return []
+
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        version = version_esquema(db)
+        aplicadas = []
+        for numero, _descripcion, aplicar in MIGRACIONES:
+            if numero > version:
+                aplicar(db)
+                aplicadas.append(numero)
+        db.execute(f"PRAGMA user_version = {VERSION_ACTUAL}")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return aplicadas
@@ -1,9 +1,21 @@
+import os
+import queue
 import sqlite3
+import threading
 from flask import current_app, g
-from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
+from utils.metricas import ConexionMedida
+
+class User:
+    """
+    Usuario de la sesión (interfaz de Flask-Login). Es liviano (__slots__)
+    porque se guarda en la caché de usuarios (utils/user_cache.py).
+    """
+    __slots__ = ('id', 'username', 'role', 'dias_vacaciones', 'activo')
+
+    is_authenticated = True
+    is_anonymous = False
 
-class User(UserMixin):
     def __init__(self, id, username, role, dias_vacaciones=0, activo=1):
         self.id = id
         self.username = username
@@ -11,24 +23,179 @@ class User(UserMixin):
         self.dias_vacaciones = dias_vacaciones
         self.activo = activo
 
+    @classmethod
+    def desde_fila(cls, row):
+        return cls(row['id'], row['username'], row['role'], row['dias_vacaciones'], row['activo'])
+
+    @property
+    def is_active(self):
+        return self.activo != 0
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, User):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite por proceso (worker). Cada request toma una
+    conexión en get_db() y la devuelve en close_db(). Las conexiones se
+    configuran una sola vez al crearlas: WAL, busy_timeout, synchronous=NORMAL,
+    mmap y tamaño de caché, además de la caché de sentencias de sqlite3.
+    """
+
+    def __init__(self, database, size=5, timeout=10.0, busy_timeout_ms=5000,
+                 journal_mode='WAL', synchronous='NORMAL', cache_size_kb=20000,
+                 mmap_size=256 * 1024 * 1024, statement_cache=256, instrumentar=False):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.statement_cache = statement_cache
+        self.instrumentar = instrumentar
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self.stats = {'creadas': 0, 'reutilizadas': 0, 'esperas': 0,
+                      'timeouts': 0, 'descartadas': 0, 'en_uso': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config['DATABASE'],
+            size=config.get('DB_POOL_SIZE', 5),
+            timeout=config.get('DB_POOL_TIMEOUT', 10.0),
+            busy_timeout_ms=config.get('DB_BUSY_TIMEOUT_MS', 5000),
+            journal_mode=config.get('DB_JOURNAL_MODE', 'WAL'),
+            synchronous=config.get('DB_SYNCHRONOUS', 'NORMAL'),
+            cache_size_kb=config.get('DB_CACHE_SIZE_KB', 20000),
+            mmap_size=config.get('DB_MMAP_SIZE', 256 * 1024 * 1024),
+            statement_cache=config.get('DB_STATEMENT_CACHE', 256),
+            instrumentar=config.get('METRICS_ENABLED', True),
+        )
+
+    def _conectar(self):
+        conn = sqlite3.connect(
+            self.database,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,  # la conexión pasa de un thread a otro vía el pool
+            cached_statements=self.statement_cache,
+            # Con métricas activas, cada consulta se mide (utils/metricas.py)
+            factory=ConexionMedida if self.instrumentar else sqlite3.Connection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            reutilizada = True
+        except queue.Empty:
+            conn = None
+            reutilizada = False
+            with self._lock:
+                if self._creadas < self.size:
+                    self._creadas += 1
+                    crear = True
+                else:
+                    crear = False
+                    self.stats['esperas'] += 1
+            if crear:
+                try:
+                    conn = self._conectar()
+                except Exception:
+                    with self._lock:
+                        self._creadas -= 1
+                    raise
+                with self._lock:
+                    self.stats['creadas'] += 1
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                    reutilizada = True
+                except queue.Empty:
+                    with self._lock:
+                        self.stats['timeouts'] += 1
+                    raise RuntimeError(
+                        f"No hay conexiones libres a la base de datos (pool de {self.size})."
+                    )
+        with self._lock:
+            if reutilizada:
+                self.stats['reutilizadas'] += 1
+            self.stats['en_uso'] += 1
+        return conn
+
+    def release(self, conn, descartar=False):
+        with self._lock:
+            self.stats['en_uso'] -= 1
+        if not descartar:
+            try:
+                # Una transacción abierta (p. ej. por una excepción) no pasa al siguiente request
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                descartar = True
+        if descartar:
+            with self._lock:
+                self._creadas -= 1
+                self.stats['descartadas'] += 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return
+        self._idle.put(conn)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, tamano=self.size, creadas_actuales=self._creadas,
+                        libres=self._idle.qsize(), pid=self.pid)
+
+
+def get_pool(app=None):
+    """Pool del proceso actual; se recrea si el proceso es un fork (p. ej. gunicorn)."""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('db_pool')
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = app.extensions.get('db_pool')
+            if pool is None or pool.pid != os.getpid():
+                pool = app.extensions['db_pool'] = ConnectionPool.from_config(app.config)
+    return pool
+
+_pool_lock = threading.Lock()
+
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
-            current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+        g.db = get_pool().acquire()
     return g.db
 
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        get_pool().release(db)
 
 def init_db():
-    db = get_db()
-    with current_app.open_resource('schema.sql') as f:
-        db.executescript(f.read().decode('utf8'))
+    """Aplica las migraciones pendientes (ver migraciones.py)."""
+    from migraciones import migrar
+    migrar(get_db())
 
 def get_user_by_username(username):
     """Obtiene un usuario por su nombre de usuario."""
@@ -39,14 +206,71 @@ def get_user_by_username(username):
 def create_user(username, password, role='empleado', dias_vacaciones=15):
     """Crea un nuevo usuario con el rol especificado (por defecto 'empleado')."""
     db = get_db()
-    password_hash = generate_password_hash(password)
+    from utils.passwords import METODO_POR_DEFECTO
+    password_hash = generate_password_hash(
+        password, current_app.config.get('PASSWORD_HASH_METHOD', METODO_POR_DEFECTO))
     db.execute("INSERT INTO users (username, password_hash, role, dias_vacaciones) VALUES (?, ?, ?, ?)",
                (username, password_hash, role, dias_vacaciones))
     db.commit()
 
+# Campos de users que se pueden modificar con actualizar_usuario()
+CAMPOS_USUARIO = ('role', 'dias_vacaciones', 'activo')
+
+def cargar_usuario(user_id):
+    """Usuario activo para Flask-Login, desde la caché si está vigente."""
+    from utils.user_cache import get_user_cache
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is not None:
+        return user
+    row = get_db().execute(
+        "SELECT id, username, role, dias_vacaciones, activo FROM users WHERE id = ? AND activo = 1",
+        (user_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return cache.put(user_id, User.desde_fila(row))
+
+def actualizar_usuario(user_id, **campos):
+    """
+    Actualiza role / dias_vacaciones / activo de un usuario y lo saca de la
+    caché de usuarios, para que el cambio (p. ej. una desactivación) rija desde
+    el próximo request.
+    """
+    invalidos = set(campos) - set(CAMPOS_USUARIO)
+    if invalidos:
+        raise ValueError(f"Campos no modificables: {', '.join(sorted(invalidos))}")
+    if not campos:
+        return
+    from utils.user_cache import get_user_cache
+    db = get_db()
+    asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+    db.execute(f"UPDATE users SET {asignaciones} WHERE id = ?", (*campos.values(), user_id))
+    db.commit()
+    get_user_cache().invalidar(user_id)
+
 def verify_password(user, password):
-    """Verifica que la contraseña proporcionada coincide con el hash almacenado."""
-    return check_password_hash(user['password_hash'], password)
+    """
+    Verifica que la contraseña proporcionada coincide con el hash almacenado.
+    El cálculo corre en el pool de hashes (utils/passwords.py) y puede lanzar
+    ServidorOcupado. Si la contraseña es correcta y el hash se generó con otro
+    método o parámetros que PASSWORD_HASH_METHOD, se vuelve a generar y guardar;
+    si el pool está ocupado para eso, se deja para el próximo login.
+    """
+    from utils.passwords import get_hash_pool, ServidorOcupado
+    pool = get_hash_pool()
+    if not pool.verificar(user['password_hash'], password):
+        return False
+    if pool.requiere_rehash(user['password_hash']):
+        try:
+            nuevo_hash = pool.generar(password)
+        except ServidorOcupado:
+            # La contraseña ya se verificó: el login no falla por la migración del hash
+            return True
+        db = get_db()
+        db.execute("UPDATE users SET password_hash = ? WHERE id = ?", (nuevo_hash, user['id']))
+        db.commit()
+    return True
 
 def create_request(user_id, request_type, start_date, end_date, days, reason=None, half_day_part=None):
     """
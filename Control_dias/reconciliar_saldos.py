@@ -0,0 +1,34 @@
+"""
+Reconstruye user_year_balances desde requests / horas_extras / horas_compensadas
+e informa las diferencias encontradas.
+
+Uso:
+    python reconciliar_saldos.py               # informa y reconstruye
+    python reconciliar_saldos.py --solo-informe  # solo informa, no modifica nada
+"""
+import sys
+
+from app import create_app
+from models import get_db
+from balances import reconciliar
+
+solo_informe = '--solo-informe' in sys.argv[1:]
+
+app = create_app()
+
+with app.app_context():
+    diferencias = reconciliar(get_db(), aplicar=not solo_informe)
+
+    for d in diferencias:
+        print(f"usuario {d['user_id']} año {d['anio']} {d['columna']}: "
+              f"tabla={d['tabla']:g} origen={d['origen']:g}")
+
+    if not diferencias:
+        print("Sin diferencias: user_year_balances coincide con las tablas de origen.")
+    elif solo_informe:
+        print(f"{len(diferencias)} diferencias (sin cambios, se usó --solo-informe).")
+    else:
+        print(f"{len(diferencias)} diferencias corregidas.")
+
+    # Código de salida 1 si hubo diferencias, para usarlo en monitoreo
+    sys.exit(1 if diferencias else 0)
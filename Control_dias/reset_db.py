@@ -9,7 +9,9 @@ with app.app_context():
     tablas = ['vacaciones', 'horas_extras', 'dias_administrativos', 'horas_compensadas'] # Agregar después 'users', 
     for tabla in tablas:
         db.execute(f"DROP TABLE IF EXISTS {tabla};")
+    # Vuelve a la versión 0 para que init_db() aplique de nuevo todas las migraciones
+    db.execute("PRAGMA user_version = 0")
     db.commit()
-    # Recrea las tablas ejecutando el contenido de schema.sql
+    # Recrea las tablas (migraciones.py, a partir de schema.sql)
     init_db()
     print("Base de datos reseteada correctamente.")
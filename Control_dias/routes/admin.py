@@ -1,9 +1,20 @@
-from flask import Blueprint, render_template, request, redirect, url_for, abort, flash
+from flask import (Blueprint, render_template, request, redirect, url_for, abort, flash, current_app, jsonify,
+                   Response, stream_with_context)
 from flask_login import login_required, current_user
-from models import get_db
+from models import get_db, get_pool
+from balances import iterar_saldos
+import itertools
+import json
 from datetime import datetime
 
-from routes.vacaciones import contar_dias_habiles, feriados_chile  # opcional, para fallback
+from utils.calendar import contar_dias_habiles  # para el fallback de días sin calcular
+from utils.chart_cache import get_chart_cache
+from utils.chart_pool import get_chart_pool
+from utils.csv_stream import filas_csv
+from utils.intentos import get_limitador
+from utils.metricas import get_metricas
+from utils.passwords import get_hash_pool
+from utils.user_cache import get_user_cache
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -34,6 +45,91 @@ def _anio_desde_start_date(start_date: str):
         return None
 
 
+# Secciones del panel: (modulo, estado). Cada una se pagina por separado.
+SECCIONES_PANEL = [
+    (modulo, estado)
+    for modulo in ("horas_compensadas", "horas_extras", "dias_administrativos", "vacaciones")
+    for estado in ("pendiente", "aprobada")
+]
+
+
+def _leer_cursor(raw):
+    # 'YYYY-MM-DD_id' -> ('YYYY-MM-DD', id); cualquier otra cosa = primera página
+    # (también un id que no cabe en un INTEGER de SQLite)
+    if not raw:
+        return None
+    start_date, _, rid = raw.rpartition('_')
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        rid = int(rid)
+    except ValueError:
+        return None
+    if not 0 < rid <= 2 ** 63 - 1:
+        return None
+    return start_date, rid
+
+
+def _escribir_cursor(cursor):
+    return f"{cursor[0]}_{cursor[1]}"
+
+
+def _traer_secciones(db, year, cursores, page_size):
+    """
+    Trae las 8 secciones del panel en una sola consulta: un UNION ALL de
+    búsquedas sobre idx_requests_tipo_estado_anio_fecha, cada una con LIMIT,
+    así el costo no crece con el total de solicitudes del año.
+    Paginación keyset por (start_date, id) descendente.
+    Retorna {(modulo, estado): (filas, cursor_siguiente_o_None)}.
+    """
+    partes = []
+    params = []
+    for modulo, estado in SECCIONES_PANEL:
+        cursor = cursores.get((modulo, estado))
+        filtro_cursor = "AND (r.start_date, r.id) < (?, ?)" if cursor else ""
+        partes.append(f"""
+            SELECT * FROM (
+                SELECT r.id,
+                       r.user_id,
+                       r.request_type,
+                       r.start_date,
+                       r.end_date,
+                       r.days,
+                       r.reason,
+                       r.status,
+                       r.admin_comment,
+                       r.created_at,
+                       u.username
+                FROM requests r
+                JOIN users u ON r.user_id = u.id
+                WHERE r.request_type = ?
+                  AND r.status = ?
+                  AND r.anio = ?
+                  {filtro_cursor}
+                ORDER BY r.start_date DESC, r.id DESC
+                LIMIT ?
+            )""")
+        params += [TIPOS[modulo], estado, year]
+        if cursor:
+            params += list(cursor)
+        params.append(page_size + 1)  # una fila extra para saber si hay más
+
+    secciones = {seccion: [] for seccion in SECCIONES_PANEL}
+    modulo_por_tipo = {tipo: modulo for modulo, tipo in TIPOS.items()}
+    for row in db.execute(" UNION ALL ".join(partes), params):
+        secciones[(modulo_por_tipo[row["request_type"]], row["status"])].append(row)
+
+    resultado = {}
+    for seccion, filas in secciones.items():
+        # UNION ALL no garantiza el orden entre ramas; se reordena (máx. page_size + 1 filas)
+        filas.sort(key=lambda row: (row["start_date"], row["id"]), reverse=True)
+        siguiente = None
+        if len(filas) > page_size:
+            filas = filas[:page_size]
+            siguiente = (filas[-1]["start_date"], filas[-1]["id"])
+        resultado[seccion] = (filas, siguiente)
+    return resultado
+
+
 @admin_bp.route('/panel')
 @login_required
 def admin_panel():
@@ -45,12 +141,11 @@ def admin_panel():
     current_year = datetime.now().year
     selected_year = request.args.get('anio', type=int) or current_year
 
-    # Años disponibles desde requests (derivados de start_date)
+    # Años disponibles desde requests (columna anio, derivada de start_date)
     years_rows = db.execute("""
-        SELECT DISTINCT CAST(substr(start_date, 1, 4) AS INTEGER) AS anio
+        SELECT DISTINCT anio
         FROM requests
-        WHERE start_date IS NOT NULL
-          AND length(start_date) >= 4
+        WHERE anio IS NOT NULL
         ORDER BY anio DESC
     """).fetchall()
 
@@ -62,80 +157,230 @@ def admin_panel():
     if selected_year not in available_years:
         selected_year = available_years[0]
 
-    # Helper para traer solicitudes por tipo/estado/año
-    def traer_solicitudes(request_type, status, year):
-        # Filtramos por año usando start_date
-        return db.execute("""
-            SELECT r.id,
-                   r.user_id,
-                   r.request_type,
-                   r.start_date,
-                   r.end_date,
-                   r.days,
-                   r.reason,
-                   r.status,
-                   r.admin_comment,
-                   r.created_at,
-                   u.username
-            FROM requests r
-            JOIN users u ON r.user_id = u.id
-            WHERE r.request_type = ?
-              AND r.status = ?
-              AND r.start_date IS NOT NULL
-              AND substr(r.start_date, 1, 4) = ?
-            ORDER BY r.start_date DESC, r.id DESC
-        """, (request_type, status, str(year))).fetchall()
+    page_size = current_app.config.get('ADMIN_PANEL_PAGE_SIZE', 50)
 
-    # --- DÍAS ADMINISTRATIVOS ---
-    pending_administrativos = traer_solicitudes("administrativo", "pendiente", selected_year)
-    approved_administrativos = traer_solicitudes("administrativo", "aprobada", selected_year)
+    # Cursor por sección (modulo + estado), p. ej. ?c_vacaciones_aprobada=2026-03-02_15
+    cursores = {}
+    for modulo, estado in SECCIONES_PANEL:
+        cursor = _leer_cursor(request.args.get(f'c_{modulo}_{estado}'))
+        if cursor:
+            cursores[(modulo, estado)] = cursor
+
+    secciones = _traer_secciones(db, selected_year, cursores, page_size)
+
+    # Enlaces "Ver más" por sección (conservan los cursores de las demás)
+    args_actuales = {f'c_{m}_{e}': _escribir_cursor(c) for (m, e), c in cursores.items()}
+    ver_mas = {}
+    for (modulo, estado), (_, siguiente) in secciones.items():
+        if siguiente:
+            args = dict(args_actuales, **{f'c_{modulo}_{estado}': _escribir_cursor(siguiente)})
+            ver_mas[f'{modulo}_{estado}'] = url_for('admin.admin_panel', anio=selected_year, **args)
 
     # --- VACACIONES ---
     # Aquí, days debería venir ya calculado al solicitar. Si por alguna razón viene None, hacemos fallback.
-    pending_vac_rows = traer_solicitudes("vacaciones", "pendiente", selected_year)
     pending_vacaciones = []
-    for row in pending_vac_rows:
+    for row in secciones[('vacaciones', 'pendiente')][0]:
         rec = dict(row)
         if rec.get("days") is None and rec.get("start_date") and rec.get("end_date"):
             try:
                 inicio = datetime.strptime(rec["start_date"], "%Y-%m-%d")
                 fin = datetime.strptime(rec["end_date"], "%Y-%m-%d")
-                rec["dias_solicitados"] = contar_dias_habiles(inicio, fin, feriados_chile)
+                rec["dias_solicitados"] = contar_dias_habiles(inicio, fin)
             except Exception:
                 rec["dias_solicitados"] = 0
         else:
             rec["dias_solicitados"] = int(rec["days"] or 0)
         pending_vacaciones.append(rec)
 
-    approved_vac_rows = traer_solicitudes("vacaciones", "aprobada", selected_year)
     approved_vacaciones = []
-    for row in approved_vac_rows:
+    for row in secciones[('vacaciones', 'aprobada')][0]:
         rec = dict(row)
         rec["dias_solicitados"] = int(rec["days"] or 0)
         approved_vacaciones.append(rec)
 
-    # --- HORAS EXTRAS ---
-    pending_horas_extras = traer_solicitudes("horas_extras", "pendiente", selected_year)
-    approved_horas_extras = traer_solicitudes("horas_extras", "aprobada", selected_year)
-
-    # --- HORAS COMPENSADAS ---
-    pending_horas_compensadas = traer_solicitudes("horas_compensadas", "pendiente", selected_year)
-    approved_horas_compensadas = traer_solicitudes("horas_compensadas", "aprobada", selected_year)
-
     return render_template(
         'admin_panel.html',
         selected_year=selected_year,
         available_years=available_years,
-        pending_administrativos=pending_administrativos,
-        approved_administrativos=approved_administrativos,
+        pending_administrativos=secciones[('dias_administrativos', 'pendiente')][0],
+        approved_administrativos=secciones[('dias_administrativos', 'aprobada')][0],
         pending_vacaciones=pending_vacaciones,
         approved_vacaciones=approved_vacaciones,
-        pending_horas_extras=pending_horas_extras,
-        approved_horas_extras=approved_horas_extras,
-        pending_horas_compensadas=pending_horas_compensadas,
-        approved_horas_compensadas=approved_horas_compensadas
+        pending_horas_extras=secciones[('horas_extras', 'pendiente')][0],
+        approved_horas_extras=secciones[('horas_extras', 'aprobada')][0],
+        pending_horas_compensadas=secciones[('horas_compensadas', 'pendiente')][0],
+        approved_horas_compensadas=secciones[('horas_compensadas', 'aprobada')][0],
+        ver_mas=ver_mas,
+        paginado=bool(cursores),
+    )
+
+
+def _anio_formulario(raw):
+    try:
+        return int(raw) if raw else datetime.now().year
+    except (TypeError, ValueError):
+        return datetime.now().year
+
+
+# Orden en que se evalúa un lote: al aprobar, primero las horas extras (dan saldo
+# a las compensadas del mismo lote); al rechazar/restituir, primero las
+# compensadas (liberan a las horas extras de las que dependen)
+_PRIORIDAD_APROBAR = {"horas_extras": 0, "vacaciones": 1, "administrativo": 1, "horas_compensadas": 2}
+_PRIORIDAD_RESTITUIR = {"horas_compensadas": 0, "vacaciones": 1, "administrativo": 1, "horas_extras": 2}
+
+
+def _evaluar_cambios(db, ids, nuevo_estado, request_type=None, anio_defecto=None):
+    """
+    Valida el cambio de estado de varias solicitudes a la vez y retorna
+    (resultados, aprobadas_ids): un resultado por id en el orden recibido
+    ({'id', 'ok', 'mensaje'}) y los ids que se pueden actualizar.
+
+    Los saldos se leen una vez por lote (vacaciones desde user_year_balances,
+    horas desde requests agrupadas por usuario, año y tipo) y se van
+    acumulando en memoria: cada solicitud se valida contra lo aprobado en la
+    base más lo que ya se aceptó en el lote.
+    """
+    ids = list(dict.fromkeys(ids))
+    solicitudes = {
+        row["id"]: row
+        for row in db.execute("""
+            SELECT r.*, u.dias_vacaciones, u.username
+            FROM requests r
+            JOIN users u ON r.user_id = u.id
+            WHERE r.id IN (SELECT value FROM json_each(?))
+              AND (? IS NULL OR r.request_type = ?)
+        """, (json.dumps(ids), request_type, request_type))
+    }
+
+    def anio_de(sol):
+        return _anio_desde_start_date(sol["start_date"]) or anio_defecto
+
+    # Totales aprobados por (usuario, año): {tipo: [suma, cantidad]}
+    pares = sorted({(sol["user_id"], anio_de(sol)) for sol in solicitudes.values()}, key=str)
+    totales = {par: {} for par in pares}
+    pares_json = json.dumps(pares)
+    # Vacaciones: una búsqueda por clave primaria en user_year_balances por par
+    for row in db.execute("""
+        SELECT b.user_id, b.anio, b.vac_usadas
+        FROM user_year_balances b
+        JOIN (
+            SELECT json_extract(value, '$[0]') AS user_id, json_extract(value, '$[1]') AS anio
+            FROM json_each(?)
+        ) p ON b.user_id = p.user_id AND b.anio = p.anio
+    """, (pares_json,)):
+        totales[(row["user_id"], row["anio"])]["vacaciones"] = [float(row["vac_usadas"]), 0]
+    # Horas como solicitudes (request_type horas_extras / horas_compensadas): no
+    # están en user_year_balances, que suma las tablas horas_extras y
+    # horas_compensadas; además hace falta la cantidad de compensadas aprobadas
+    for row in db.execute("""
+        SELECT r.user_id, r.anio, r.request_type, COALESCE(SUM(r.days), 0) AS total, COUNT(*) AS cantidad
+        FROM requests r
+        JOIN (
+            SELECT json_extract(value, '$[0]') AS user_id, json_extract(value, '$[1]') AS anio
+            FROM json_each(?)
+        ) p ON r.user_id = p.user_id AND r.anio = p.anio
+        WHERE r.request_type IN ('horas_extras', 'horas_compensadas')
+          AND r.status = 'aprobada'
+        GROUP BY r.user_id, r.anio, r.request_type
+    """, (pares_json,)):
+        totales[(row["user_id"], row["anio"])][row["request_type"]] = [float(row["total"]), row["cantidad"]]
+
+    prioridad = _PRIORIDAD_APROBAR if nuevo_estado == "aprobada" else _PRIORIDAD_RESTITUIR
+    orden = sorted(
+        solicitudes.values(),
+        key=lambda sol: (prioridad.get(sol["request_type"], 1), sol["start_date"] or "", sol["id"])
     )
 
+    mensajes = {}
+    aceptadas = []
+    for sol in orden:
+        request_type_sol = sol["request_type"]
+        estado_anterior = sol["status"]
+        dias = float(sol["days"] or 0)
+        saldo = totales[(sol["user_id"], anio_de(sol))]
+        vac = saldo.setdefault("vacaciones", [0.0, 0])
+        extras = saldo.setdefault("horas_extras", [0.0, 0])
+        comp = saldo.setdefault("horas_compensadas", [0.0, 0])
+        era_aprobada = estado_anterior == "aprobada"
+        sera_aprobada = nuevo_estado == "aprobada"
+
+        # Los saldos por año (user_year_balances) necesitan el año de start_date
+        if (sera_aprobada and request_type_sol in ("vacaciones", "administrativo")
+                and _anio_desde_start_date(sol["start_date"]) is None):
+            mensajes[sol["id"]] = "No se puede aprobar: la solicitud no tiene una fecha de inicio válida."
+            continue
+
+        # VACACIONES: no aprobar si supera días asignados
+        if request_type_sol == "vacaciones":
+            usadas = vac[0] - (dias if era_aprobada else 0)
+            if sera_aprobada:
+                asignadas = int(sol["dias_vacaciones"] or 0)
+                dias_solicitados = int(dias)
+                if int(usadas) + dias_solicitados > asignadas:
+                    restantes = max(0, asignadas - int(usadas))
+                    mensajes[sol["id"]] = f"No puedes aprobar {dias_solicitados} días: solo quedan {restantes}."
+                    continue
+            vac[0] = usadas + (dias if sera_aprobada else 0)
+
+        # HORAS EXTRAS: si se intenta "des-aprobar" y existen compensadas aprobadas, bloquear
+        elif request_type_sol == "horas_extras":
+            if era_aprobada and nuevo_estado in ("pendiente", "rechazada") and comp[1] > 0:
+                mensajes[sol["id"]] = (
+                    "No se puede restituir horas extras porque existen horas compensadas "
+                    "aprobadas que dependen de ellas."
+                )
+                continue
+            extras[0] += (dias if sera_aprobada else 0) - (dias if era_aprobada else 0)
+
+        # HORAS COMPENSADAS: al aprobar, validar disponibilidad contra horas extras aprobadas
+        elif request_type_sol == "horas_compensadas":
+            otras = comp[0] - (dias if era_aprobada else 0)
+            if sera_aprobada:
+                disponibles_horas = extras[0] - otras
+                if dias > disponibles_horas:
+                    mensajes[sol["id"]] = (
+                        f"No puedes aprobar {dias:.1f} horas compensadas: "
+                        f"solo quedan {disponibles_horas:.1f} horas extras disponibles."
+                    )
+                    continue
+            comp[0] = otras + (dias if sera_aprobada else 0)
+            comp[1] += int(sera_aprobada) - int(era_aprobada)
+
+        aceptadas.append(sol["id"])
+
+    resultados = []
+    for solicitud_id in ids:
+        if solicitud_id not in solicitudes:
+            resultados.append({"id": solicitud_id, "ok": False, "mensaje": "Solicitud no encontrada."})
+        elif solicitud_id in mensajes:
+            resultados.append({"id": solicitud_id, "ok": False, "mensaje": mensajes[solicitud_id]})
+        else:
+            resultados.append({"id": solicitud_id, "ok": True, "mensaje": "Estado actualizado correctamente."})
+    return resultados, aceptadas
+
+
+def _aplicar_cambios(db, ids, nuevo_estado, request_type=None, anio_defecto=None):
+    """
+    Valida y actualiza las solicitudes en una sola transacción (BEGIN IMMEDIATE:
+    nadie más aprueba entre la lectura de saldos y la escritura).
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        resultados, aceptadas = _evaluar_cambios(db, ids, nuevo_estado, request_type, anio_defecto)
+        db.executemany("""
+            UPDATE requests
+            SET status = ?,
+                reviewed_by = ?,
+                reviewed_at = datetime('now'),
+                updated_at = datetime('now')
+            WHERE id = ?
+        """, [(nuevo_estado, current_user.id, solicitud_id) for solicitud_id in aceptadas])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return resultados
+
 
 @admin_bp.route('/actualizar_estado', methods=['POST'])
 @login_required
@@ -144,15 +389,9 @@ def actualizar_estado():
         abort(403)
 
     modulo = request.form.get('modulo')  # mantenemos compatibilidad con tu form actual
-    solicitud_id = request.form.get('solicitud_id')
+    solicitud_id = request.form.get('solicitud_id', type=int)
     nuevo_estado_raw = request.form.get('nuevo_estado')
-
-    raw = request.form.get('anio')
-    try:
-        selected_year = int(raw) if raw else datetime.now().year
-    except ValueError:
-        selected_year = datetime.now().year
-
+    selected_year = _anio_formulario(request.form.get('anio'))
 
     if not solicitud_id or not nuevo_estado_raw:
         flash("Faltan datos para actualizar el estado.", "error")
@@ -164,124 +403,208 @@ def actualizar_estado():
         flash("Estado inválido.", "error")
         return redirect(url_for('admin.admin_panel', anio=selected_year))
 
-    db = get_db()
+    # Si el form no manda modulo, igual se busca por id
+    resultado, = _aplicar_cambios(get_db(), [solicitud_id], nuevo_estado,
+                                  TIPOS.get(modulo), selected_year)
+    flash(resultado["mensaje"], "success" if resultado["ok"] else "error")
+    return redirect(url_for('admin.admin_panel', anio=selected_year))
 
-    # Determinar request_type esperado según "modulo" (si viene)
-    request_type_esperado = None
-    if modulo in TIPOS:
-        request_type_esperado = TIPOS[modulo]
 
-    # Cargar solicitud desde requests
-    if request_type_esperado:
-        sol = db.execute("""
-            SELECT r.*, u.dias_vacaciones, u.username
-            FROM requests r
-            JOIN users u ON r.user_id = u.id
-            WHERE r.id = ? AND r.request_type = ?
-        """, (solicitud_id, request_type_esperado)).fetchone()
-    else:
-        # fallback: si el form no manda modulo, igual buscamos por id
-        sol = db.execute("""
-            SELECT r.*, u.dias_vacaciones, u.username
-            FROM requests r
-            JOIN users u ON r.user_id = u.id
-            WHERE r.id = ?
-        """, (solicitud_id,)).fetchone()
+@admin_bp.route('/actualizar_estado_lote', methods=['POST'])
+@login_required
+def actualizar_estado_lote():
+    """
+    Aprueba / rechaza / restituye varias solicitudes en una transacción.
+    Recibe el formulario del panel (solicitud_id repetido, nuevo_estado, modulo,
+    anio) o JSON {"solicitud_ids": [...], "nuevo_estado": ..., "modulo": ...}.
+    Las que no pasan la validación de saldos se informan y no se modifican; el
+    resto se actualiza igual. Con JSON responde el resultado de cada solicitud.
+    """
+    if current_user.role != 'administrador':
+        abort(403)
 
-    if not sol:
-        flash("Solicitud no encontrada.", "error")
+    datos = request.get_json(silent=True) if request.is_json else None
+    if datos is not None and not isinstance(datos, dict):
+        return jsonify({"error": "El cuerpo JSON debe ser un objeto."}), 400
+    if datos is not None:
+        crudos = datos.get('solicitud_ids') or []
+        nuevo_estado_raw = datos.get('nuevo_estado')
+        modulo = datos.get('modulo')
+        selected_year = _anio_formulario(datos.get('anio'))
+    else:
+        crudos = request.form.getlist('solicitud_id')
+        nuevo_estado_raw = request.form.get('nuevo_estado')
+        modulo = request.form.get('modulo')
+        selected_year = _anio_formulario(request.form.get('anio'))
+
+    ids = []
+    for valor in crudos if isinstance(crudos, list) else []:
+        try:
+            ids.append(int(valor))
+        except (TypeError, ValueError):
+            pass
+    # En JSON puede venir cualquier tipo (una lista no se puede buscar en el dict)
+    nuevo_estado = MAP_ESTADOS.get(nuevo_estado_raw) if isinstance(nuevo_estado_raw, str) else None
+    limite = current_app.config.get('ADMIN_LOTE_MAX', 1000)
+
+    if not ids or nuevo_estado is None or len(ids) > limite:
+        if len(ids) > limite:
+            error = f"Se pueden actualizar hasta {limite} solicitudes por vez."
+        elif not ids:
+            error = "No se seleccionó ninguna solicitud."
+        else:
+            error = "Estado inválido."
+        if datos is not None:
+            return jsonify({"error": error}), 400
+        flash(error, "error")
         return redirect(url_for('admin.admin_panel', anio=selected_year))
 
-    request_type = sol["request_type"]
-    user_id = sol["user_id"]
-    estado_anterior = sol["status"]
-    anio_sol = _anio_desde_start_date(sol["start_date"]) or selected_year
-
-    # --- Validaciones por tipo ---
-    # VACACIONES: no aprobar si supera días asignados
-    if request_type == "vacaciones" and nuevo_estado == "aprobada":
-        asignadas = int(sol["dias_vacaciones"] or 0)
-        dias_solicitados = int(sol["days"] or 0)
-
-        usadas_row = db.execute("""
-            SELECT COALESCE(SUM(days), 0) AS usadas
-            FROM requests
-            WHERE user_id = ?
-              AND request_type = 'vacaciones'
-              AND status = 'aprobada'
-              AND substr(start_date, 1, 4) = ?
-              AND id <> ?
-        """, (user_id, str(anio_sol), sol["id"])).fetchone()
-        usadas = int(usadas_row["usadas"] or 0)
-
-        if usadas + dias_solicitados > asignadas:
-            restantes = max(0, asignadas - usadas)
-            flash(f"No puedes aprobar {dias_solicitados} días: solo quedan {restantes}.", "error")
-            return redirect(url_for('admin.admin_panel', anio=selected_year))
-
-    # HORAS EXTRAS: si se intenta "des-aprobar" y existen compensadas aprobadas, bloquear
-    if request_type == "horas_extras":
-        if nuevo_estado in ["pendiente", "rechazada"] and estado_anterior == "aprobada":
-            comp_count_row = db.execute("""
-                SELECT COUNT(*) AS cnt
-                FROM requests
-                WHERE user_id = ?
-                  AND request_type = 'horas_compensadas'
-                  AND status = 'aprobada'
-                  AND substr(start_date, 1, 4) = ?
-            """, (user_id, str(anio_sol))).fetchone()
-            comp_count = int(comp_count_row["cnt"] or 0)
-            if comp_count > 0:
-                flash(
-                    "No se puede restituir horas extras porque existen horas compensadas aprobadas que dependen de ellas.",
-                    "error"
-                )
-                return redirect(url_for('admin.admin_panel', anio=selected_year))
-
-    # HORAS COMPENSADAS: al aprobar, validar disponibilidad contra horas extras aprobadas
-    if request_type == "horas_compensadas" and nuevo_estado == "aprobada":
-        hc_solicitadas = float(sol["days"] or 0)
-
-        total_extras_row = db.execute("""
-            SELECT COALESCE(SUM(days), 0) AS total
-            FROM requests
-            WHERE user_id = ?
-              AND request_type = 'horas_extras'
-              AND status = 'aprobada'
-              AND substr(start_date, 1, 4) = ?
-        """, (user_id, str(anio_sol))).fetchone()
-        total_extras = float(total_extras_row["total"] or 0)
-
-        total_comp_otros_row = db.execute("""
-            SELECT COALESCE(SUM(days), 0) AS total
-            FROM requests
-            WHERE user_id = ?
-              AND request_type = 'horas_compensadas'
-              AND status = 'aprobada'
-              AND substr(start_date, 1, 4) = ?
-              AND id <> ?
-        """, (user_id, str(anio_sol), sol["id"])).fetchone()
-        total_comp_otros = float(total_comp_otros_row["total"] or 0)
-
-        disponibles_horas = total_extras - total_comp_otros
-        if hc_solicitadas > disponibles_horas:
-            flash(
-                f"No puedes aprobar {hc_solicitadas:.1f} horas compensadas: "
-                f"solo quedan {disponibles_horas:.1f} horas extras disponibles.",
-                "error"
-            )
-            return redirect(url_for('admin.admin_panel', anio=selected_year))
-
-    # --- Actualizar estado en requests ---
-    db.execute("""
-        UPDATE requests
-        SET status = ?,
-            reviewed_by = ?,
-            reviewed_at = datetime('now'),
-            updated_at = datetime('now')
-        WHERE id = ?
-    """, (nuevo_estado, current_user.id, sol["id"]))
-
-    db.commit()
-    flash("Estado actualizado correctamente.", "success")
+    resultados = _aplicar_cambios(get_db(), ids, nuevo_estado, TIPOS.get(modulo), selected_year)
+    actualizadas = sum(1 for r in resultados if r["ok"])
+
+    if datos is not None:
+        return jsonify({"actualizadas": actualizadas, "resultados": resultados})
+
+    if actualizadas:
+        flash(f"{actualizadas} solicitudes actualizadas correctamente.", "success")
+    for r in resultados:
+        if not r["ok"]:
+            flash(f"Solicitud {r['id']}: {r['mensaje']}", "error")
     return redirect(url_for('admin.admin_panel', anio=selected_year))
+
+
+def _filtro_anio_export():
+    """Año pedido en ?anio= (None = todos los años); lanza 400 si no es un año válido."""
+    raw = request.args.get('anio')
+    if not raw:
+        return None
+    try:
+        anio = int(raw)
+    except ValueError:
+        abort(400, description="anio inválido")
+    # Fuera del rango de SQLite fallaría recién al enviar el CSV, después del 200
+    if not 1 <= anio <= 9999:
+        abort(400, description="anio inválido")
+    return anio
+
+
+_SIN_FILAS = object()
+
+
+def _respuesta_csv(nombre, encabezado, filas):
+    # La primera fila se lee antes de responder: si la consulta falla es un 500,
+    # no un 200 con un CSV cortado. stream_with_context mantiene el contexto (y
+    # la conexión de get_db) hasta terminar de enviar; el resto de las filas se
+    # leen del cursor a medida que se envían
+    filas = iter(filas)
+    primera = next(filas, _SIN_FILAS)
+    if primera is not _SIN_FILAS:
+        filas = itertools.chain((primera,), filas)
+    return Response(
+        stream_with_context(filas_csv(encabezado, filas)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{nombre}"'},
+    )
+
+
+@admin_bp.route('/export/requests.csv')
+@login_required
+def exportar_solicitudes():
+    """
+    Solicitudes en CSV para remuneraciones. Filtros opcionales: anio, tipo
+    (módulo del panel o request_type) y estado (aprobado/aprobada, ...).
+    """
+    if current_user.role != 'administrador':
+        abort(403)
+
+    anio = _filtro_anio_export()
+    tipo = request.args.get('tipo') or None
+    if tipo is not None:
+        tipo = TIPOS.get(tipo, tipo)
+        if tipo not in TIPOS.values():
+            abort(400, description="tipo inválido")
+    estado = request.args.get('estado') or None
+    if estado is not None:
+        estado = MAP_ESTADOS.get(estado)
+        if estado is None:
+            abort(400, description="estado inválido")
+
+    # Solo las condiciones pedidas, para que SQLite use los índices por anio/tipo/estado
+    filtros = {'r.anio': anio, 'r.request_type': tipo, 'r.status': estado}
+    condiciones = [f"{columna} = ?" for columna, valor in filtros.items() if valor is not None]
+    params = [valor for valor in filtros.values() if valor is not None]
+
+    def filas():
+        cursor = get_db().execute(f"""
+            SELECT r.id, u.username, r.request_type, r.status, r.start_date, r.end_date,
+                   r.days, r.half_day_part, r.reason, r.created_at, rv.username, r.reviewed_at
+            FROM requests r
+            JOIN users u ON u.id = r.user_id
+            LEFT JOIN users rv ON rv.id = r.reviewed_by
+            {'WHERE ' + ' AND '.join(condiciones) if condiciones else ''}
+            ORDER BY r.id
+        """, params)
+        yield from cursor
+
+    nombre = f"solicitudes_{anio or 'todas'}.csv"
+    encabezado = ['id', 'username', 'tipo', 'estado', 'fecha_inicio', 'fecha_fin', 'dias',
+                  'jornada', 'motivo', 'creada', 'revisada_por', 'revisada']
+    return _respuesta_csv(nombre, encabezado, filas())
+
+
+@admin_bp.route('/export/balances.csv')
+@login_required
+def exportar_saldos():
+    """Saldos por usuario en CSV: del año ?anio= (todos los usuarios) o de todos los años."""
+    if current_user.role != 'administrador':
+        abort(403)
+
+    anio = _filtro_anio_export()
+
+    def filas():
+        for anio_fila, s in iterar_saldos(get_db(), anio):
+            yield (anio_fila, s['username'], s['vac_total'], s['vac_usadas'], s['vac_disponibles'],
+                   s['admin_usados'], s['admin_disponibles'], s['horas_extras'],
+                   s['horas_compensadas'], s['horas_disponibles'])
+
+    nombre = f"saldos_{anio or 'todos'}.csv"
+    encabezado = ['anio', 'username', 'vac_total', 'vac_usadas', 'vac_disponibles',
+                  'admin_usados', 'admin_disponibles', 'horas_extras',
+                  'horas_compensadas', 'horas_disponibles']
+    return _respuesta_csv(nombre, encabezado, filas())
+
+
+@admin_bp.route('/estado_db')
+@login_required
+def estado_db():
+    """Estadísticas del pool de conexiones SQLite de este worker (JSON)."""
+    if current_user.role != 'administrador':
+        abort(403)
+    return jsonify(get_pool().snapshot())
+
+
+@admin_bp.route('/estado_cache')
+@login_required
+def estado_cache():
+    """Cachés y contadores en memoria de este worker: usuarios, gráficos, render, hashes y login (JSON)."""
+    if current_user.role != 'administrador':
+        abort(403)
+    return jsonify({
+        'usuarios': get_user_cache().stats(),
+        'graficos': get_chart_cache().stats(),
+        'render_graficos': get_chart_pool().snapshot(),
+        'hashes': get_hash_pool().snapshot(),
+        'login': get_limitador().stats(),
+    })
+
+
+@admin_bp.route('/metrics')
+@login_required
+def metrics():
+    """Histogramas por endpoint de este worker, en formato de texto de Prometheus."""
+    if current_user.role != 'administrador':
+        abort(403)
+    metricas = get_metricas()
+    if metricas is None:
+        abort(404)  # METRICS_ENABLED = False
+    return Response(metricas.prometheus(), mimetype='text/plain; version=0.0.4')
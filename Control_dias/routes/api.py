@@ -0,0 +1,279 @@
+"""
+API JSON v1 para integraciones (portal de RR.HH., remuneraciones, bot de Slack).
+
+Usa la misma sesión de Flask-Login que las páginas y las mismas consultas que
+los blueprints (balances.py, índices de requests), pero sin plantillas ni
+gráficos. Un empleado solo ve sus propios datos; un administrador, los de todos.
+
+- Paginación con cursor opaco (firmado con SECRET_KEY): ?cursor=...&limit=...
+  Solicitudes por (start_date, id) descendente; saldos por id de usuario.
+- Selección de campos: ?fields=id,status,start_date
+- Saldos de varios usuarios en una consulta: /api/v1/balances?user_ids=1,2,3
+- Los errores (también 404/405 de rutas inexistentes bajo /api/v1) son JSON.
+"""
+import math
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.exceptions import HTTPException
+
+from balances import pagina_saldos, saldo_usuario, saldos_usuarios
+from models import get_db
+
+api_bp = Blueprint('api', __name__)
+
+# Campo de la API -> expresión SQL
+CAMPOS_SOLICITUD = {
+    'id': 'r.id',
+    'user_id': 'r.user_id',
+    'username': 'u.username',
+    'request_type': 'r.request_type',
+    'status': 'r.status',
+    'start_date': 'r.start_date',
+    'end_date': 'r.end_date',
+    'days': 'r.days',
+    'half_day_part': 'r.half_day_part',
+    'reason': 'r.reason',
+    'admin_comment': 'r.admin_comment',
+    'created_at': 'r.created_at',
+    'reviewed_at': 'r.reviewed_at',
+    'anio': 'r.anio',
+}
+
+CAMPOS_SALDO = (
+    'user_id', 'username', 'anio',
+    'vac_total', 'vac_usadas', 'vac_disponibles',
+    'admin_max', 'admin_usados', 'admin_disponibles',
+    'horas_extras', 'horas_compensadas', 'horas_disponibles',
+)
+
+ESTADOS = ('pendiente', 'aprobada', 'rechazada')
+MAX_ENTERO = 2 ** 63 - 1  # INTEGER de SQLite
+TIPOS = ('vacaciones', 'administrativo', 'horas_extras', 'horas_compensadas')
+
+
+PREFIJO = '/api/v1'
+
+
+def _finitos(datos):
+    # NaN / Infinity no son JSON válido: un REAL no finito en la base sale como null
+    if isinstance(datos, float):
+        return datos if math.isfinite(datos) else None
+    if isinstance(datos, dict):
+        return {k: _finitos(v) for k, v in datos.items()}
+    if isinstance(datos, list):
+        return [_finitos(v) for v in datos]
+    return datos
+
+
+def _json(datos, status=200):
+    # JSON compacto (sin espacios, también con debug) y con los campos en el orden pedido
+    cuerpo = current_app.json.dumps(_finitos(datos), separators=(',', ':'), sort_keys=False,
+                                    allow_nan=False)
+    return current_app.response_class(cuerpo, status=status, mimetype='application/json')
+
+
+@api_bp.before_request
+def _requiere_sesion():
+    # Sin sesión: 401 en JSON, no la redirección al login de las páginas
+    if not current_user.is_authenticated:
+        return _json({'error': 'No autenticado'}, 401)
+
+
+@api_bp.errorhandler(HTTPException)
+def _error_json(error):
+    respuesta = _json({'error': error.description}, error.code)
+    if getattr(error, 'valid_methods', None):  # 405: Allow, como en la respuesta HTML
+        respuesta.headers['Allow'] = ', '.join(error.valid_methods)
+    return respuesta
+
+
+@api_bp.app_errorhandler(404)
+@api_bp.app_errorhandler(405)
+def _error_ruteo(error):
+    # Una URL que no calza con ninguna ruta no llega al errorhandler del
+    # blueprint: se maneja a nivel de app y solo se responde JSON bajo /api/v1
+    if request.path == PREFIJO or request.path.startswith(PREFIJO + '/'):
+        return _error_json(error)
+    return error
+
+
+def _es_admin():
+    return current_user.role == 'administrador'
+
+
+def _serializador():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='api-v1-cursor')
+
+
+def _leer_cursor(largo):
+    raw = request.args.get('cursor')
+    if not raw:
+        return None
+    try:
+        cursor = _serializador().loads(raw)
+    except BadSignature:
+        cursor = None
+    # Un cursor de otro endpoint también está firmado: se valida su forma
+    if not isinstance(cursor, list) or len(cursor) != largo:
+        abort(400, "Cursor inválido")
+    return cursor
+
+
+def _limite():
+    maximo = current_app.config.get('API_MAX_PAGE_SIZE', 500)
+    limite = request.args.get('limit', type=int) or current_app.config.get('API_PAGE_SIZE', 100)
+    return max(1, min(limite, maximo))
+
+
+def _campos(disponibles):
+    """Campos pedidos en ?fields= (en el orden pedido), o todos."""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(disponibles)
+    campos = [c.strip() for c in raw.split(',') if c.strip()]
+    desconocidos = [c for c in campos if c not in disponibles]
+    if desconocidos:
+        abort(400, f"Campos desconocidos: {', '.join(desconocidos)}")
+    return campos
+
+
+def _entero(valor, nombre):
+    """`valor` si cabe en un INTEGER de SQLite (o es None); si no, 400."""
+    if valor is not None and not -MAX_ENTERO - 1 <= valor <= MAX_ENTERO:
+        abort(400, f"{nombre} fuera de rango")
+    return valor
+
+
+def _arg_entero(nombre):
+    return _entero(request.args.get(nombre, type=int), nombre)
+
+
+def _anio():
+    return _arg_entero('anio') or datetime.now().year
+
+
+def _ids_usuarios(raw):
+    try:
+        ids = sorted({int(p) for p in raw.split(',') if p.strip()})
+    except ValueError:
+        abort(400, "user_ids debe ser una lista de enteros separados por coma")
+    for user_id in ids:
+        _entero(user_id, 'user_ids')
+    return ids
+
+
+def _recortar(saldo, anio, campos):
+    saldo = dict(saldo, anio=anio)
+    return {c: saldo[c] for c in campos}
+
+
+@api_bp.route('/balances')
+def balances():
+    """
+    Saldos del año ?anio= (por defecto el actual).
+    - ?user_ids=1,2,3: esos usuarios, en una consulta (sin paginar).
+    - Sin user_ids: un administrador recibe todos, paginados; un empleado, el suyo.
+    """
+    db = get_db()
+    anio = _anio()
+    campos = _campos(CAMPOS_SALDO)
+
+    raw_ids = request.args.get('user_ids')
+    if raw_ids is not None or not _es_admin():
+        user_ids = _ids_usuarios(raw_ids) if raw_ids is not None else [current_user.id]
+        if not _es_admin() and user_ids != [current_user.id]:
+            abort(403, "Solo puedes consultar tus propios saldos")
+        limite = current_app.config.get('API_MAX_PAGE_SIZE', 500)
+        if len(user_ids) > limite:
+            abort(400, f"Máximo {limite} usuarios por consulta")
+        saldos = saldos_usuarios(db, user_ids, anio)
+        return _json({
+            'data': [_recortar(saldos[uid], anio, campos) for uid in user_ids if uid in saldos],
+            'next_cursor': None,
+        })
+
+    cursor = _leer_cursor(1)
+    despues_de = cursor[0] if cursor else 0
+    limite = _limite()
+    saldos = pagina_saldos(db, anio, despues_de=despues_de, limite=limite)
+    siguiente = None
+    if len(saldos) == limite:
+        siguiente = _serializador().dumps([saldos[-1]['user_id']])
+    return _json({
+        'data': [_recortar(s, anio, campos) for s in saldos],
+        'next_cursor': siguiente,
+    })
+
+
+@api_bp.route('/users/<int:user_id>/balances')
+def user_balances(user_id):
+    _entero(user_id, 'user_id')
+    if not _es_admin() and user_id != current_user.id:
+        abort(403, "Solo puedes consultar tus propios saldos")
+    anio = _anio()
+    saldo = saldo_usuario(get_db(), user_id, anio)
+    if saldo is None:
+        abort(404, "Usuario no encontrado")
+    return _json({'data': _recortar(saldo, anio, _campos(CAMPOS_SALDO))})
+
+
+@api_bp.route('/requests')
+def requests_list():
+    """
+    Solicitudes ordenadas por (start_date, id) descendente, como mis_solicitudes
+    y el panel admin. Filtros: ?user_id= (solo admin), ?anio=, ?status=, ?type=.
+    """
+    campos = _campos(CAMPOS_SOLICITUD)
+    limite = _limite()
+
+    filtros, params = [], []
+    user_id = _arg_entero('user_id')
+    if not _es_admin():
+        if user_id is not None and user_id != current_user.id:
+            abort(403, "Solo puedes consultar tus propias solicitudes")
+        user_id = current_user.id
+    if user_id is not None:
+        filtros.append("r.user_id = ?")
+        params.append(user_id)
+
+    anio = _arg_entero('anio')
+    if anio is not None:
+        filtros.append("r.anio = ?")
+        params.append(anio)
+
+    for arg, columna, validos in (('status', 'r.status', ESTADOS), ('type', 'r.request_type', TIPOS)):
+        valor = request.args.get(arg)
+        if valor:
+            if valor not in validos:
+                abort(400, f"{arg} debe ser uno de: {', '.join(validos)}")
+            filtros.append(f"{columna} = ?")
+            params.append(valor)
+
+    cursor = _leer_cursor(2)
+    if cursor:
+        filtros.append("(r.start_date, r.id) < (?, ?)")
+        params.extend(cursor)
+
+    # start_date e id se leen siempre (son el cursor), aunque no se pidan
+    columnas = dict.fromkeys(['start_date', 'id'] + campos)
+    join = "JOIN users u ON u.id = r.user_id" if 'username' in columnas else ""
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    rows = get_db().execute(f"""
+        SELECT {', '.join(f'{CAMPOS_SOLICITUD[c]} AS {c}' for c in columnas)}
+        FROM requests r
+        {join}
+        {where}
+        ORDER BY r.start_date DESC, r.id DESC
+        LIMIT ?
+    """, params + [limite]).fetchall()
+
+    siguiente = None
+    if len(rows) == limite:
+        siguiente = _serializador().dumps([rows[-1]['start_date'], rows[-1]['id']])
+    return _json({
+        'data': [{c: row[c] for c in campos} for row in rows],
+        'next_cursor': siguiente,
+    })
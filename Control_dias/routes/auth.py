@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for
+from flask import Blueprint, render_template, request, redirect, url_for, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from models import get_user_by_username, verify_password, User
+from utils.intentos import get_limitador
+from utils.passwords import ServidorOcupado
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -15,10 +17,22 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
+
+        # Demasiados intentos fallidos recientes para este usuario o esta IP
+        limitador = get_limitador()
+        claves = (('usuario:' + username.strip().lower(), current_app.config.get('LOGIN_MAX_FALLOS_USUARIO', 5)),
+                  ('ip:' + (request.remote_addr or ''), current_app.config.get('LOGIN_MAX_FALLOS_IP', 20)))
+        espera = max(limitador.espera(clave, maximo) for clave, maximo in claves)
+        if espera:
+            error = f"Demasiados intentos. Vuelva a intentarlo en {espera} segundos."
+            return render_template('login.html', error=error), 429, {'Retry-After': str(espera)}
+
         user = get_user_by_username(username)
 
         # Usuario inexistente
         if not user:
+            for clave, _ in claves:
+                limitador.fallo(clave)
             error = "¿Quién es usted? ¿Es parte del equipo?"
             return render_template('login.html', error=error)
 
@@ -28,15 +42,17 @@ def login():
             error = "Lo siento, usted ya no trabaja con nosotros. :("
             return render_template('login.html', error=error)
 
+        # Verificación en el pool de hashes; si está saturado se pide reintentar
+        try:
+            correcto = verify_password(user, password)
+        except ServidorOcupado:
+            error = "Hay muchos ingresos en este momento. Intente de nuevo en unos segundos."
+            return render_template('login.html', error=error), 503, {'Retry-After': '5'}
+
         # Password correcto
-        if verify_password(user, password):
-            login_user(User(
-                user['id'],
-                user['username'],
-                user['role'],
-                user['dias_vacaciones'],
-                user['activo']
-            ))
+        if correcto:
+            limitador.limpiar(claves[0][0])
+            login_user(User.desde_fila(user))
 
             if user['role'] == 'administrador':
                 return redirect(url_for('dashboards.dashboard'))
@@ -44,6 +60,8 @@ def login():
                 return redirect(url_for('dashboards.mi_dashboard'))
 
         # Password incorrecto
+        for clave, _ in claves:
+            limitador.fallo(clave)
         error = "¿Quién es usted? ¿Es parte del equipo?"
         return render_template('login.html', error=error)
 
@@ -0,0 +1,249 @@
+"""
+Feeds iCalendar (.ics) de ausencias aprobadas: uno por usuario y uno del
+equipo (solo se muestra a administradores).
+
+Los clientes de calendario no tienen la sesión del navegador, así que la URL
+lleva un token firmado con SECRET_KEY con el usuario que la obtuvo y su
+secreto de feed (users.secreto_feed). El feed responde mientras ese usuario
+siga activo (y administrador, para el del equipo) y no haya renovado el
+secreto: renovarlo invalida sus URLs sin tocar SECRET_KEY. La versión de
+cada feed está en versiones_calendario (mantenida por triggers, ver
+migraciones.py): responder 304 cuesta una búsqueda por clave primaria, y solo
+si cambió se arma el calendario, fila a fila desde el cursor.
+"""
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from flask import (Blueprint, Response, abort, current_app, flash, redirect, render_template, request,
+                   stream_with_context, url_for)
+from flask_login import current_user, login_required
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from models import get_db
+
+calendario_bp = Blueprint('calendario', __name__)
+
+FEED_EQUIPO = 0  # user_id de la fila del equipo en versiones_calendario
+
+# Tipo de feed en el token
+PERSONAL = 'personal'
+EQUIPO = 'equipo'
+
+TITULOS = {
+    'vacaciones': "Vacaciones",
+    'administrativo': "Día administrativo",
+}
+
+# Bloques horarios de los medios días administrativos (hora local, sin zona)
+BLOQUES_POR_DEFECTO = {
+    'AM': ('08:30', '13:00'),
+    'PM': ('14:00', '17:30'),
+}
+
+
+def _serializador():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendario-ics')
+
+
+def _secreto_feed(db, user_id, renovar=False):
+    """Secreto de feed del usuario; se crea en el primer uso o al renovarlo."""
+    if not renovar:
+        row = db.execute("SELECT secreto_feed FROM users WHERE id = ?", (user_id,)).fetchone()
+        if row is not None and row['secreto_feed']:
+            return row['secreto_feed']
+    secreto = secrets.token_urlsafe(16)
+    db.execute("UPDATE users SET secreto_feed = ? WHERE id = ?", (secreto, user_id))
+    db.commit()
+    return secreto
+
+
+def token_feed(user_id, tipo=PERSONAL):
+    """Token de la URL del feed `tipo` obtenida por `user_id` (el del equipo lo emite un administrador)."""
+    return _serializador().dumps([tipo, user_id, _secreto_feed(get_db(), user_id)])
+
+
+def _anio_desde():
+    # Desde el 1 de enero del año anterior; configurable con ICS_ANIOS_ATRAS
+    return datetime.now().year - current_app.config.get('ICS_ANIOS_ATRAS', 1)
+
+
+def _escapar(texto):
+    return (str(texto).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _linea(texto):
+    """Línea de contenido con CRLF, plegada a 75 octetos (RFC 5545, 3.1)."""
+    datos = texto.encode('utf8')
+    if len(datos) <= 75:
+        return texto + '\r\n'
+    partes = []
+    actual = ''
+    limite = 75
+    for caracter in texto:
+        if len((actual + caracter).encode('utf8')) > limite:
+            partes.append(actual)
+            actual = ''
+            limite = 74  # las líneas de continuación empiezan con un espacio
+        actual += caracter
+    partes.append(actual)
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def _fecha(valor):
+    return valor.replace('-', '')
+
+
+def _marca_utc(valor):
+    # created_at / reviewed_at vienen de datetime('now'): UTC 'YYYY-MM-DD HH:MM:SS'
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d %H:%M:%S').strftime('%Y%m%dT%H%M%SZ')
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _evento(row, dominio, bloques, con_nombre):
+    titulo = TITULOS.get(row['request_type'], row['request_type'])
+    if con_nombre:
+        titulo = f"{row['username']} - {titulo}"
+    lineas = [
+        'BEGIN:VEVENT',
+        f"UID:solicitud-{row['id']}@{dominio}",
+        f"DTSTAMP:{_marca_utc(row['reviewed_at'] or row['created_at'])}",
+    ]
+    bloque = bloques.get(row['half_day_part']) if row['days'] == 0.5 else None
+    if bloque:
+        titulo += f" ({row['half_day_part']})"
+        dia = _fecha(row['start_date'])
+        lineas += [
+            f"DTSTART:{dia}T{bloque[0].replace(':', '')}00",
+            f"DTEND:{dia}T{bloque[1].replace(':', '')}00",
+        ]
+    else:
+        fin = datetime.strptime(row['end_date'] or row['start_date'], '%Y-%m-%d') + timedelta(days=1)
+        lineas += [
+            f"DTSTART;VALUE=DATE:{_fecha(row['start_date'])}",
+            f"DTEND;VALUE=DATE:{fin.strftime('%Y%m%d')}",  # DTEND de día completo es exclusivo
+        ]
+    lineas += [
+        f"SUMMARY:{_escapar(titulo)}",
+        'TRANSP:OPAQUE',
+        'END:VEVENT',
+    ]
+    return ''.join(_linea(l) for l in lineas)
+
+
+def _generar(cursor, nombre, con_nombre):
+    dominio = current_app.config.get('ICS_DOMINIO', 'control-dias')
+    bloques = current_app.config.get('ICS_BLOQUES_MEDIO_DIA', BLOQUES_POR_DEFECTO)
+    yield ''.join(_linea(l) for l in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Control_dias//Ausencias//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{_escapar(nombre)}",
+    ))
+    for row in cursor:
+        yield _evento(row, dominio, bloques, con_nombre)
+    yield _linea('END:VCALENDAR')
+
+
+@calendario_bp.route('/<token>.ics')
+def feed(token):
+    try:
+        datos = _serializador().loads(token)
+    except BadSignature:
+        abort(404)
+    # Tokens anteriores (solo el user_id) o de otra forma: no son válidos
+    if not isinstance(datos, list) or len(datos) != 3 or datos[0] not in (PERSONAL, EQUIPO):
+        abort(404)
+    tipo, emisor, secreto = datos
+
+    db = get_db()
+    anio_desde = _anio_desde()
+
+    # El emisor tiene que seguir activo, con el mismo secreto (y administrador
+    # para el feed del equipo); si no, la URL quedó revocada
+    version = db.execute("""
+        SELECT v.version, v.modificado
+        FROM users u
+        LEFT JOIN versiones_calendario v ON v.user_id = ?
+        WHERE u.id = ? AND u.activo = 1 AND u.secreto_feed = ?
+          AND (? = 'personal' OR u.role = 'administrador')
+    """, (FEED_EQUIPO if tipo == EQUIPO else emisor, emisor, secreto, tipo)).fetchone()
+    if version is None:
+        abort(404)
+    user_id = FEED_EQUIPO if tipo == EQUIPO else emisor
+
+    numero = version['version'] if version and version['version'] else 0
+    modificado = None
+    if version and version['modificado']:
+        modificado = datetime.strptime(version['modificado'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    etag = f"ics-{user_id}-{numero}-{anio_desde}"
+
+    # If-None-Match tiene prioridad; If-Modified-Since solo si no viene ETag
+    if request.if_none_match:
+        no_cambio = request.if_none_match.contains(etag)
+    else:
+        no_cambio = (modificado is not None and request.if_modified_since is not None
+                     and modificado <= request.if_modified_since)
+
+    respuesta = Response(mimetype='text/calendar')
+    respuesta.set_etag(etag)
+    if modificado is not None:
+        respuesta.last_modified = modificado
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True  # siempre revalidar (barato con el ETag)
+    if no_cambio:
+        respuesta.status_code = 304
+        return respuesta
+
+    if user_id == FEED_EQUIPO:
+        cursor = db.execute("""
+            SELECT r.id, r.request_type, r.start_date, r.end_date, r.days, r.half_day_part,
+                   r.created_at, r.reviewed_at, u.username
+            FROM requests r
+            JOIN users u ON u.id = r.user_id
+            WHERE r.request_type IN ('vacaciones', 'administrativo')
+              AND r.status = 'aprobada'
+              AND r.anio >= ?
+            ORDER BY r.start_date, r.id
+        """, (anio_desde,))
+        nombre, con_nombre = "Ausencias del equipo", True
+    else:
+        cursor = db.execute("""
+            SELECT r.id, r.request_type, r.start_date, r.end_date, r.days, r.half_day_part,
+                   r.created_at, r.reviewed_at, u.username
+            FROM requests r
+            JOIN users u ON u.id = r.user_id
+            WHERE r.user_id = ?
+              AND r.request_type IN ('vacaciones', 'administrativo')
+              AND r.status = 'aprobada'
+              AND r.anio >= ?
+            ORDER BY r.start_date, r.id
+        """, (user_id, anio_desde))
+        nombre, con_nombre = "Mis ausencias", False
+
+    respuesta.response = stream_with_context(_generar(cursor, nombre, con_nombre))
+    return respuesta
+
+
+@calendario_bp.route('/')
+@login_required
+def suscribirse():
+    """Enlaces para suscribirse a los feeds desde una app de calendario."""
+    personal = url_for('calendario.feed', token=token_feed(current_user.id), _external=True)
+    equipo = None
+    if current_user.role == 'administrador':
+        equipo = url_for('calendario.feed', token=token_feed(current_user.id, EQUIPO), _external=True)
+    return render_template('calendario.html', personal=personal, equipo=equipo)
+
+
+@calendario_bp.route('/renovar', methods=['POST'])
+@login_required
+def renovar():
+    """Cambia el secreto de feed del usuario: sus URLs anteriores dejan de funcionar."""
+    _secreto_feed(get_db(), current_user.id, renovar=True)
+    flash("Se generaron direcciones nuevas; las anteriores ya no funcionan.", "success")
+    return redirect(url_for('calendario.suscribirse'))
@@ -1,11 +1,106 @@
-from flask import Blueprint, render_template, abort
+from flask import Blueprint, render_template, abort, current_app, jsonify, make_response, request, url_for
 from flask_login import login_required, current_user
 from models import get_db
-from charts import create_vacation_chart, create_admin_chart, create_hours_chart
-from datetime import datetime
+from balances import saldo_usuario, listar_saldos, ORDEN_SALDOS
+from datetime import date, datetime, timedelta
+from ausencias import calendario_equipo
+from charts_svg import render_chart_svg, placeholder_svg
+from utils.chart_cache import chart_key, parse_chart_key, get_chart_cache
+from utils.chart_pool import get_chart_pool
+from utils.metricas import medir
+from utils.versiones import validadores, no_modificado, con_validadores
 
 dashboards_bp = Blueprint('dashboards', __name__)
 
+# Años aceptados en ?anio= / ?mes= (fuera de este rango, el actual): los
+# extremos de date (0001 / 9999) rompen el cálculo del fin y de los períodos
+# vecinos del calendario, y un año enorme no cabe en un entero de SQLite
+ANIO_MINIMO = 1900
+ANIO_MAXIMO = 2999
+MAX_ENTERO_SQLITE = 2 ** 63 - 1
+
+
+def render_chart_png(kind, values):
+    # charts importa matplotlib y seaborn (lento y pesado): se carga recién en el
+    # primer PNG, así los workers que no dibujan gráficos no pagan ese costo
+    from charts import render_chart_png as render
+    return render(kind, values)
+
+
+# Motor de gráficos: 'svg' (Python puro, por defecto) o 'matplotlib' (PNG, respaldo)
+FORMATOS_CHART = {
+    'svg': ('image/svg+xml', render_chart_svg),
+    'png': ('image/png', render_chart_png),
+}
+
+
+def _formato_chart():
+    return 'png' if current_app.config.get('CHART_ENGINE', 'svg') == 'matplotlib' else 'svg'
+
+
+def chart_url(kind, *values):
+    """URL cacheable del gráfico `kind` con esos valores, según CHART_ENGINE."""
+    return url_for('dashboards.chart_image', key=chart_key(kind, *values), fmt=_formato_chart())
+
+
+def precalentar_charts(*graficos):
+    """
+    Con matplotlib, encola en el pool de procesos los PNG (kind, valores) que no
+    estén en caché, para que se rendericen en paralelo mientras el navegador
+    recibe el HTML. El SVG es barato y se genera al pedirlo. Con la cola del
+    pool llena no se encolan (el pedido de la imagen lo intentará de nuevo).
+    """
+    if _formato_chart() != 'png':
+        return
+    cache = get_chart_cache()
+    pool = get_chart_pool()
+    if pool.workers <= 0:
+        return
+    for kind, values in graficos:
+        cache_key = f'{chart_key(kind, *values)}.png'
+        if cache.get(cache_key) is None:
+            pool.enviar(cache_key, kind, values, al_terminar=cache.put)
+
+
+# Imagen de un gráfico; la clave describe el gráfico, así que se renderiza una vez
+# por combinación de valores y luego se sirve desde caché (servidor y navegador)
+@dashboards_bp.route('/charts/<key>.<any(svg, png):fmt>')
+@login_required
+def chart_image(key, fmt):
+    parsed = parse_chart_key(key)
+    if parsed is None:
+        abort(404)
+
+    mimetype, render = FORMATOS_CHART[fmt]
+    cache = get_chart_cache()
+    cache_key = f'{key}.{fmt}'
+    entry = cache.get(cache_key)
+    if entry is None:
+        kind, values = parsed
+        if fmt == 'png':
+            # matplotlib corre en el pool de procesos, con tiempo máximo de espera
+            with medir('graficos'):
+                data = get_chart_pool().renderizar(cache_key, kind, values, al_terminar=cache.put)
+            if data is None:
+                response = make_response(placeholder_svg())
+                response.mimetype = 'image/svg+xml'
+                response.cache_control.no_store = True
+                return response
+            entry = cache.get(cache_key) or cache.put(cache_key, data)
+        else:
+            with medir('graficos'):
+                data = render(kind, values)
+            entry = cache.put(cache_key, data)
+    data, etag = entry
+
+    response = make_response(data)
+    response.mimetype = mimetype
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get('CHART_CACHE_MAX_AGE', 86400)
+    return response.make_conditional(request)
+
+
 # Dashboard general (solo admin)
 @dashboards_bp.route('/dashboard')
 @login_required
@@ -13,12 +108,70 @@ def dashboard():
     if current_user.role != 'administrador':
         abort(403)
 
+    current_year = datetime.now().year
+    anio = request.args.get('anio', type=int) or current_year
+    if not ANIO_MINIMO <= anio <= ANIO_MAXIMO:
+        anio = current_year
+    buscar = (request.args.get('q') or '').strip()
+    orden = request.args.get('orden', 'username')
+    if orden not in ORDEN_SALDOS:
+        orden = 'username'
+    descendente = request.args.get('dir') == 'desc'
+    por_pagina = current_app.config.get('DASHBOARD_PAGE_SIZE', 50)
+    # Tope para que el OFFSET quepa en un entero de SQLite; luego se ajusta a 1..paginas
+    pagina = min(max(1, request.args.get('pagina', type=int) or 1), MAX_ENTERO_SQLITE // por_pagina)
+
+    # Saldos de todos los empleados: una consulta, ordenada y paginada en SQL
     db = get_db()
-    employees = db.execute(
-        "SELECT id, username, dias_vacaciones FROM users"
-    ).fetchall()
+    employees, total = listar_saldos(
+        db, anio=anio, buscar=buscar or None, orden=orden,
+        descendente=descendente, pagina=pagina, por_pagina=por_pagina
+    )
+    paginas = max(1, -(-total // por_pagina))
+    if pagina > paginas:
+        # Más allá de la última página: se muestra la última
+        pagina = paginas
+        employees, total = listar_saldos(
+            db, anio=anio, buscar=buscar or None, orden=orden,
+            descendente=descendente, pagina=pagina, por_pagina=por_pagina
+        )
 
-    return render_template('dashboard.html', employees=employees)
+    return render_template(
+        'dashboard.html',
+        employees=employees,
+        total=total,
+        anio=anio,
+        buscar=buscar,
+        orden=orden,
+        descendente=descendente,
+        pagina=pagina,
+        paginas=paginas,
+    )
+
+
+def _contexto_saldos(saldo):
+    """Variables de plantilla comunes a mi_dashboard y employee_dashboard."""
+    precalentar_charts(
+        ('vacaciones', (saldo['vac_total'], saldo['vac_usadas'])),
+        ('administrativos', (saldo['admin_max'], saldo['admin_usados'])),
+        ('horas', (saldo['horas_extras'], saldo['horas_compensadas'])),
+    )
+    hours_chart = chart_url('horas', saldo['horas_extras'], saldo['horas_compensadas'])
+    return dict(
+        vac_total=saldo['vac_total'],
+        vac_used=saldo['vac_usadas'],
+        vac_available=saldo['vac_disponibles'],
+        vac_chart=chart_url('vacaciones', saldo['vac_total'], saldo['vac_usadas']),
+        admin_max=saldo['admin_max'],
+        admin_used=saldo['admin_usados'],
+        admin_available=saldo['admin_disponibles'],
+        admin_chart=chart_url('administrativos', saldo['admin_max'], saldo['admin_usados']),
+        extra_approved=saldo['horas_extras'],
+        comp_requested=saldo['horas_compensadas'],
+        hours_available=saldo['horas_disponibles'],
+        hours_chart=hours_chart,
+        horas_chart=hours_chart,
+    )
 
 
 # Dashboard de cada empleado (admin)
@@ -29,83 +182,21 @@ def employee_dashboard(employee_id):
         abort(403)
 
     db = get_db()
-    employee = db.execute(
-        "SELECT id, username, dias_vacaciones FROM users WHERE id = ?",
-        (employee_id,)
-    ).fetchone()
-    if not employee:
-        abort(404)
+    # Sin cambios en los datos del empleado desde la última visita: 304
+    etag, modificado = validadores(db, employee_id)
+    if no_modificado(etag, modificado):
+        return con_validadores(make_response('', 304), etag, modificado)
 
-    # VACACIONES (desde requests)
-    current_year = str(datetime.now().year)
-
-    # VACACIONES (requests)
-    vac_total = int(employee['dias_vacaciones'])
-    vac_used_row = db.execute("""
-        SELECT COALESCE(SUM(days), 0) AS used
-        FROM requests
-        WHERE user_id = ?
-          AND request_type = 'vacaciones'
-          AND status = 'aprobada'
-          AND substr(start_date, 1, 4) = ?
-    """, (employee_id, current_year)).fetchone()
-    vac_used = int(vac_used_row['used']) if vac_used_row and vac_used_row['used'] is not None else 0
-    vac_available = max(0, vac_total - vac_used)
-    vac_chart = create_vacation_chart(vac_total, vac_used)
-
-    # DÍAS ADMINISTRATIVOS (requests)
-    admin_max = 6.0
-    admin_used_row = db.execute("""
-        SELECT COALESCE(SUM(days), 0) AS used
-        FROM requests
-        WHERE user_id = ?
-          AND request_type = 'administrativo'
-          AND status = 'aprobada'
-          AND substr(start_date, 1, 4) = ?
-    """, (employee_id, current_year)).fetchone()
-    admin_used = float(admin_used_row['used']) if admin_used_row and admin_used_row['used'] is not None else 0.0
-    admin_available = max(0.0, admin_max - admin_used)
-    admin_chart = create_admin_chart(admin_max, admin_used)
-
-
-
-    # HORAS EXTRAS
-    extra_row = db.execute(
-        "SELECT SUM(cantidad_horas) AS approved "
-        "FROM horas_extras WHERE empleado_id = ? AND estado = 'aprobado'",
-        (employee_id,)
-    ).fetchone()
-    extra_approved = float(extra_row['approved']) if extra_row['approved'] is not None else 0.0
-
-    # HORAS COMPENSADAS
-    comp_row = db.execute(
-        "SELECT SUM(cantidad_horas) AS compensated "
-        "FROM horas_compensadas WHERE empleado_id = ? AND estado = 'aprobado'",
-        (employee_id,)
-    ).fetchone()
-    comp_requested = float(comp_row['compensated']) if comp_row['compensated'] is not None else 0.0
-
-    hours_available = max(0.0, extra_approved - comp_requested)
-    hours_chart = create_hours_chart(extra_approved, comp_requested)
+    # Saldos del año actual en una sola consulta (incluye username)
+    saldo = saldo_usuario(db, employee_id)
+    if not saldo:
+        abort(404)
 
-    return render_template(
+    return con_validadores(make_response(render_template(
         'employee_dashboard.html',
-        employee=employee,
-        vac_total=vac_total,
-        vac_used=vac_used,
-        vac_available=vac_available,
-        vac_chart=vac_chart,
-        admin_max=admin_max,
-        admin_used=admin_used,
-        admin_available=admin_available,
-        admin_chart=admin_chart,
-        extra_approved=extra_approved,
-        comp_requested=comp_requested,
-        hours_available=hours_available,
-        hours_chart=hours_chart,
-        horas_chart=hours_chart,
-
-    )
+        employee={'id': saldo['user_id'], 'username': saldo['username']},
+        **_contexto_saldos(saldo)
+    )), etag, modificado)
 
 
 # Dashboard personal (empleado)
@@ -113,72 +204,96 @@ def employee_dashboard(employee_id):
 @login_required
 def mi_dashboard():
     db = get_db()
-    empleado_id = current_user.id
-
-    # VACACIONES (desde requests)
-    current_year = str(datetime.now().year)
-
-    # VACACIONES (requests)
-    vac_total = int(current_user.dias_vacaciones)
-    vac_used_row = db.execute("""
-        SELECT COALESCE(SUM(days), 0) AS used
-        FROM requests
-        WHERE user_id = ?
-          AND request_type = 'vacaciones'
-          AND status = 'aprobada'
-          AND substr(start_date, 1, 4) = ?
-    """, (empleado_id, current_year)).fetchone()
-    vac_used = int(vac_used_row['used']) if vac_used_row and vac_used_row['used'] is not None else 0
-    vac_available = max(0, vac_total - vac_used)
-    vac_chart = create_vacation_chart(vac_total, vac_used)
-
-    # DÍAS ADMINISTRATIVOS (requests)
-    admin_max = 6.0
-    admin_used_row = db.execute("""
-        SELECT COALESCE(SUM(days), 0) AS used
-        FROM requests
-        WHERE user_id = ?
-          AND request_type = 'administrativo'
-          AND status = 'aprobada'
-          AND substr(start_date, 1, 4) = ?
-    """, (empleado_id, current_year)).fetchone()
-    admin_used = float(admin_used_row['used']) if admin_used_row and admin_used_row['used'] is not None else 0.0
-    admin_available = max(0.0, admin_max - admin_used)
-    admin_chart = create_admin_chart(admin_max, admin_used)
-
-
-    # HORAS EXTRAS y COMPENSADAS
-    extra_row = db.execute(
-        "SELECT SUM(cantidad_horas) AS approved "
-        "FROM horas_extras WHERE empleado_id = ? AND estado = 'aprobado'",
-        (empleado_id,)
-    ).fetchone()
-    extra_approved = float(extra_row['approved']) if extra_row['approved'] is not None else 0.0
-
-    comp_row = db.execute(
-        "SELECT SUM(cantidad_horas) AS compensated "
-        "FROM horas_compensadas WHERE empleado_id = ? AND estado = 'aprobado'",
-        (empleado_id,)
-    ).fetchone()
-    comp_requested = float(comp_row['compensated']) if comp_row['compensated'] is not None else 0.0
-
-    hours_available = max(0.0, extra_approved - comp_requested)
-    hours_chart = create_hours_chart(extra_approved, comp_requested)
+    etag, modificado = validadores(db, current_user.id)
+    if no_modificado(etag, modificado):
+        return con_validadores(make_response('', 304), etag, modificado)
 
-    return render_template(
+    saldo = saldo_usuario(db, current_user.id)
+
+    return con_validadores(make_response(render_template(
         'mi_dashboard.html',
         user=current_user,
-        vac_total=vac_total,
-        vac_used=vac_used,
-        vac_available=vac_available,
-        vac_chart=vac_chart,
-        admin_max=admin_max,
-        admin_used=admin_used,
-        admin_available=admin_available,
-        admin_chart=admin_chart,
-        extra_approved=extra_approved,
-        comp_requested=comp_requested,
-        hours_available=hours_available,
-        horas_chart=hours_chart,
-        hours_chart=hours_chart,
+        **_contexto_saldos(saldo)
+    )), etag, modificado)
+
+
+
+
+def _periodo_equipo():
+    """
+    (inicio, fin, mes, vista) desde ?mes=YYYY-MM y ?vista=mes|trimestre
+    (por defecto el mes actual). El trimestre es el que contiene al mes.
+    """
+    hoy = date.today()
+    try:
+        mes = datetime.strptime(request.args.get('mes', ''), '%Y-%m').date()
+    except ValueError:
+        mes = hoy.replace(day=1)
+    if not ANIO_MINIMO <= mes.year <= ANIO_MAXIMO:
+        mes = hoy.replace(day=1)
+    vista = 'trimestre' if request.args.get('vista') == 'trimestre' else 'mes'
+    if vista == 'trimestre':
+        inicio = mes.replace(month=(mes.month - 1) // 3 * 3 + 1)
+        meses = 3
+    else:
+        inicio = mes
+        meses = 1
+    anio_fin, mes_fin = divmod(inicio.month - 1 + meses, 12)
+    fin = date(inicio.year + anio_fin, mes_fin + 1, 1) - timedelta(days=1)
+    return inicio, fin, mes, vista
+
+
+# Calendario de ausencias del equipo (solo admin)
+@dashboards_bp.route('/equipo/calendario')
+@login_required
+def calendario_equipo_view():
+    if current_user.role != 'administrador':
+        abort(403)
+
+    inicio, fin, mes, vista = _periodo_equipo()
+    dias = calendario_equipo(get_db(), inicio, fin)
+
+    # Períodos vecinos para la navegación
+    meses_atras = inicio.year * 12 + inicio.month - 1 - (3 if vista == 'trimestre' else 1)
+    anterior = date(meses_atras // 12, meses_atras % 12 + 1, 1)
+    siguiente = fin + timedelta(days=1)
+
+    return render_template(
+        'calendario_equipo.html',
+        dias=dias,
+        inicio=inicio,
+        fin=fin,
+        vista=vista,
+        mes=mes,
+        anterior=anterior.strftime('%Y-%m'),
+        siguiente=siguiente.strftime('%Y-%m'),
     )
+
+
+@dashboards_bp.route('/equipo/calendario.json')
+@login_required
+def calendario_equipo_json():
+    """
+    Mismo calendario en JSON. Acepta ?mes= / ?vista= o un rango explícito
+    ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (hasta EQUIPO_CALENDARIO_MAX_DIAS días).
+    """
+    if current_user.role != 'administrador':
+        abort(403)
+
+    if request.args.get('desde') or request.args.get('hasta'):
+        try:
+            inicio = datetime.strptime(request.args.get('desde', ''), '%Y-%m-%d').date()
+            fin = datetime.strptime(request.args.get('hasta', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'desde/hasta deben tener formato YYYY-MM-DD'}), 400
+        if (fin - inicio).days > current_app.config.get('EQUIPO_CALENDARIO_MAX_DIAS', 370):
+            return jsonify({'error': 'rango demasiado largo'}), 400
+    else:
+        inicio, fin, _, _ = _periodo_equipo()
+
+    dias = calendario_equipo(get_db(), inicio, fin)
+    return jsonify({
+        'desde': inicio.isoformat(),
+        'hasta': fin.isoformat(),
+        'dias': [dict(d, fecha=d['fecha'].isoformat()) for d in dias],
+    })
@@ -1,6 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, current_app
+import io
+
+from flask import Blueprint, render_template, request, redirect, url_for, current_app, abort
 from flask_login import login_required, current_user
 from models import get_db
+from balances import saldo_usuario
+from importacion_horas import importar_horas_extras, ErrorImportacion
 from datetime import datetime
 
 horas_extras_bp = Blueprint('horas_extras', __name__)
@@ -93,36 +97,9 @@ def solicitar_horas_compensadas():
     message_type = None
     empleado_id = current_user.id
     db = get_db()
-    current_year = datetime.now().year
-
-    # Total de horas extras aprobadas (solo del año actual)
-    result_extra = db.execute(
-        """
-        SELECT COALESCE(SUM(cantidad_horas), 0) AS total
-        FROM horas_extras
-        WHERE empleado_id = ?
-          AND estado = 'aprobado'
-          AND anio = ?
-        """,
-        (empleado_id, current_year)
-    ).fetchone()
-    total_extras_aprobadas = float(result_extra['total'])
-
-    # Total de horas compensadas ya aprobadas (solo del año actual)
-    result_compensadas = db.execute(
-        """
-        SELECT COALESCE(SUM(cantidad_horas), 0) AS total
-        FROM horas_compensadas
-        WHERE empleado_id = ?
-          AND estado = 'aprobado'
-          AND anio = ?
-        """,
-        (empleado_id, current_year)
-    ).fetchone()
-    total_compensadas = float(result_compensadas['total'])
-
-    # Horas disponibles = aprobadas - compensadas (del año actual)
-    available_hours = total_extras_aprobadas - total_compensadas
+
+    # Horas disponibles = extras aprobadas - compensadas aprobadas (del año actual)
+    available_hours = saldo_usuario(db, empleado_id)['horas_disponibles']
 
     if request.method == 'POST':
         try:
@@ -179,3 +156,62 @@ def solicitar_horas_compensadas():
         message_type=message_type,
         available_hours=available_hours
     )
+
+
+# Importación masiva desde CSV (solo administradores)
+@horas_extras_bp.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar_horas_extras_csv():
+    if current_user.role != 'administrador':
+        abort(403)
+    if not current_app.config.get("FEATURE_HORAS_EXTRAS", False):
+        return render_template(
+            "feature_disabled.html",
+            message="Ya no hay horas extras. Póngase la camiseta!"
+        ), 403
+
+    message = None
+    message_type = None
+    resumen = None
+    errores = []
+    max_errores = current_app.config.get('IMPORT_MAX_ERRORES_VISIBLES', 200)
+
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            message = "Seleccione un archivo CSV."
+            message_type = "danger"
+        else:
+            def al_error(linea, username, mensaje):
+                if len(errores) < max_errores:
+                    errores.append({'linea': linea, 'username': username, 'error': mensaje})
+
+            # Se lee directo del stream subido (werkzeug lo deja en un archivo
+            # temporal si es grande), sin cargarlo completo en memoria
+            texto = io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', newline='')
+            try:
+                resumen = importar_horas_extras(
+                    get_db(), texto,
+                    estado='aprobado' if request.form.get('aprobadas') else 'pendiente',
+                    tam_lote=current_app.config.get('IMPORT_LOTE', 1000),
+                    al_error=al_error,
+                )
+            except ErrorImportacion as e:
+                message = f"No se pudo leer el archivo: {e}"
+                if e.resumen and e.resumen['insertadas']:
+                    # Los lotes anteriores al error ya quedaron guardados
+                    message += (f". Ya se importaron {e.resumen['insertadas']} filas (hasta la línea "
+                                f"{e.resumen['hasta_linea']}); vuelva a subir solo las filas siguientes.")
+                message_type = "danger"
+            else:
+                message = (f"{resumen['insertadas']} de {resumen['leidas']} filas importadas."
+                           + (f" {resumen['con_error']} filas con error." if resumen['con_error'] else ""))
+                message_type = "warning" if resumen['con_error'] else "success"
+
+    return render_template(
+        'importar_horas_extras.html',
+        message=message,
+        message_type=message_type,
+        resumen=resumen,
+        errores=errores,
+    )
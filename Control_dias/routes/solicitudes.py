@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, make_response
 from flask_login import login_required, current_user
 from models import get_db
+from utils.versiones import validadores, no_modificado, con_validadores
 from datetime import datetime
 
 solicitudes_bp = Blueprint("solicitudes", __name__)
@@ -13,11 +14,16 @@ def mis_solicitudes():
     current_year = datetime.now().year
     selected_year = request.args.get("anio", type=int) or current_year
 
+    # Sin cambios en las solicitudes del usuario desde la última visita: 304
+    etag, modificado = validadores(db, current_user.id, selected_year)
+    if no_modificado(etag, modificado):
+        return con_validadores(make_response("", 304), etag, modificado)
+
     years_rows = db.execute("""
-        SELECT DISTINCT CAST(substr(start_date, 1, 4) AS INTEGER) AS anio
+        SELECT DISTINCT anio
         FROM requests
         WHERE user_id = ?
-          AND start_date IS NOT NULL
+          AND anio IS NOT NULL
         ORDER BY anio DESC
     """, (current_user.id,)).fetchall()
 
@@ -34,14 +40,13 @@ def mis_solicitudes():
                start_date, end_date, days, admin_comment, half_day_part
         FROM requests
         WHERE user_id = ?
-          AND start_date IS NOT NULL
-          AND substr(start_date, 1, 4) = ?
+          AND anio = ?
         ORDER BY start_date DESC, id DESC
-    """, (current_user.id, str(selected_year))).fetchall()
+    """, (current_user.id, selected_year)).fetchall()
 
-    return render_template(
+    return con_validadores(make_response(render_template(
         "mis_solicitudes.html",
         solicitudes=solicitudes,
         available_years=available_years,
         selected_year=selected_year
-    )
+    )), etag, modificado)
@@ -1,56 +1,13 @@
 from flask import Blueprint, request, render_template
 from flask_login import login_required, current_user
 from models import get_db, create_request
-from datetime import datetime, timedelta
-from utils.dates import fecha_amigable
+from balances import saldo_usuario
+from datetime import datetime
+from utils.calendar import contar_dias_habiles
+from conflictos import buscar_conflictos, describir_conflictos
 
 vacaciones_bp = Blueprint('vacaciones', __name__)
 
-feriados_chile = {
-    "2026-01-01",  # Año Nuevo
-    "2026-04-03",  # Viernes Santo
-    "2026-04-04",  # Sábado Santo
-    "2026-05-01",  # Día del Trabajador
-    "2026-05-21",  # Glorias Navales
-    "2026-06-20",  # Día de los Pueblos Indígenas
-    "2026-06-29",  # San Pedro y San Pablo
-    "2026-07-16",  # Virgen del Carmen
-    "2026-08-15",  # Asunción de la Virgen
-    "2026-09-18",  # Independencia Nacional
-    "2026-09-19",  # Glorias del Ejército
-    "2026-10-12",  # Encuentro de Dos Mundos
-    "2026-10-31",  # Día de las Iglesias Evangélicas
-    "2026-12-08",  # Inmaculada Concepción
-    "2026-12-25"   # Navidad
-}
-
-def contar_dias_habiles(inicio, fin, feriados):
-    dias_habiles = 0
-    actual = inicio
-    while actual <= fin:
-        if actual.weekday() < 5 and actual.strftime('%Y-%m-%d') not in feriados:
-            dias_habiles += 1
-        actual += timedelta(days=1)
-    return dias_habiles
-
-
-def buscar_conflicto_requests(db, user_id, new_start, new_end):
-    """
-    Conflicto general para VACACIONES:
-    - Las vacaciones (día completo / rango) chocan con cualquier request pendiente/aprobada
-      que se cruce, incluyendo administrativos de medio día.
-    Requiere que la tabla requests tenga half_day_part (NULL / 'AM' / 'PM') para mostrar.
-    """
-    return db.execute("""
-        SELECT id, request_type, start_date, end_date, status, days, half_day_part
-        FROM requests
-        WHERE user_id = ?
-          AND status IN ('pendiente', 'aprobada')
-          AND start_date <= ?
-          AND end_date >= ?
-        LIMIT 1
-    """, (user_id, new_end, new_start)).fetchone()
-
 
 @vacaciones_bp.route('/solicitar', methods=['GET', 'POST'])
 @login_required
@@ -61,28 +18,9 @@ def solicitar_vacaciones():
 
     empleado_id = current_user.id
     db = get_db()
-    current_year = datetime.now().year
-
-    # Total de días asignados al empleado
-    total_vacaciones = int(current_user.dias_vacaciones)
-
-    # Sumar sólo las vacaciones con estado 'aprobada' del año actual
-    cur = db.execute(
-        """
-        SELECT COALESCE(SUM(days), 0) AS total
-        FROM requests
-        WHERE user_id = ?
-          AND request_type = 'vacaciones'
-          AND status = 'aprobada'
-          AND substr(start_date, 1, 4) = ?
-        """,
-        (empleado_id, str(current_year))
-    )
-    row = cur.fetchone()
-    dias_usados = int(row['total']) if row and row['total'] is not None else 0
 
-    # Días disponibles
-    disponibles = max(0, total_vacaciones - dias_usados)
+    # Días disponibles del año actual (asignados - vacaciones aprobadas)
+    disponibles = saldo_usuario(db, empleado_id)['vac_disponibles']
 
     if request.method == 'POST':
         fecha_inicio = request.form.get('fecha_inicio')
@@ -126,7 +64,7 @@ def solicitar_vacaciones():
             )
 
         # Contar días hábiles entre inicio y fin
-        dias_solicitados = contar_dias_habiles(inicio, fin, feriados_chile)
+        dias_solicitados = contar_dias_habiles(inicio, fin)
 
         # ¿Se presionó “Calcular” o “Enviar”?
         if request.form.get('accion') == 'calcular':
@@ -178,17 +116,18 @@ def solicitar_vacaciones():
             )
 
         # ✅ NUEVO: validar solapamiento contra TODO (vacaciones + administrativos, incluyendo medio día)
-        conflicto = buscar_conflicto_requests(db, empleado_id, fecha_inicio, fecha_fin)
-        if conflicto:
-            extra = ""
-            if conflicto["days"] == 0.5 and conflicto.get("half_day_part"):
-                extra = f" ({conflicto['half_day_part']})"
-
-            message = (
-                "Ya tienes una solicitud "
-                f"({conflicto['request_type']}) {conflicto['status']} que se cruza con las fechas: "
-                f"({fecha_amigable(conflicto['start_date'])} a {fecha_amigable(conflicto['end_date'])}{extra})."
-            )
+        conflictos = buscar_conflictos(db, empleado_id, fecha_inicio, fecha_fin)
+        if conflictos:
+            if len(conflictos) == 1:
+                message = (
+                    "Ya tienes una solicitud "
+                    f"{describir_conflictos(conflictos)} que se cruza con las fechas."
+                )
+            else:
+                message = (
+                    f"Ya tienes {len(conflictos)} solicitudes que se cruzan con las fechas: "
+                    f"{describir_conflictos(conflictos)}."
+                )
             message_type = "danger"
             return render_template(
                 'solicitar_vacaciones.html',
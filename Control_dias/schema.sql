@@ -1,3 +1,6 @@
+-- Esquema base: es la migración 1 de migraciones.py. Los cambios posteriores se
+-- agregan como migraciones nuevas allí (las bases existentes no vuelven a leer este archivo).
+
 -- Tabla para solicitudes de vacaciones
 CREATE TABLE IF NOT EXISTS vacaciones (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,7 +42,9 @@ CREATE TABLE IF NOT EXISTS users (
     username TEXT UNIQUE NOT NULL,
     password_hash TEXT NOT NULL,
     role TEXT NOT NULL,
-    dias_vacaciones INTEGER NOT NULL DEFAULT 0
+    dias_vacaciones INTEGER NOT NULL DEFAULT 0,
+    activo INTEGER NOT NULL DEFAULT 1,
+    secreto_feed TEXT  -- va en los tokens de los feeds .ics; cambiarlo revoca las URLs
 );
 
 -- Crear tabla de horas compensadas
@@ -68,6 +73,168 @@ CREATE TABLE IF NOT EXISTS requests (
     updated_at TEXT,
     reviewed_by INTEGER,
     reviewed_at TEXT,
+    half_day_part TEXT,  -- 'AM' / 'PM' en medios días administrativos
+    -- Año de start_date, mantenido por triggers (ver migraciones.DDL_ANIO_REQUESTS)
+    anio INTEGER,
     FOREIGN KEY (user_id) REFERENCES users (id),
     FOREIGN KEY (reviewed_by) REFERENCES users (id)
 );
+
+-- Saldos aprobados por usuario y año, mantenidos por triggers en la misma
+-- transacción que modifica requests / horas_extras / horas_compensadas.
+-- Se puede reconstruir y auditar con reconciliar_saldos.py.
+CREATE TABLE IF NOT EXISTS user_year_balances (
+    user_id INTEGER NOT NULL,
+    anio INTEGER NOT NULL,
+    vac_usadas REAL NOT NULL DEFAULT 0,
+    admin_usados REAL NOT NULL DEFAULT 0,
+    horas_extras REAL NOT NULL DEFAULT 0,
+    horas_compensadas REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, anio)
+) WITHOUT ROWID;
+
+-- requests: vacaciones y administrativos aprobados
+CREATE TRIGGER IF NOT EXISTS trg_balances_requests_insert
+AFTER INSERT ON requests
+WHEN NEW.status = 'aprobada' AND NEW.request_type IN ('vacaciones', 'administrativo')
+BEGIN
+    INSERT INTO user_year_balances (user_id, anio, vac_usadas, admin_usados)
+    VALUES (NEW.user_id, CAST(substr(NEW.start_date, 1, 4) AS INTEGER),
+            CASE WHEN NEW.request_type = 'vacaciones' THEN COALESCE(NEW.days, 0) ELSE 0 END,
+            CASE WHEN NEW.request_type = 'administrativo' THEN COALESCE(NEW.days, 0) ELSE 0 END)
+    ON CONFLICT (user_id, anio) DO UPDATE SET
+        vac_usadas = vac_usadas + excluded.vac_usadas,
+        admin_usados = admin_usados + excluded.admin_usados;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_requests_delete
+AFTER DELETE ON requests
+WHEN OLD.status = 'aprobada' AND OLD.request_type IN ('vacaciones', 'administrativo')
+BEGIN
+    UPDATE user_year_balances SET
+        vac_usadas = vac_usadas - CASE WHEN OLD.request_type = 'vacaciones' THEN COALESCE(OLD.days, 0) ELSE 0 END,
+        admin_usados = admin_usados - CASE WHEN OLD.request_type = 'administrativo' THEN COALESCE(OLD.days, 0) ELSE 0 END
+    WHERE user_id = OLD.user_id AND anio = CAST(substr(OLD.start_date, 1, 4) AS INTEGER);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_requests_update
+AFTER UPDATE OF user_id, request_type, status, start_date, days ON requests
+WHEN (OLD.status = 'aprobada' AND OLD.request_type IN ('vacaciones', 'administrativo'))
+  OR (NEW.status = 'aprobada' AND NEW.request_type IN ('vacaciones', 'administrativo'))
+BEGIN
+    UPDATE user_year_balances SET
+        vac_usadas = vac_usadas - CASE WHEN OLD.request_type = 'vacaciones' THEN COALESCE(OLD.days, 0) ELSE 0 END,
+        admin_usados = admin_usados - CASE WHEN OLD.request_type = 'administrativo' THEN COALESCE(OLD.days, 0) ELSE 0 END
+    WHERE OLD.status = 'aprobada'
+      AND user_id = OLD.user_id AND anio = CAST(substr(OLD.start_date, 1, 4) AS INTEGER);
+
+    INSERT INTO user_year_balances (user_id, anio, vac_usadas, admin_usados)
+    SELECT NEW.user_id, CAST(substr(NEW.start_date, 1, 4) AS INTEGER),
+           CASE WHEN NEW.request_type = 'vacaciones' THEN COALESCE(NEW.days, 0) ELSE 0 END,
+           CASE WHEN NEW.request_type = 'administrativo' THEN COALESCE(NEW.days, 0) ELSE 0 END
+    WHERE NEW.status = 'aprobada' AND NEW.request_type IN ('vacaciones', 'administrativo')
+    ON CONFLICT (user_id, anio) DO UPDATE SET
+        vac_usadas = vac_usadas + excluded.vac_usadas,
+        admin_usados = admin_usados + excluded.admin_usados;
+END;
+
+-- horas_extras / horas_compensadas: horas aprobadas ('aprobado')
+CREATE TRIGGER IF NOT EXISTS trg_balances_extras_insert
+AFTER INSERT ON horas_extras
+WHEN NEW.estado = 'aprobado'
+BEGIN
+    INSERT INTO user_year_balances (user_id, anio, horas_extras)
+    VALUES (CAST(NEW.empleado_id AS INTEGER), NEW.anio, NEW.cantidad_horas)
+    ON CONFLICT (user_id, anio) DO UPDATE SET horas_extras = horas_extras + excluded.horas_extras;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_extras_delete
+AFTER DELETE ON horas_extras
+WHEN OLD.estado = 'aprobado'
+BEGIN
+    UPDATE user_year_balances SET horas_extras = horas_extras - OLD.cantidad_horas
+    WHERE user_id = CAST(OLD.empleado_id AS INTEGER) AND anio = OLD.anio;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_extras_update
+AFTER UPDATE OF empleado_id, cantidad_horas, estado, anio ON horas_extras
+WHEN OLD.estado = 'aprobado' OR NEW.estado = 'aprobado'
+BEGIN
+    UPDATE user_year_balances SET horas_extras = horas_extras - OLD.cantidad_horas
+    WHERE OLD.estado = 'aprobado'
+      AND user_id = CAST(OLD.empleado_id AS INTEGER) AND anio = OLD.anio;
+
+    INSERT INTO user_year_balances (user_id, anio, horas_extras)
+    SELECT CAST(NEW.empleado_id AS INTEGER), NEW.anio, NEW.cantidad_horas
+    WHERE NEW.estado = 'aprobado'
+    ON CONFLICT (user_id, anio) DO UPDATE SET horas_extras = horas_extras + excluded.horas_extras;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_compensadas_insert
+AFTER INSERT ON horas_compensadas
+WHEN NEW.estado = 'aprobado'
+BEGIN
+    INSERT INTO user_year_balances (user_id, anio, horas_compensadas)
+    VALUES (CAST(NEW.empleado_id AS INTEGER), NEW.anio, NEW.cantidad_horas)
+    ON CONFLICT (user_id, anio) DO UPDATE SET horas_compensadas = horas_compensadas + excluded.horas_compensadas;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_compensadas_delete
+AFTER DELETE ON horas_compensadas
+WHEN OLD.estado = 'aprobado'
+BEGIN
+    UPDATE user_year_balances SET horas_compensadas = horas_compensadas - OLD.cantidad_horas
+    WHERE user_id = CAST(OLD.empleado_id AS INTEGER) AND anio = OLD.anio;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_balances_compensadas_update
+AFTER UPDATE OF empleado_id, cantidad_horas, estado, anio ON horas_compensadas
+WHEN OLD.estado = 'aprobado' OR NEW.estado = 'aprobado'
+BEGIN
+    UPDATE user_year_balances SET horas_compensadas = horas_compensadas - OLD.cantidad_horas
+    WHERE OLD.estado = 'aprobado'
+      AND user_id = CAST(OLD.empleado_id AS INTEGER) AND anio = OLD.anio;
+
+    INSERT INTO user_year_balances (user_id, anio, horas_compensadas)
+    SELECT CAST(NEW.empleado_id AS INTEGER), NEW.anio, NEW.cantidad_horas
+    WHERE NEW.estado = 'aprobado'
+    ON CONFLICT (user_id, anio) DO UPDATE SET horas_compensadas = horas_compensadas + excluded.horas_compensadas;
+END;
+
+-- Índice de intervalos (R*Tree) de las solicitudes pendientes/aprobadas para
+-- detectar cruces de fechas: (usuario, día juliano de inicio, día juliano de fin).
+-- Lo mantienen los triggers de abajo; ver conflictos.py.
+CREATE VIRTUAL TABLE IF NOT EXISTS requests_intervalos USING rtree_i32(
+    id,
+    user_min, user_max,
+    inicio, fin
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_intervalos_insert
+AFTER INSERT ON requests
+WHEN NEW.status IN ('pendiente', 'aprobada')
+  AND julianday(NEW.start_date) IS NOT NULL
+  AND julianday(NEW.end_date) IS NOT NULL
+BEGIN
+    INSERT INTO requests_intervalos (id, user_min, user_max, inicio, fin)
+    VALUES (NEW.id, NEW.user_id, NEW.user_id,
+            CAST(julianday(NEW.start_date) AS INTEGER), CAST(julianday(NEW.end_date) AS INTEGER));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_intervalos_update
+AFTER UPDATE OF user_id, status, start_date, end_date ON requests
+BEGIN
+    DELETE FROM requests_intervalos WHERE id = OLD.id;
+    INSERT INTO requests_intervalos (id, user_min, user_max, inicio, fin)
+    SELECT NEW.id, NEW.user_id, NEW.user_id,
+           CAST(julianday(NEW.start_date) AS INTEGER), CAST(julianday(NEW.end_date) AS INTEGER)
+    WHERE NEW.status IN ('pendiente', 'aprobada')
+      AND julianday(NEW.start_date) IS NOT NULL
+      AND julianday(NEW.end_date) IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_intervalos_delete
+AFTER DELETE ON requests
+BEGIN
+    DELETE FROM requests_intervalos WHERE id = OLD.id;
+END;
@@ -0,0 +1,218 @@
+"""
+Calendario de días hábiles (lunes a viernes que no son feriado).
+
+El conteo es en tiempo constante para los fines de semana (aritmética sobre
+ordinales) más una búsqueda binaria sobre los feriados ordenados, así que no
+depende del largo del rango. Los feriados vienen de una fuente intercambiable:
+cualquier función anio -> iterable de fechas (date o 'YYYY-MM-DD').
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+# Feriados ya publicados, tal como se cargaron en la aplicación. Para estos años
+# se usa la lista tal cual; para el resto se calculan con las reglas legales.
+FERIADOS_PUBLICADOS = {
+    2026: [
+        "2026-01-01",  # Año Nuevo
+        "2026-04-03",  # Viernes Santo
+        "2026-04-04",  # Sábado Santo
+        "2026-05-01",  # Día del Trabajador
+        "2026-05-21",  # Glorias Navales
+        "2026-06-20",  # Día de los Pueblos Indígenas
+        "2026-06-29",  # San Pedro y San Pablo
+        "2026-07-16",  # Virgen del Carmen
+        "2026-08-15",  # Asunción de la Virgen
+        "2026-09-18",  # Independencia Nacional
+        "2026-09-19",  # Glorias del Ejército
+        "2026-10-12",  # Encuentro de Dos Mundos
+        "2026-10-31",  # Día de las Iglesias Evangélicas
+        "2026-12-08",  # Inmaculada Concepción
+        "2026-12-25",  # Navidad
+    ],
+}
+
+
+def _domingo_de_pascua(anio):
+    """Algoritmo de Meeus/Jones/Butcher (calendario gregoriano)."""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def _solsticio_invierno_chile(anio):
+    """
+    Fecha (hora de Chile continental, UTC-4) del solsticio de junio.
+    Fórmula de Meeus para el valor medio; el error es de minutos.
+    """
+    y = (anio - 2000) / 1000
+    jde = 2451716.56767 + 365241.62603 * y + 0.00325 * y ** 2 + 0.00888 * y ** 3 - 0.00030 * y ** 4
+    # Día juliano -> fecha UTC, luego a UTC-4
+    instante = datetime(2000, 1, 1, 12) + timedelta(days=jde - 2451545.0) - timedelta(hours=4)
+    return instante.date()
+
+
+def _al_lunes(fecha):
+    """Ley 19.668: martes a jueves -> lunes de esa semana; viernes -> lunes siguiente."""
+    wd = fecha.weekday()
+    if wd in (1, 2, 3):
+        return fecha - timedelta(days=wd)
+    if wd == 4:
+        return fecha + timedelta(days=3)
+    return fecha
+
+
+def _iglesias_evangelicas(anio):
+    """31 de octubre; si cae martes pasa al viernes anterior, si cae miércoles al viernes siguiente."""
+    fecha = date(anio, 10, 31)
+    if fecha.weekday() == 1:
+        return fecha - timedelta(days=4)
+    if fecha.weekday() == 2:
+        return fecha + timedelta(days=2)
+    return fecha
+
+
+def feriados_chile(anio):
+    """Feriados nacionales de Chile del año `anio`."""
+    if anio in FERIADOS_PUBLICADOS:
+        return FERIADOS_PUBLICADOS[anio]
+
+    pascua = _domingo_de_pascua(anio)
+    return [
+        date(anio, 1, 1),                     # Año Nuevo
+        pascua - timedelta(days=2),           # Viernes Santo
+        pascua - timedelta(days=1),           # Sábado Santo
+        date(anio, 5, 1),                     # Día del Trabajador
+        date(anio, 5, 21),                    # Glorias Navales
+        _solsticio_invierno_chile(anio),      # Día de los Pueblos Indígenas
+        _al_lunes(date(anio, 6, 29)),         # San Pedro y San Pablo
+        date(anio, 7, 16),                    # Virgen del Carmen
+        date(anio, 8, 15),                    # Asunción de la Virgen
+        date(anio, 9, 18),                    # Independencia Nacional
+        date(anio, 9, 19),                    # Glorias del Ejército
+        _al_lunes(date(anio, 10, 12)),        # Encuentro de Dos Mundos
+        _iglesias_evangelicas(anio),          # Día de las Iglesias Evangélicas
+        date(anio, 11, 1),                    # Todos los Santos
+        date(anio, 12, 8),                    # Inmaculada Concepción
+        date(anio, 12, 25),                   # Navidad
+    ]
+
+
+def _ordinal(fecha):
+    if isinstance(fecha, str):
+        fecha = datetime.strptime(fecha, "%Y-%m-%d")
+    return fecha.toordinal()
+
+
+def _habiles_antes_de(ordinal):
+    """Lunes a viernes en [ordinal 1, ordinal). El ordinal 1 (0001-01-01) es lunes."""
+    semanas, resto = divmod(ordinal - 1, 7)
+    return 5 * semanas + min(resto, 5)
+
+
+class CalendarioHabil:
+    """
+    Cuenta días hábiles con una fuente de feriados intercambiable.
+    Los feriados de cada año se cargan una vez, al primer uso de ese año.
+    """
+
+    def __init__(self, fuente_feriados=feriados_chile):
+        self.fuente_feriados = fuente_feriados
+        self._anios = set()
+        self._feriados = []       # ordinales ordenados de feriados en días de semana
+        self._feriados_set = set()
+        self._lock = threading.Lock()
+
+    def _cargar(self, anio_desde, anio_hasta):
+        faltan = [a for a in range(anio_desde, anio_hasta + 1) if a not in self._anios]
+        if not faltan:
+            return
+        with self._lock:
+            nuevos = set(self._feriados_set)
+            for anio in faltan:
+                if anio in self._anios:
+                    continue
+                for fecha in self.fuente_feriados(anio):
+                    o = _ordinal(fecha)
+                    if (o - 1) % 7 < 5:  # los feriados en fin de semana no restan
+                        nuevos.add(o)
+            self._feriados_set = nuevos
+            self._feriados = sorted(nuevos)
+            self._anios.update(faltan)
+
+    def es_habil(self, fecha):
+        o = _ordinal(fecha)
+        if (o - 1) % 7 >= 5:
+            return False
+        anio = date.fromordinal(o).year
+        self._cargar(anio, anio)
+        return o not in self._feriados_set
+
+    def contar(self, inicio, fin):
+        """Días hábiles entre inicio y fin, ambos incluidos (0 si fin < inicio)."""
+        a, b = _ordinal(inicio), _ordinal(fin)
+        if b < a:
+            return 0
+        self._cargar(date.fromordinal(a).year, date.fromordinal(b).year)
+        feriados = self._feriados
+        return (_habiles_antes_de(b + 1) - _habiles_antes_de(a)
+                - (bisect_right(feriados, b) - bisect_left(feriados, a)))
+
+    def dias(self, inicio, fin):
+        """Lista de fechas hábiles (date) entre inicio y fin, ambos incluidos."""
+        a, b = _ordinal(inicio), _ordinal(fin)
+        if b < a:
+            return []
+        self._cargar(date.fromordinal(a).year, date.fromordinal(b).year)
+        feriados = self._feriados_set
+        return [date.fromordinal(o) for o in range(a, b + 1)
+                if (o - 1) % 7 < 5 and o not in feriados]
+
+    def contar_lote(self, rangos):
+        """
+        Versión por lotes (estilo numpy.busday_count): recibe [(inicio, fin), ...]
+        y devuelve la lista de conteos. Carga los feriados de todos los años
+        involucrados una sola vez.
+        """
+        ordinales = [(_ordinal(i), _ordinal(f)) for i, f in rangos]
+        if not ordinales:
+            return []
+        validos = [(a, b) for a, b in ordinales if b >= a]
+        if validos:
+            self._cargar(date.fromordinal(min(a for a, _ in validos)).year,
+                         date.fromordinal(max(b for _, b in validos)).year)
+        feriados = self._feriados
+        return [
+            0 if b < a else
+            _habiles_antes_de(b + 1) - _habiles_antes_de(a)
+            - (bisect_right(feriados, b) - bisect_left(feriados, a))
+            for a, b in ordinales
+        ]
+
+
+# Calendario por defecto de la aplicación
+calendario = CalendarioHabil()
+
+
+def contar_dias_habiles(inicio, fin):
+    return calendario.contar(inicio, fin)
+
+
+def contar_dias_habiles_lote(rangos):
+    return calendario.contar_lote(rangos)
+
+
+def es_dia_habil(fecha):
+    return calendario.es_habil(fecha)
+
+
+def dias_habiles(inicio, fin):
+    return calendario.dias(inicio, fin)
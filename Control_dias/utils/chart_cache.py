@@ -0,0 +1,115 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+# Tipos de gráfico que se pueden pedir por URL y cuántos valores recibe cada uno
+CHART_KINDS = {
+    'vacaciones': 2,       # (total, usadas)
+    'administrativos': 2,  # (máximo, usados)
+    'horas': 2,            # (aprobadas, compensadas)
+}
+
+
+def _fmt(value):
+    """Normaliza un número para la clave: 15 -> '15', 2.50 -> '2.5'."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = 0.0
+    return ('%.4f' % value).rstrip('0').rstrip('.')
+
+
+def chart_key(kind, *values):
+    """
+    Arma la clave del gráfico a partir del tipo y sus valores, p. ej. 'vacaciones_15_5'.
+    La clave describe el gráfico completo, así que cualquier worker puede
+    renderizarlo aunque no lo tenga en su caché.
+    """
+    return '_'.join([kind] + [_fmt(v) for v in values])
+
+
+def parse_chart_key(key):
+    """Devuelve (kind, valores) o None si la clave no es válida."""
+    kind, _, rest = key.partition('_')
+    if kind not in CHART_KINDS or not rest:
+        return None
+    partes = rest.split('_')
+    if len(partes) != CHART_KINDS[kind]:
+        return None
+    try:
+        values = tuple(float(p) for p in partes)
+    except ValueError:
+        return None
+    # float() acepta 'inf' y 'nan': los saldos siempre son finitos y no negativos
+    if not all(math.isfinite(v) and v >= 0 for v in values):
+        return None
+    # Solo aceptamos la forma canónica, para no llenar la caché con alias
+    if chart_key(kind, *values) != key:
+        return None
+    return kind, values
+
+
+class ChartCache:
+    """
+    Caché LRU de gráficos renderizados (PNG o SVG), acotada por cantidad de
+    gráficos y por bytes.
+    Guarda (bytes, etag) por clave. Es segura para workers con threads.
+    """
+
+    def __init__(self, max_items=256, max_bytes=16 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, data):
+        etag = hashlib.sha1(data).hexdigest()
+        entry = (data, etag)
+        if len(data) > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = entry
+            self._bytes += len(data)
+            while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+                _, (old_data, _) = self._entries.popitem(last=False)
+                self._bytes -= len(old_data)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                'items': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def get_chart_cache():
+    """Caché de gráficos de la app actual (se crea en el primer uso)."""
+    cache = current_app.extensions.get('chart_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('chart_cache', ChartCache(
+            max_items=current_app.config.get('CHART_CACHE_MAX_ITEMS', 256),
+            max_bytes=current_app.config.get('CHART_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+        ))
+    return cache
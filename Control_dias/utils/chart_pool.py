@@ -0,0 +1,144 @@
+"""
+Render de gráficos matplotlib (PNG) en un pool de procesos.
+
+pyplot mantiene estado global y no es seguro entre threads; además cada PNG
+ocupa CPU del worker web. Aquí cada render corre en un proceso hijo que ya
+tiene matplotlib importado (initializer), varios gráficos en paralelo, con un
+tiempo máximo de espera: si no llega a tiempo el request recibe None (y la
+ruta responde con una imagen de reemplazo) mientras el render sigue y su
+resultado queda en la caché de gráficos para el próximo pedido.
+
+Los renders pendientes (en cola o corriendo) tienen un máximo: con la cola
+llena no se encola nada más y el request recibe None de inmediato, en vez de
+esperar el timeout detrás de renders que no van a alcanzar a terminar.
+
+Configuración:
+    CHART_POOL_WORKERS       procesos hijos (3; 0 = renderizar en el mismo thread)
+    CHART_RENDER_TIMEOUT     segundos máximos de espera por gráfico (5)
+    CHART_POOL_QUEUE         renders pendientes como máximo (16)
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+log = logging.getLogger(__name__)
+
+_pool_lock = threading.Lock()
+
+
+def _inicializar():
+    # Se paga una vez por proceso hijo, no en cada gráfico
+    import charts  # noqa: F401  (importa matplotlib y seaborn)
+
+
+def _renderizar(kind, values):
+    from charts import render_chart_png
+    return render_chart_png(kind, values)
+
+
+class ChartRenderPool:
+
+    def __init__(self, workers=3, timeout=5.0, cola=16):
+        self.workers = workers
+        self.timeout = timeout
+        self.cola = max(cola, workers)
+        self.pid = os.getpid()
+        self._executor = None
+        self._en_curso = {}  # clave -> Future, para no renderizar dos veces lo mismo
+        self._lock = threading.Lock()
+        self.stats = {'renders': 0, 'timeouts': 0, 'errores': 0, 'compartidos': 0, 'rechazos': 0}
+
+    def _pool(self):
+        if self._executor is None:
+            # 'spawn': los hijos no heredan threads ni conexiones del worker web
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar,
+            )
+            atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+        return self._executor
+
+    def enviar(self, clave, kind, values, al_terminar=None):
+        """
+        Encola el render (si no está ya en curso) y retorna el Future, o None
+        si la cola está llena. `al_terminar(clave, png)` se llama con el
+        resultado aunque nadie espere.
+        """
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            if futuro is not None:
+                self.stats['compartidos'] += 1
+                return futuro
+            if len(self._en_curso) >= self.cola:
+                self.stats['rechazos'] += 1
+                return None
+            try:
+                futuro = self._pool().submit(_renderizar, kind, tuple(values))
+            except BrokenProcessPool:
+                # Un hijo murió (OOM, señal): se descarta el pool y se crea otro
+                self._executor = None
+                futuro = self._pool().submit(_renderizar, kind, tuple(values))
+            self._en_curso[clave] = futuro
+            self.stats['renders'] += 1
+
+        def terminado(f):
+            with self._lock:
+                self._en_curso.pop(clave, None)
+            if f.cancelled():
+                return
+            if f.exception() is not None:
+                with self._lock:
+                    self.stats['errores'] += 1
+                log.warning("Error renderizando el gráfico %s: %r", clave, f.exception())
+            elif al_terminar is not None:
+                al_terminar(clave, f.result())
+
+        futuro.add_done_callback(terminado)
+        return futuro
+
+    def renderizar(self, clave, kind, values, al_terminar=None):
+        """Bytes PNG, o None si falló o no terminó dentro del timeout."""
+        if self.workers <= 0:
+            try:
+                return _renderizar(kind, values)
+            except Exception:
+                log.exception("Error renderizando el gráfico %s", clave)
+                return None
+        futuro = self.enviar(clave, kind, values, al_terminar)
+        if futuro is None:
+            return None
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturesTimeout:
+            with self._lock:
+                self.stats['timeouts'] += 1
+            return None
+        except Exception:
+            return None
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, workers=self.workers, cola=self.cola, en_curso=len(self._en_curso))
+
+
+def get_chart_pool(app=None):
+    """Pool de render del proceso actual (se crea en el primer uso y tras un fork)."""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('chart_pool')
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = app.extensions.get('chart_pool')
+            if pool is None or pool.pid != os.getpid():
+                pool = app.extensions['chart_pool'] = ChartRenderPool(
+                    workers=app.config.get('CHART_POOL_WORKERS', 3),
+                    timeout=app.config.get('CHART_RENDER_TIMEOUT', 5.0),
+                    cola=app.config.get('CHART_POOL_QUEUE', 16),
+                )
+    return pool
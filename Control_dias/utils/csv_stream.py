@@ -0,0 +1,43 @@
+import csv
+import io
+
+# Inicios de celda que Excel / LibreOffice interpretan como fórmula
+_INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celda(valor):
+    # Los textos (nombres de usuario, motivos) se anteponen con ' para que la
+    # planilla los muestre como texto; los números quedan tal cual
+    if isinstance(valor, str) and valor.startswith(_INICIOS_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def filas_csv(encabezado, filas, filas_por_bloque=500):
+    """
+    Genera el CSV como bloques de texto para una respuesta en streaming.
+
+    El encabezado (con BOM, para que Excel reconozca UTF-8) sale antes de
+    consumir `filas`, así el primer byte se envía sin esperar a la consulta.
+    `filas` puede ser un cursor: se recorre una vez y solo se mantiene en
+    memoria un bloque de `filas_por_bloque` filas. Los textos que empiezan
+    como una fórmula se escriben con ' adelante (inyección de fórmulas).
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(encabezado)
+    yield '\ufeff' + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pendientes = 0
+    for fila in filas:
+        escritor.writerow([_celda(valor) for valor in fila])
+        pendientes += 1
+        if pendientes >= filas_por_bloque:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if pendientes:
+        yield buffer.getvalue()
@@ -0,0 +1,80 @@
+"""
+Límite de intentos fallidos de login por usuario y por IP (ventana deslizante,
+en memoria de cada worker).
+
+Configuración:
+    LOGIN_VENTANA_SEG          largo de la ventana en segundos (300)
+    LOGIN_MAX_FALLOS_USUARIO   fallos permitidos por usuario en la ventana (5)
+    LOGIN_MAX_FALLOS_IP        fallos permitidos por IP en la ventana (20)
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import current_app
+
+
+class LimitadorIntentos:
+    """
+    Registra los fallos por clave ('usuario:ana', 'ip:10.0.0.1') y bloquea la
+    clave mientras tenga `maximo` fallos dentro de la ventana. Guarda a lo más
+    `max_claves` claves (se descartan las menos recientes).
+    """
+
+    def __init__(self, ventana=300, max_claves=10000):
+        self.ventana = ventana
+        self.max_claves = max_claves
+        self._fallos = OrderedDict()  # clave -> deque de instantes
+        self._lock = threading.Lock()
+        self.bloqueos = 0
+
+    def _vigentes(self, clave, ahora):
+        fallos = self._fallos.get(clave)
+        if fallos is None:
+            return None
+        while fallos and fallos[0] <= ahora - self.ventana:
+            fallos.popleft()
+        if not fallos:
+            del self._fallos[clave]
+            return None
+        return fallos
+
+    def espera(self, clave, maximo):
+        """Segundos que faltan para poder intentar de nuevo (0 si no está bloqueada)."""
+        ahora = time.monotonic()
+        with self._lock:
+            fallos = self._vigentes(clave, ahora)
+            if fallos is None or len(fallos) < maximo:
+                return 0
+            self.bloqueos += 1
+            return max(1, int(fallos[-maximo] + self.ventana - ahora) + 1)
+
+    def fallo(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            fallos = self._vigentes(clave, ahora)
+            if fallos is None:
+                fallos = self._fallos[clave] = deque()
+            fallos.append(ahora)
+            self._fallos.move_to_end(clave)
+            while len(self._fallos) > self.max_claves:
+                self._fallos.popitem(last=False)
+
+    def limpiar(self, clave):
+        with self._lock:
+            self._fallos.pop(clave, None)
+
+    def stats(self):
+        with self._lock:
+            return {'claves': len(self._fallos), 'bloqueos': self.bloqueos}
+
+
+def get_limitador(app=None):
+    """Limitador de intentos de login de la app actual (se crea en el primer uso)."""
+    app = app or current_app
+    limitador = app.extensions.get('login_limitador')
+    if limitador is None:
+        limitador = app.extensions.setdefault('login_limitador', LimitadorIntentos(
+            ventana=app.config.get('LOGIN_VENTANA_SEG', 300),
+        ))
+    return limitador
@@ -0,0 +1,305 @@
+"""
+Métricas por request: tiempo total, consultas SQL (cantidad y tiempo), tiempo
+de gráficos y de plantillas, agrupadas por endpoint en histogramas que se
+exponen en formato de texto de Prometheus (/admin/metrics).
+
+- SQL: las conexiones del pool son ConexionMedida (ver models.ConnectionPool),
+  que mide cada execute/executemany y cada lectura de filas (fetch*, iteración)
+  y lo suma al request en curso (flask.g). Las consultas que superan
+  SLOW_QUERY_MS (execute + lectura) se registran en el log
+  'control_dias.sql_lento' con el SQL normalizado (literales como ?).
+- Plantillas: señales before_render_template / template_rendered de Flask.
+- Gráficos: medir('graficos') alrededor del render (routes/dashboards.py).
+
+Los contadores son de este worker (como /admin/estado_db). Configuración:
+    METRICS_ENABLED      activar la instrumentación (True)
+    SLOW_QUERY_MS        umbral del log de consultas lentas (100 ms)
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import (before_render_template, current_app, g, has_app_context, has_request_context,
+                   request, template_rendered)
+
+log_sql_lento = logging.getLogger('control_dias.sql_lento')
+
+# Límites superiores de los buckets (segundos, o cantidad de consultas)
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HISTOGRAMAS = {
+    # nombre -> (ayuda, buckets, clave en g._metricas o None para la duración total)
+    'control_dias_request_seconds': ("Duración de los requests", BUCKETS_SEGUNDOS, None),
+    'control_dias_sql_queries': ("Consultas SQL por request", BUCKETS_CONSULTAS, 'sql_consultas'),
+    'control_dias_sql_seconds': ("Tiempo en SQL por request", BUCKETS_SEGUNDOS, 'sql'),
+    'control_dias_chart_seconds': ("Tiempo renderizando gráficos por request", BUCKETS_SEGUNDOS, 'graficos'),
+    'control_dias_template_seconds': ("Tiempo renderizando plantillas por request", BUCKETS_SEGUNDOS, 'plantillas'),
+}
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus (buckets 'le', suma y cantidad)."""
+
+    __slots__ = ('buckets', 'conteos', 'suma', 'cantidad')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+
+class Metricas:
+    """Histogramas por (métrica, endpoint) y contador de consultas lentas. Seguro entre threads."""
+
+    def __init__(self, umbral_lento_ms=100.0):
+        self.umbral_lento = umbral_lento_ms / 1000
+        self._histogramas = {}
+        self._lentas = {}
+        self._lock = threading.Lock()
+
+    def registrar_request(self, endpoint, duracion, acumulado):
+        with self._lock:
+            for nombre, (_, buckets, clave) in HISTOGRAMAS.items():
+                valor = duracion if clave is None else acumulado.get(clave, 0)
+                h = self._histogramas.get((nombre, endpoint))
+                if h is None:
+                    h = self._histogramas[(nombre, endpoint)] = Histograma(buckets)
+                h.observar(valor)
+            if acumulado.get('sql_lentas'):
+                self._lentas[endpoint] = self._lentas.get(endpoint, 0) + acumulado['sql_lentas']
+
+    def prometheus(self):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        lineas = []
+        with self._lock:
+            for nombre, (ayuda, _, _) in HISTOGRAMAS.items():
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for (metrica, endpoint), h in sorted(self._histogramas.items()):
+                    if metrica != nombre:
+                        continue
+                    etiqueta = f'endpoint="{_escapar(endpoint)}"'
+                    for limite, conteo in zip(h.buckets, h.conteos):
+                        lineas.append(f'{nombre}_bucket{{{etiqueta},le="{limite:g}"}} {conteo}')
+                    lineas.append(f'{nombre}_bucket{{{etiqueta},le="+Inf"}} {h.cantidad}')
+                    lineas.append(f'{nombre}_sum{{{etiqueta}}} {h.suma:.6f}')
+                    lineas.append(f'{nombre}_count{{{etiqueta}}} {h.cantidad}')
+            lineas.append("# HELP control_dias_sql_slow_queries_total Consultas SQL sobre SLOW_QUERY_MS")
+            lineas.append("# TYPE control_dias_sql_slow_queries_total counter")
+            for endpoint, total in sorted(self._lentas.items()):
+                lineas.append(f'control_dias_sql_slow_queries_total{{endpoint="{_escapar(endpoint)}"}} {total}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_RE_CADENA = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalizar_sql(sql):
+    """SQL en una línea con los literales como '?' y las listas IN (?, ?, ...) como (?+)."""
+    sql = _RE_CADENA.sub('?', sql)
+    sql = _RE_NUMERO.sub('?', sql)
+    sql = _RE_ESPACIOS.sub(' ', sql).strip()
+    return _RE_LISTA.sub('(?+)', sql)
+
+
+def _acumulado():
+    # Totales del request / contexto actual (None fuera de un contexto de Flask)
+    if not has_app_context():
+        return None
+    acumulado = g.get('_metricas')
+    if acumulado is None:
+        acumulado = g._metricas = {}
+    return acumulado
+
+
+def _sumar(clave, segundos):
+    acumulado = _acumulado()
+    if acumulado is not None:
+        acumulado[clave] = acumulado.get(clave, 0.0) + segundos
+
+
+def _contar_consulta():
+    acumulado = _acumulado()
+    if acumulado is not None:
+        acumulado['sql_consultas'] = acumulado.get('sql_consultas', 0) + 1
+
+
+def _revisar_lenta(sql, duracion):
+    acumulado = _acumulado()
+    if acumulado is None:
+        return
+    metricas = current_app.extensions.get('metricas')
+    if metricas is not None and duracion >= metricas.umbral_lento:
+        acumulado['sql_lentas'] = acumulado.get('sql_lentas', 0) + 1
+        log_sql_lento.warning("%.1f ms [%s] %s", duracion * 1000,
+                              request.endpoint if has_request_context() else '-', normalizar_sql(sql))
+
+
+class CursorMedido(sqlite3.Cursor):
+    """
+    Cursor que mide cada consulta: SQLite hace buena parte del trabajo al ir
+    entregando filas, así que se mide execute y también cada fetch / iteración.
+    El total de la sentencia se compara con SLOW_QUERY_MS cuando el cursor se
+    agota, se cierra, ejecuta otra sentencia o se libera.
+    """
+
+    _sql = None
+    _duracion = 0.0
+
+    def _medido(self, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            self._duracion += time.perf_counter() - inicio
+
+    def _iniciar(self, sql):
+        self._terminar()
+        self._sql = sql
+        self._duracion = 0.0
+        _contar_consulta()
+
+    def _terminar(self):
+        # El tiempo se suma al request una vez por sentencia, no fila a fila
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            _sumar('sql', self._duracion)
+            _revisar_lenta(sql, self._duracion)
+
+    def _ejecutado(self, resultado):
+        # Sin filas que leer (INSERT, UPDATE, ...): la sentencia ya terminó
+        if self.description is None:
+            self._terminar()
+        return resultado
+
+    def execute(self, sql, *args):
+        self._iniciar(sql)
+        return self._ejecutado(self._medido(super().execute, sql, *args))
+
+    def executemany(self, sql, *args):
+        self._iniciar(sql)
+        return self._ejecutado(self._medido(super().executemany, sql, *args))
+
+    def fetchone(self):
+        fila = self._medido(super().fetchone)
+        if fila is None:
+            self._terminar()
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._medido(super().fetchmany, *args, **kwargs)
+        if not filas:
+            self._terminar()
+        return filas
+
+    def fetchall(self):
+        try:
+            return self._medido(super().fetchall)
+        finally:
+            self._terminar()
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            self._duracion += time.perf_counter() - inicio
+            self._terminar()
+            raise
+        self._duracion += time.perf_counter() - inicio
+        return fila
+
+    def close(self):
+        self._terminar()
+        super().close()
+
+    def __del__(self):
+        # p. ej. db.execute(...).fetchone(): el cursor se descarta sin agotarse
+        try:
+            self._terminar()
+        except Exception:
+            pass
+
+
+class ConexionMedida(sqlite3.Connection):
+    """
+    Conexión que mide cada consulta. Connection.execute de sqlite3 no pasa por
+    cursor(), así que se redefinen los dos caminos.
+    """
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+
+@contextmanager
+def medir(clave):
+    """Suma el tiempo del bloque a `clave` ('graficos', ...) del request actual."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _sumar(clave, time.perf_counter() - inicio)
+
+
+def get_metricas():
+    return current_app.extensions.get('metricas')
+
+
+def init_metricas(app):
+    """Registra los hooks de medición en `app` (si METRICS_ENABLED)."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.extensions['metricas'] = Metricas(app.config.get('SLOW_QUERY_MS', 100.0))
+
+    @app.before_request
+    def _inicio_request():
+        g._metricas = {}
+        g._metricas_inicio = time.perf_counter()
+
+    @app.teardown_request
+    def _fin_request(_exc):
+        inicio = g.pop('_metricas_inicio', None)
+        if inicio is None:
+            return
+        app.extensions['metricas'].registrar_request(
+            request.endpoint or 'sin_endpoint',
+            time.perf_counter() - inicio,
+            g.pop('_metricas', {}),
+        )
+
+    def _inicio_plantilla(sender, template, context, **extra):
+        g.setdefault('_plantillas_inicio', []).append(time.perf_counter())
+
+    def _fin_plantilla(sender, template, context, **extra):
+        pila = g.get('_plantillas_inicio')
+        if pila:
+            _sumar('plantillas', time.perf_counter() - pila.pop())
+
+    # weak=False: los receptores son funciones locales, sin otra referencia
+    before_render_template.connect(_inicio_plantilla, app, weak=False)
+    template_rendered.connect(_fin_plantilla, app, weak=False)
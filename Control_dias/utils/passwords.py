@@ -0,0 +1,108 @@
+"""
+Hash y verificación de contraseñas fuera del thread del request.
+
+scrypt/pbkdf2 ocupan CPU a propósito; si muchos usuarios entran a la vez (inicio
+de turno) dejaban sin CPU al resto de las páginas. Aquí corren en un pool de
+threads acotado (hashlib libera el GIL mientras calcula) con un límite de
+trabajos en espera: si el pool está saturado se rechaza el login con
+ServidorOcupado en vez de encolarlo sin límite.
+
+Configuración:
+    PASSWORD_HASH_METHOD   método de werkzeug, p. ej. 'scrypt:32768:8:1' (por defecto)
+                           o 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_WORKERS  threads que calculan hashes (2)
+    PASSWORD_HASH_QUEUE    trabajos admitidos entre en curso y en espera (16)
+    PASSWORD_HASH_TIMEOUT  segundos máximos de espera por un resultado (10)
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+METODO_POR_DEFECTO = 'scrypt:32768:8:1'
+
+
+class ServidorOcupado(Exception):
+    """El pool de hashes está saturado o no respondió a tiempo."""
+
+
+class PoolHashes:
+
+    def __init__(self, metodo=METODO_POR_DEFECTO, workers=2, cola=16, timeout=10.0):
+        self.metodo = metodo
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash')
+        self._cupos = threading.BoundedSemaphore(max(cola, workers))
+        self._prefijo = None
+        self._lock = threading.Lock()
+        self.stats = {'verificaciones': 0, 'hashes': 0, 'rechazos': 0, 'timeouts': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            metodo=config.get('PASSWORD_HASH_METHOD', METODO_POR_DEFECTO),
+            workers=config.get('PASSWORD_HASH_WORKERS', 2),
+            cola=config.get('PASSWORD_HASH_QUEUE', 16),
+            timeout=config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+        )
+
+    def _contar(self, clave):
+        with self._lock:
+            self.stats[clave] += 1
+
+    def _ejecutar(self, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            self._contar('rechazos')
+            raise ServidorOcupado()
+        try:
+            futuro = self._executor.submit(funcion, *args)
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturesTimeout:
+            futuro.cancel()
+            self._contar('timeouts')
+            raise ServidorOcupado()
+
+    def verificar(self, password_hash, password):
+        self._contar('verificaciones')
+        return self._ejecutar(check_password_hash, password_hash, password)
+
+    def generar(self, password):
+        self._contar('hashes')
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def prefijo(self):
+        """Parte 'método:parámetros' que tienen los hashes generados con la configuración actual."""
+        if self._prefijo is None:
+            # werkzeug completa los parámetros por defecto ('scrypt' -> 'scrypt:32768:8:1');
+            # se calcula una vez con una sal mínima
+            self._prefijo = generate_password_hash('', self.metodo, salt_length=1).split('$', 1)[0]
+        return self._prefijo
+
+    def requiere_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.prefijo()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, metodo=self.metodo)
+
+
+def get_hash_pool(app=None):
+    """Pool de hashes del proceso actual; se recrea si el proceso es un fork."""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('hash_pool')
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = app.extensions.get('hash_pool')
+            if pool is None or pool.pid != os.getpid():
+                pool = app.extensions['hash_pool'] = PoolHashes.from_config(app.config)
+    return pool
+
+_pool_lock = threading.Lock()
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class UserCache:
+    """
+    Caché LRU con TTL de los usuarios que carga Flask-Login en cada request.
+    Guarda el User ya armado por id (como string, tal como viene de la sesión).
+
+    La invalidación explícita (invalidar) solo alcanza al proceso actual; en los
+    demás workers el cambio se ve cuando vence el TTL.
+    """
+
+    def __init__(self, ttl=60, max_items=1024):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()  # user_id -> (vence, User)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, user):
+        if self.ttl <= 0 or self.max_items <= 0:
+            return user
+        with self._lock:
+            self._entries[str(user_id)] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(str(user_id))
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidar(self, user_id=None):
+        """Saca un usuario de la caché (o todos, sin user_id)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(user_id), None)
+            self.invalidaciones += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'items': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidaciones': self.invalidaciones,
+                'ttl': self.ttl,
+            }
+
+
+def get_user_cache(app=None):
+    """Caché de usuarios de la app actual (se crea en el primer uso)."""
+    app = app or current_app
+    cache = app.extensions.get('user_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('user_cache', UserCache(
+            ttl=app.config.get('USER_CACHE_TTL', 60),
+            max_items=app.config.get('USER_CACHE_MAX_ITEMS', 1024),
+        ))
+    return cache
@@ -0,0 +1,78 @@
+"""
+Respuestas condicionales (ETag / Last-Modified -> 304) para las páginas que
+dependen solo de los datos de un usuario: mi_dashboard, employee_dashboard y
+mis_solicitudes.
+
+La versión de los datos de cada usuario está en versiones_usuario (la suben
+triggers, ver migraciones.py), así que decidir si la página cambió cuesta una
+búsqueda por clave primaria, sin calcular saldos ni gráficos.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from flask import current_app, request, session
+from flask_login import current_user
+
+_huella_plantillas = None
+
+
+def _huella_despliegue():
+    """
+    Cambia cuando cambian las plantillas (un despliegue nuevo), para no servir
+    304 de una página con el HTML anterior. Es igual en todos los workers.
+    """
+    global _huella_plantillas
+    if _huella_plantillas is None:
+        carpeta = os.path.join(current_app.root_path, current_app.template_folder or 'templates')
+        marcas = []
+        for raiz, _, archivos in os.walk(carpeta):
+            for nombre in archivos:
+                marcas.append(os.stat(os.path.join(raiz, nombre)).st_mtime_ns)
+        _huella_plantillas = str(max(marcas, default=0))
+    return _huella_plantillas
+
+
+def version_usuario(db, user_id):
+    """(version, modificado) de los datos de `user_id`; (0, None) si nunca cambiaron."""
+    row = db.execute(
+        "SELECT version, modificado FROM versiones_usuario WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    if row is None:
+        return 0, None
+    modificado = datetime.strptime(row['modificado'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return row['version'], modificado
+
+
+def validadores(db, user_id, *extra):
+    """
+    (etag, last_modified) de una página con los datos de `user_id` vista por el
+    usuario actual. `extra` agrega lo demás de lo que depende la página (año, etc.).
+    """
+    version, modificado = version_usuario(db, user_id)
+    partes = (user_id, version, current_user.get_id(), current_user.role,
+              datetime.now().year, current_app.config.get('CHART_ENGINE', 'svg'),
+              _huella_despliegue()) + extra
+    etag = hashlib.sha1(repr(partes).encode()).hexdigest()[:20]
+    return etag, modificado
+
+
+def no_modificado(etag, modificado):
+    """True si el navegador ya tiene esta versión (If-None-Match o, sin él, If-Modified-Since)."""
+    # Con mensajes flash pendientes hay que renderizar para mostrarlos
+    if session.get('_flashes'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return (modificado is not None and request.if_modified_since is not None
+            and modificado <= request.if_modified_since)
+
+
+def con_validadores(respuesta, etag, modificado):
+    respuesta.set_etag(etag)
+    if modificado is not None:
+        respuesta.last_modified = modificado
+    # Página personal: el navegador la guarda, pero siempre la revalida
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta